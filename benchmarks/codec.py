@@ -0,0 +1,159 @@
+"""
+Micro benchmarks of the RCON codec.
+
+Measures the time per call of the hot paths of the codec: the int32
+helpers, RCONPacket.msg and from_buffer, splitting the body of a
+RCONMessage, encoding messages and the RCONDecoder with whole, chunked and
+byte-at-a-time feeds. The results can be saved as JSON and compared
+against a saved baseline.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.codec --output baseline.json
+    python -m benchmarks.codec --compare baseline.json
+"""
+import argparse
+import sys
+import timeit
+
+from rcon_server.rcon_packet import RCONPacket
+from rcon_server.rcon_message import RCONMessage
+from rcon_server.rcon_decoder import RCONDecoder
+from rcon_server.util import to_int32, from_int32, check_int32
+
+from .common import environment, save, load, compare, print_comparison
+
+# body sizes of a single packet
+PACKET_SIZES = {"empty": 0, "100B": 100, "4086B": 4086}
+# body sizes of a message
+MESSAGE_SIZES = {"100B": 100, "4086B": 4086, "64KB": 64 * 1024,
+                 "2MB": 2 * 1024 * 1024}
+
+
+def bench_util():
+    """:return: a dict name -> function of the int32 helper benchmarks."""
+    encoded = to_int32(123456)
+    return {
+        "util.to_int32": lambda: to_int32(123456),
+        "util.from_int32": lambda: from_int32(encoded),
+        "util.check_int32": lambda: check_int32(123456),
+    }
+
+
+def bench_packet():
+    """:return: a dict name -> function of the RCONPacket benchmarks."""
+    benchmarks = {}
+    for name, size in PACKET_SIZES.items():
+        packet = RCONPacket(1, RCONPacket.SERVERDATA_RESPONSE_VALUE, "a" * size)
+        encoded = packet.msg()
+        benchmarks[f"packet.init.{name}"] = (
+                lambda body=packet.body: RCONPacket(
+                        1, RCONPacket.SERVERDATA_RESPONSE_VALUE, body))
+        benchmarks[f"packet.msg.{name}"] = packet.msg
+        benchmarks[f"packet.from_buffer.{name}"] = (
+                lambda encoded=encoded: RCONPacket.from_buffer(encoded))
+    return benchmarks
+
+
+def bench_message():
+    """:return: a dict name -> function of the RCONMessage benchmarks."""
+    benchmarks = {}
+    for name, size in MESSAGE_SIZES.items():
+        body = "a" * size
+        message = RCONMessage(id=1, type=RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                              body=body)
+        benchmarks[f"message.body.{name}"] = (
+                lambda body=body: RCONMessage(
+                        id=1, type=RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                        body=body))
+        benchmarks[f"message.split.{name}"] = (
+                lambda message=message: list(message))
+        benchmarks[f"message.msg.{name}"] = message.msg
+    return benchmarks
+
+
+def decode_all(data, chunk_size):
+    """Feeds *data* in chunks of *chunk_size* into a decoder."""
+    decoder = RCONDecoder()
+    count = 0
+    for start in range(0, len(data), chunk_size):
+        decoder.feed(data[start:start + chunk_size])
+        for _ in decoder:
+            count += 1
+    return count
+
+
+def bench_decoder():
+    """:return: a dict name -> function of the RCONDecoder benchmarks."""
+    benchmarks = {}
+    for name, size in PACKET_SIZES.items():
+        # a stream of 100 packets
+        data = RCONPacket(1, RCONPacket.SERVERDATA_EXECCOMMAND,
+                          "a" * size).msg() * 100
+        benchmarks[f"decoder.whole.100x{name}"] = (
+                lambda data=data: decode_all(data, len(data)))
+        benchmarks[f"decoder.chunked_1460.100x{name}"] = (
+                lambda data=data: decode_all(data, 1460))
+    # byte at a time is only measured with small packets
+    data = RCONPacket(1, RCONPacket.SERVERDATA_EXECCOMMAND, "a" * 100).msg()
+    benchmarks["decoder.byte_at_a_time.100B"] = lambda: decode_all(data, 1)
+    large = RCONMessage(id=1, type=RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                        body="a" * MESSAGE_SIZES["2MB"]).msg()
+    benchmarks["decoder.chunked_65536.2MB"] = lambda: decode_all(large, 65536)
+    return benchmarks
+
+
+def all_benchmarks():
+    benchmarks = {}
+    for group in (bench_util, bench_packet, bench_message, bench_decoder):
+        benchmarks.update(group())
+    return benchmarks
+
+
+def measure(function, min_time, repeat):
+    """
+    :return: the best time per call in seconds of *repeat* runs, each of
+    which runs for at least *min_time* seconds.
+    """
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--filter", default="",
+                        help="only run benchmarks which contain this string")
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="seconds per measurement")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--compare", help="compare against saved results")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, function in all_benchmarks().items():
+        if args.filter not in name:
+            continue
+        results[name] = measure(function, args.min_time, args.repeat)
+        print(f"{name:48} {results[name] * 1e6:12.3f} us")
+
+    if args.output:
+        save(args.output, {"environment": environment(),
+                           "seconds_per_call": results})
+
+    if args.compare:
+        baseline = load(args.compare)["seconds_per_call"]
+        rows, regressions = compare(baseline, results, args.threshold)
+        print()
+        print_comparison(rows, regressions, unit="s")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
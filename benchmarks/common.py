@@ -0,0 +1,85 @@
+"""Helpers shared by the benchmark scripts."""
+import json
+import platform
+import sys
+import time
+
+
+def percentile(sorted_values, fraction):
+    """
+    :return: the value at *fraction* (0..1) of the sorted values, using the
+    nearest rank. None if there are no values.
+    """
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1,
+                max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def latency_summary(latencies):
+    """
+    :return: a dict with count, mean, p50, p99, p999 and max of the given
+    latencies in seconds.
+    """
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else None,
+        "p50": percentile(values, 0.50),
+        "p99": percentile(values, 0.99),
+        "p999": percentile(values, 0.999),
+        "max": values[-1] if values else None,
+    }
+
+
+def environment():
+    """:return: a dict describing the machine and the interpreter."""
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def save(path, results):
+    """Writes the *results* as JSON to *path*."""
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load(path):
+    """:return: the results stored at *path*."""
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold):
+    """
+    Compares two flat dicts of metrics where lower is better.
+
+    :return: a list of (name, baseline, current, change) tuples, *change*
+    is the relative change, and a list of the names which got slower by
+    more than *threshold*.
+    """
+    rows = []
+    regressions = []
+    for name in sorted(set(baseline) & set(current)):
+        old, new = baseline[name], current[name]
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        rows.append((name, old, new, change))
+        if change > threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def print_comparison(rows, regressions, unit=""):
+    """Prints the result of compare as a table."""
+    for name, old, new, change in rows:
+        marker = "  REGRESSION" if name in regressions else ""
+        print(f"{name:48} {old:12.6g}{unit} {new:12.6g}{unit} "
+              f"{change:+8.1%}{marker}")
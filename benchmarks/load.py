@@ -0,0 +1,246 @@
+"""
+Load generator and latency benchmark for the RCONServer.
+
+Starts a BenchmarkRCONServer in a separate process and drives it with many
+concurrent simulated clients. Every client connects, logs in and sends a
+mix of small and large (multi packet) commands. The throughput and the
+latency percentiles are printed and can be saved as JSON and compared
+against an earlier run.
+
+Usage (from the repository root)::
+
+    python -m benchmarks.load --clients 1000 --commands 50 --output run.json
+    python -m benchmarks.load --compare run.json
+
+Thousands of clients need a high enough limit of open files (ulimit -n).
+"""
+import argparse
+import asyncio
+import multiprocessing
+import random
+import socket
+import sys
+import time
+
+from rcon_server.rcon_server import RCONServer
+from rcon_server.rcon_packet import RCONPacket
+from rcon_server.rcon_message import RCONMessage
+from rcon_server.rcon_async_client import AsyncRCONClient
+
+from .common import latency_summary, environment, save, load, compare, \
+    print_comparison
+
+PASSWORD = "benchmark"
+
+
+class BenchmarkRCONServer(RCONServer):
+    """
+    Answers "small" with a short text and "large <n>" with a body of n
+    bytes.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        @self.router.command("small")
+        def small(packet, connection, args):
+            connection.send_packet(RCONPacket(
+                    packet.id, RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                    "players : 12 humans, 0 bots (16 max)"))
+
+        @self.router.command("large")
+        def large(packet, connection, args):
+            connection.send_packet(RCONMessage(
+                    id=packet.id, type=RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                    body="x" * int(args[0])))
+
+
+def free_port():
+    """:return: a tcp port which is not used at the moment."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run_server(port, workers):
+    """Runs the benchmark server, this is the target of the server process."""
+    server = BenchmarkRCONServer(bind=("127.0.0.1", port), password=PASSWORD)
+    server.run(workers=workers)
+
+
+def wait_for_server(port, timeout=10):
+    """Waits until the server accepts connections."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+async def simulate_client(port, args, rng, results, connecting):
+    """
+    One simulated client: connects, logs in and sends the commands.
+    Every *args.relogin* commands the client reconnects and logs in again.
+    *connecting* is a semaphore which limits the clients which connect at
+    the same time.
+    """
+    client = None
+    sent = 0
+    try:
+        while sent < args.commands:
+            if client is None:
+                async with connecting:
+                    start = time.perf_counter()
+                    client = AsyncRCONClient("127.0.0.1", port, PASSWORD)
+                    await client.connect()
+                    await client.login()
+                    results["login"].append(time.perf_counter() - start)
+
+            batch = min(args.pipeline, args.commands - sent)
+            if args.relogin:
+                batch = min(batch, args.relogin - sent % args.relogin)
+
+            async def command():
+                if rng.random() < args.large_ratio:
+                    body = f"large {args.large_size}"
+                else:
+                    body = "small"
+                start = time.perf_counter()
+                await client.send_command(body)
+                results["command"].append(time.perf_counter() - start)
+
+            await asyncio.gather(*(command() for _ in range(batch)))
+            sent += batch
+
+            if args.relogin and sent % args.relogin == 0:
+                await client.disconnect()
+                client = None
+    except Exception as e:
+        results["errors"].append(repr(e))
+    finally:
+        if client is not None:
+            await client.disconnect()
+
+
+async def drive(port, args):
+    """Runs all simulated clients and returns the raw results."""
+    results = {"login": [], "command": [], "errors": []}
+    rng = random.Random(args.seed)
+    connecting = asyncio.Semaphore(args.connect_rate)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(simulate_client(port, args,
+                                           random.Random(rng.random()),
+                                           results, connecting)
+                           for _ in range(args.clients)))
+    results["duration"] = time.perf_counter() - start
+    return results
+
+
+def report(args, results):
+    """:return: the machine readable results of a run."""
+    duration = results["duration"]
+    commands = latency_summary(results["command"])
+    logins = latency_summary(results["login"])
+    return {
+        "environment": environment(),
+        "parameters": {key: value for key, value in vars(args).items()
+                       if key not in ("output", "compare")},
+        "duration": duration,
+        "commands_per_second": len(results["command"]) / duration,
+        "command_latency": commands,
+        "login_latency": logins,
+        "errors": len(results["errors"]),
+        "error_samples": results["errors"][:10],
+    }
+
+
+def metrics(result):
+    """:return: a flat dict of the metrics where lower is better."""
+    flat = {"seconds_per_command": 1 / result["commands_per_second"]}
+    for kind in ("command_latency", "login_latency"):
+        for name in ("p50", "p99", "p999"):
+            if result[kind][name] is not None:
+                flat[f"{kind}.{name}"] = result[kind][name]
+    return flat
+
+
+def print_report(result):
+    print(f"duration:          {result['duration']:.2f} s")
+    print(f"commands/s:        {result['commands_per_second']:.0f}")
+    for kind in ("command_latency", "login_latency"):
+        summary = result[kind]
+        if not summary["count"]:
+            continue
+        print(f"{kind + ':':18} n={summary['count']} "
+              + " ".join(f"{name}={summary[name] * 1000:.3f}ms"
+                         for name in ("p50", "p99", "p999", "max")))
+    if result["errors"]:
+        print(f"errors:            {result['errors']} "
+              f"(e.g. {result['error_samples'][0]})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=200,
+                        help="number of concurrent simulated clients")
+    parser.add_argument("--commands", type=int, default=50,
+                        help="commands per client")
+    parser.add_argument("--pipeline", type=int, default=1,
+                        help="outstanding commands per client connection")
+    parser.add_argument("--relogin", type=int, default=0,
+                        help="reconnect and login again every N commands "
+                             "(0: never)")
+    parser.add_argument("--large-ratio", type=float, default=0.1,
+                        help="fraction of commands with a large response")
+    parser.add_argument("--large-size", type=int, default=20000,
+                        help="body size of a large response in bytes")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of server worker processes")
+    parser.add_argument("--connect-rate", type=int, default=100,
+                        help="clients which connect at the same time")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--compare", help="compare against saved results")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    port = free_port()
+    context = multiprocessing.get_context("fork")
+    # not a daemon process: with more than one worker the server process
+    # forks the workers itself. terminate sends SIGTERM, which stops the
+    # workers too.
+    server = context.Process(target=run_server, args=(port, args.workers))
+    server.start()
+    try:
+        wait_for_server(port)
+        results = asyncio.run(drive(port, args))
+    finally:
+        server.terminate()
+        server.join(10)
+        if server.is_alive():
+            server.kill()
+            server.join()
+
+    result = report(args, results)
+    print_report(result)
+    if args.output:
+        save(args.output, result)
+
+    if args.compare:
+        rows, regressions = compare(metrics(load(args.compare)),
+                                    metrics(result), args.threshold)
+        print()
+        print_comparison(rows, regressions, unit="s")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+
+class RejectedConnection(asyncio.Protocol):
+    """
+    The protocol of connections which are rejected by the admission control.
+    It closes the transport at once, nothing is read or registered.
+    """
+
+    def connection_made(self, transport):
+        transport.close()
+
+
+class AdmissionControl:
+    """
+    Limits the load which a RCONServer accepts.
+
+    New connections are rejected when the server has *max_connections*
+    connections or the client's ip has *max_connections_per_ip*
+    connections. Commands are answered with *busy_response* instead of
+    being handled when *max_inflight_commands* async command handlers are
+    running or when the average command latency is above
+    *latency_threshold*. The average is an exponentially weighted moving
+    average of the latencies of the handled commands. While commands are
+    shed, one command per *probe_interval* seconds is still handled, so the
+    average follows the load and the shedding stops when the latency
+    recovers.
+    """
+
+    def __init__(self, max_connections=None, max_connections_per_ip=None,
+                 max_inflight_commands=None, latency_threshold=None,
+                 latency_weight=0.1, probe_interval=0.1,
+                 busy_response="server busy", clock=time.monotonic):
+        """
+        :param max_connections: int, the maximum number of connections or
+        None for no limit.
+        :param max_connections_per_ip: int, the maximum number of connections
+        of one ip or None for no limit.
+        :param max_inflight_commands: int, the maximum number of running async
+        command handlers or None for no limit.
+        :param latency_threshold: float, the average command latency in
+        seconds above which commands are shed or None to disable shedding.
+        :param latency_weight: float, the weight (0..1) of a new latency in
+        the moving average.
+        :param probe_interval: float, seconds between the commands which are
+        handled while commands are shed.
+        :param busy_response: str, the body of the response to shed commands.
+        :param clock: a function which returns the current time in seconds.
+        """
+        if not 0 < latency_weight <= 1:
+            raise ValueError("latency_weight needs to be in (0, 1]")
+        self.max_connections = max_connections
+        self.max_connections_per_ip = max_connections_per_ip
+        self.max_inflight_commands = max_inflight_commands
+        self.latency_threshold = latency_threshold
+        self.latency_weight = latency_weight
+        self.probe_interval = probe_interval
+        self.busy_response = busy_response
+        self.clock = clock
+
+        self.latency = 0.0  # the moving average in seconds
+        self.inflight = 0
+        self._last_probe = None
+        self.rejected_connections = 0
+        self.shed_commands = 0
+
+    def accept_connection(self, connections):
+        """
+        :param connections: int, the number of connections of the server.
+        :return: True if a new connection is accepted.
+        """
+        if self.max_connections is not None \
+                and connections >= self.max_connections:
+            self.rejected_connections += 1
+            return False
+        return True
+
+    def accept_ip(self, connections):
+        """
+        :param connections: int, the number of other connections of the ip.
+        :return: True if the connection of the ip is accepted.
+        """
+        if self.max_connections_per_ip is not None \
+                and connections >= self.max_connections_per_ip:
+            self.rejected_connections += 1
+            return False
+        return True
+
+    @property
+    def overloaded(self):
+        """:return: True if the average latency is above the threshold."""
+        return self.latency_threshold is not None \
+            and self.latency > self.latency_threshold
+
+    def admit_command(self):
+        """:return: True if a command is handled, False if it is shed."""
+        if self.max_inflight_commands is not None \
+                and self.inflight >= self.max_inflight_commands:
+            self.shed_commands += 1
+            return False
+        if self.overloaded:
+            now = self.clock()
+            if self._last_probe is not None \
+                    and now - self._last_probe < self.probe_interval:
+                self.shed_commands += 1
+                return False
+            self._last_probe = now
+        return True
+
+    def record_latency(self, seconds):
+        """Adds the latency of a handled command to the moving average."""
+        self.latency += (seconds - self.latency) * self.latency_weight
+
+    def stats(self):
+        """:return: a dict with the state and the counters."""
+        return {"latency": self.latency,
+                "overloaded": self.overloaded,
+                "inflight_commands": self.inflight,
+                "rejected_connections": self.rejected_connections,
+                "shed_commands": self.shed_commands}
@@ -0,0 +1,209 @@
+import asyncio
+
+from .rcon_packet import RCONPacket
+from .rcon_decoder import RCONDecoder
+from .rcon_encoder import encode
+from .rcon_client import PasswordError, ConnectionClosedError
+
+
+class AsyncRCONClient():
+    """
+    An asyncio RCON client.
+
+    It has the same interface as the RCONClient but its methods are
+    coroutines. Many commands can be send at the same time over one
+    connection. The responses are matched to the commands by the packet id.
+    """
+
+    def __init__(self, ip, port, password):
+        """
+        Initializes the AsyncRCONClient with the given *ip*, *port*, and
+        *password*.
+        The connect and login methods need to be called before commands can be
+        send.
+        :param ip: str, an ip or domain name to connect to
+        :param port: int, a tcp port to connect to
+        :param password: str, the rcon password to use
+        """
+        self.next_id = 1
+        self._ip = ip
+        self._port = port
+        self._password = password
+        self._decoder = RCONDecoder()
+        self._reader = None
+        self._writer = None
+        self._read_task = None
+
+        self._login = None  # (auth_id, future) while a login is running
+        self._commands = {}  # command_id -> (check_id, list of bodies, future)
+        self._checks = {}  # check_id -> command_id
+        self._mirrors = set()  # check_ids whose second response is expected
+        self._closed = False
+
+    async def connect(self):
+        """
+        Connects to the server.
+        This may raise an Error if the connections fails.
+        """
+        self._reader, self._writer = await asyncio.open_connection(self._ip,
+                                                                   self._port)
+        self._closed = False
+        self._read_task = asyncio.ensure_future(self._read_loop())
+
+    async def disconnect(self):
+        """
+        Disconnects from the server. All commands which are still waiting for
+        a response raise a ConnectionClosedError.
+        """
+        if self._writer is None:
+            return
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+        if self._read_task is not None:
+            self._read_task.cancel()
+            try:
+                await self._read_task
+            except (asyncio.CancelledError, Exception):
+                # errors of the reader were passed to the waiting commands
+                pass
+        self._fail_all()
+
+    @property
+    def closed(self):
+        """:return: True if the connection is not connected or was closed."""
+        return self._closed or self._writer is None
+
+    @property
+    def is_connected(self):
+        """:return: True if the client is connected and was not closed."""
+        return not self.closed
+
+    def close(self):
+        """
+        Closes the connection without waiting for it. The read task notices
+        the closed transport and fails all waiting commands.
+        """
+        if self._writer is not None:
+            self._writer.close()
+
+    def _next_id(self):
+        id = self.next_id
+        self.next_id += 1
+        return id
+
+    def _write(self, packets):
+        """Sends the given packets with a single write."""
+        if self._closed or self._writer is None:
+            raise ConnectionClosedError
+        self._writer.write(encode(packets))
+
+    async def login(self):
+        """
+        Sends the rcon password.
+        This raises a PasswordError when the password is wrong.
+        """
+        auth_id = self._next_id()
+        future = asyncio.get_running_loop().create_future()
+        self._login = (auth_id, future)
+        self._write([RCONPacket(auth_id, RCONPacket.SERVERDATA_AUTH,
+                                self._password)])
+        try:
+            await future
+        finally:
+            self._login = None
+
+    async def send_command(self, command):
+        """
+        Sends the given command to the server and returns the output as a
+        string. Other commands can be send while this one waits for its
+        response.
+
+        :param command: str, the command to send.
+        """
+        command_id = self._next_id()
+        check_id = self._next_id()
+
+        command_packet = RCONPacket(command_id,
+                                    RCONPacket.SERVERDATA_EXECCOMMAND,
+                                    command)
+        check_packet = RCONPacket(check_id,
+                                  RCONPacket.SERVERDATA_RESPONSE_VALUE, "")
+
+        future = asyncio.get_running_loop().create_future()
+        self._commands[command_id] = (check_id, [], future)
+        self._checks[check_id] = command_id
+        try:
+            self._write([command_packet, check_packet])
+            await self._writer.drain()
+            return await future
+        finally:
+            self._commands.pop(command_id, None)
+            self._checks.pop(check_id, None)
+
+    async def _read_loop(self):
+        """Reads and dispatches the packets received from the server."""
+        error = None
+        try:
+            while True:
+                data = await self._reader.read(65536)
+                if not data:
+                    break
+                self._decoder.feed(data)
+                for packet in self._decoder:
+                    self._handle_packet(packet)
+        except ConnectionError:
+            pass
+        except (ValueError, AssertionError) as e:
+            # an invalid packet, the stream can not be decoded anymore
+            error = e
+            self._writer.close()
+        finally:
+            self._fail_all(error)
+
+    def _handle_packet(self, packet):
+        """Matches a received packet to the running login or commands."""
+        id = packet.id
+
+        if self._login is not None:
+            auth_id, future = self._login
+            if packet.type == RCONPacket.SERVERDATA_AUTH_RESPONSE \
+                    and packet.body == "" and id in (auth_id, -1):
+                if not future.done():
+                    if id == -1:
+                        future.set_exception(PasswordError("invalid password"))
+                    else:
+                        future.set_result(None)
+                return
+            if id == auth_id:
+                # the empty SERVERDATA_RESPONSE_VALUE before the auth response
+                return
+
+        if id in self._commands:
+            self._commands[id][1].append(packet.body)
+        elif id in self._mirrors:
+            # the 0x0000 0001 0000 0000 packet after the final packet
+            self._mirrors.discard(id)
+        elif id in self._checks and packet.body == "":
+            # final packet received
+            command_id = self._checks.pop(id)
+            _, bodies, future = self._commands.pop(command_id)
+            self._mirrors.add(id)
+            if not future.done():
+                future.set_result("".join(bodies))
+
+    def _fail_all(self, error=None):
+        """
+        Fails the login and all commands which wait for a response.
+        :param error: the exception to raise in the waiting commands or None
+        for a ConnectionClosedError.
+        """
+        self._closed = True
+        futures = [future for _, _, future in self._commands.values()]
+        if self._login is not None:
+            futures.append(self._login[1])
+        for future in futures:
+            if not future.done():
+                future.set_exception(error or ConnectionClosedError())
@@ -0,0 +1,188 @@
+import hashlib
+import hmac
+import os
+import time
+
+
+def hash_password(password, salt=None):
+    """
+    Hashes a RCON password with a random salt.
+    :param password: str, the password.
+    :param salt: bytes, the salt or None for a new random salt.
+    :return: a tuple (salt, digest).
+    """
+    if salt is None:
+        salt = os.urandom(16)
+    return salt, hashlib.sha256(salt + password.encode("utf-8")).digest()
+
+
+def verify_password(password, salt, digest):
+    """
+    :return: True if *password* matches the *digest* of hash_password.
+    The digests are compared in constant time.
+    """
+    return hmac.compare_digest(hash_password(password, salt)[1], digest)
+
+
+class TokenBucket:
+    """
+    A token bucket which allows *burst* events at once and refills with
+    *rate* tokens per second.
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "last")
+
+    def __init__(self, rate, burst, now):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate needs to be > 0 and burst >= 1")
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = now
+
+    def take(self, now):
+        """:return: True if a token was taken, False if the bucket is empty."""
+        self.tokens = min(self.burst,
+                          self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def full(self, now):
+        """:return: True if the bucket has refilled completely at *now*."""
+        return self.tokens + (now - self.last) * self.rate >= self.burst
+
+
+class AuthLimiter:
+    """
+    Limits the login attempts of the clients of a RCONServer.
+
+    Every login attempt takes a token of the bucket of the client's ip and
+    of a global bucket. Attempts without tokens are rejected before the
+    password is checked. An ip with *ban_after* failed logins in a row is
+    banned for *ban_duration* seconds.
+
+    The per ip state is removed lazily: buckets which have refilled
+    completely, failure counters which are older than *ban_duration* and
+    expired bans are purged at most every *purge_interval* seconds.
+    """
+
+    def __init__(self, per_ip_rate=1.0, per_ip_burst=5, global_rate=100.0,
+                 global_burst=200, ban_after=10, ban_duration=300.0,
+                 purge_interval=10.0, clock=time.monotonic):
+        """
+        :param per_ip_rate: float, login attempts per second of one ip.
+        :param per_ip_burst: int, login attempts of one ip at once.
+        :param global_rate: float, login attempts per second of all ips or
+        None for no global limit.
+        :param global_burst: int, login attempts of all ips at once.
+        :param ban_after: int, failed logins after which an ip is banned or
+        None to disable bans.
+        :param ban_duration: float, seconds an ip is banned.
+        :param purge_interval: float, seconds between purges of the tables.
+        :param clock: a function which returns the current time in seconds.
+        """
+        self.per_ip_rate = per_ip_rate
+        self.per_ip_burst = per_ip_burst
+        self.ban_after = ban_after
+        self.ban_duration = ban_duration
+        self.purge_interval = purge_interval
+        self.clock = clock
+        now = clock()
+        self._global = None
+        if global_rate is not None:
+            self._global = TokenBucket(global_rate, global_burst, now)
+        self._buckets = {}  # ip -> TokenBucket
+        self._failures = {}  # ip -> (number of failures, time of the last)
+        self._bans = {}  # ip -> end of the ban
+        self._next_purge = now + purge_interval
+        self.rejected = 0
+
+    def is_banned(self, ip, now=None):
+        """:return: True if the *ip* is banned at the moment."""
+        end = self._bans.get(ip)
+        if end is None:
+            return False
+        if now is None:
+            now = self.clock()
+        if end <= now:
+            del self._bans[ip]
+            return False
+        return True
+
+    def allow(self, ip):
+        """
+        Called before the password of a login attempt of *ip* is checked.
+        :return: False if the attempt has to be rejected.
+        """
+        now = self.clock()
+        if now >= self._next_purge:
+            self.purge(now)
+        if self.is_banned(ip, now):
+            self.rejected += 1
+            return False
+        bucket = self._buckets.get(ip)
+        if bucket is None:
+            bucket = self._buckets[ip] = TokenBucket(self.per_ip_rate,
+                                                     self.per_ip_burst, now)
+        # the ip bucket is checked first, so a flooding ip does not use up
+        # the tokens of the global bucket
+        if not bucket.take(now) or \
+                (self._global is not None and not self._global.take(now)):
+            self.rejected += 1
+            return False
+        return True
+
+    def failure(self, ip):
+        """
+        Records a failed login of *ip*.
+        :return: True if the ip is banned now.
+        """
+        if self.ban_after is None:
+            return False
+        now = self.clock()
+        count, last = self._failures.get(ip, (0, now))
+        if now - last > self.ban_duration:
+            count = 0
+        count += 1
+        if count >= self.ban_after:
+            self._failures.pop(ip, None)
+            self._bans[ip] = now + self.ban_duration
+            return True
+        self._failures[ip] = (count, now)
+        return False
+
+    def success(self, ip):
+        """Records a successful login of *ip*, this resets its failures."""
+        self._failures.pop(ip, None)
+
+    def ban(self, ip, duration=None):
+        """Bans the *ip* for *duration* seconds (default: ban_duration)."""
+        if duration is None:
+            duration = self.ban_duration
+        self._bans[ip] = self.clock() + duration
+
+    def unban(self, ip):
+        """Removes the ban of the *ip*."""
+        self._bans.pop(ip, None)
+        self._failures.pop(ip, None)
+
+    def purge(self, now=None):
+        """Removes the expired entries of the tables."""
+        if now is None:
+            now = self.clock()
+        self._next_purge = now + self.purge_interval
+        self._buckets = {ip: bucket for ip, bucket in self._buckets.items()
+                         if not bucket.full(now)}
+        self._failures = {ip: failure for ip, failure in self._failures.items()
+                          if now - failure[1] <= self.ban_duration}
+        self._bans = {ip: end for ip, end in self._bans.items() if end > now}
+
+    def stats(self):
+        """:return: a dict with the sizes of the tables and the rejections."""
+        return {"tracked_ips": len(self._buckets),
+                "failing_ips": len(self._failures),
+                "banned_ips": len(self._bans),
+                "rejected": self.rejected}
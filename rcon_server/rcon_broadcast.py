@@ -0,0 +1,80 @@
+import asyncio
+import collections
+
+from .rcon_async_client import AsyncRCONClient
+
+BroadcastResult = collections.namedtuple("BroadcastResult",
+                                         ["endpoint", "response", "error"])
+BroadcastResult.__doc__ = """
+The result of a command on one server of a broadcast.
+*endpoint* is the (ip, port, password) tuple of the server, *response* the
+output of the command or None if it failed and *error* the exception which
+occurred or None. If only the disconnect failed, both are set.
+"""
+
+
+async def _run_command(endpoint, command, semaphore, timeout):
+    """
+    Connects to one *endpoint*, logs in and sends the *command*.
+    :return: a BroadcastResult.
+    """
+    ip, port, password = endpoint
+    async with semaphore:
+        client = AsyncRCONClient(ip, port, password)
+        response = error = None
+        try:
+            async def run():
+                await client.connect()
+                await client.login()
+                return await client.send_command(command)
+            response = await asyncio.wait_for(run(), timeout)
+        except Exception as e:
+            error = e
+        try:
+            await client.disconnect()
+        except Exception as e:
+            # the command may have succeeded, the response is kept
+            if error is None:
+                error = e
+        return BroadcastResult(endpoint, response, error)
+
+
+async def broadcast(endpoints, command, concurrency=64, timeout=10):
+    """
+    Sends the *command* to all *endpoints* at the same time.
+
+    This is an async generator which yields a BroadcastResult for every
+    endpoint as soon as the server has answered. Failures, e.g. a
+    PasswordError, a ConnectionClosedError or a timeout, are reported in
+    the result of the endpoint and do not stop the other endpoints.
+
+    :param endpoints: a list of (ip, port, password) tuples.
+    :param command: str, the command to send.
+    :param concurrency: int, the maximum number of servers which are
+    contacted at the same time.
+    :param timeout: float, seconds per server for connecting, the login and
+    the command. None for no timeout.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [asyncio.ensure_future(_run_command(tuple(endpoint), command,
+                                                semaphore, timeout))
+             for endpoint in endpoints]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def broadcast_command(endpoints, command, concurrency=64, timeout=10):
+    """
+    Sends the *command* to all *endpoints* and waits for all of them.
+    This is a blocking version of broadcast for scripts.
+
+    :return: a list of BroadcastResults in the order of completion.
+    """
+    async def run():
+        return [result async for result in broadcast(endpoints, command,
+                                                     concurrency, timeout)]
+    return asyncio.run(run())
@@ -0,0 +1,122 @@
+import collections
+import time
+
+from .rcon_encoder import encode, EncodedResponse
+from .rcon_packet import RCONPacket
+
+
+class ResponseCache:
+    """
+    A cache for the encoded responses of commands.
+
+    Only commands with a TTL are cached. The responses are stored as the
+    encoded packets together with the offsets of the id fields which carry
+    the id of the request. On a hit the stored bytes are copied and only
+    these id fields are replaced with the id of the new request.
+
+    The cache holds at most *max_size* entries. If it is full the least
+    recently used entry is evicted.
+    """
+
+    def __init__(self, ttls=None, default_ttl=None, max_size=1024,
+                 clock=time.monotonic):
+        """
+        Creates a new ResponseCache.
+
+        :param ttls: a dict which maps a command to the number of seconds its
+        response is cached.
+        :param default_ttl: the TTL in seconds for commands which are not
+        in *ttls*. None means that these commands are not cached.
+        :param max_size: int, the maximum number of cached responses.
+        :param clock: a function which returns the current time in seconds.
+        """
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self.max_size = max_size
+        self._clock = clock
+        self._entries = collections.OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def ttl(self, command):
+        """
+        :return: the TTL in seconds of the *command* or None if it is not
+        cached.
+        """
+        return self.ttls.get(command, self.default_ttl)
+
+    def get(self, command, id):
+        """
+        :return: the cached response to *command* as an EncodedResponse with
+        the id fields set to *id* or None if there is no valid cached response.
+        """
+        entry = self._entries.get(command)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires, data = entry
+        if expires <= self._clock():
+            del self._entries[command]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(command)
+        self.hits += 1
+        return data.with_id(id)
+
+    def put(self, command, id, items):
+        """
+        Stores the response to *command*.
+
+        :param command: str, the command.
+        :param id: int, the id of the request the response was build for.
+        :param items: a list of the RCONPackets, RCONMessages or encoded bytes
+        which were send in response. The ids of encoded bytes are only
+        replaced if they are EncodedResponses.
+        """
+        ttl = self.ttl(command)
+        if ttl is None or ttl <= 0:
+            return
+
+        id_offsets = []
+        offset = 0
+        for item in items:
+            if isinstance(item, EncodedResponse):
+                id_offsets.extend(offset + id_offset
+                                  for id_offset in item.id_offsets)
+                offset += len(item)
+                continue
+            if isinstance(item, (bytes, bytearray, memoryview)):
+                offset += len(item)
+                continue
+            # a RCONMessage is iterated over its packets
+            packets = [item] if isinstance(item, RCONPacket) else item
+            for packet in packets:
+                if packet.id == id:
+                    # the id follows the 4 bytes of the size field
+                    id_offsets.append(offset + 4)
+                offset += packet.wire_size
+
+        self._entries[command] = (self._clock() + ttl,
+                                  EncodedResponse(encode(items), id_offsets))
+        self._entries.move_to_end(command)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Removes all cached responses."""
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def stats(self):
+        """:return: a dict with the hit, miss and eviction counters."""
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries)}
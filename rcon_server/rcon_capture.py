@@ -0,0 +1,157 @@
+import collections
+import itertools
+import mmap
+import os
+import struct
+import time
+
+# direction of a record
+TO_SERVER = 0
+FROM_SERVER = 1
+CLOSED = 2  # the connection was closed, the record has no data
+
+DATA_MAGIC = b"RCONCAP1"
+INDEX_MAGIC = b"RCONIDX1"
+# timestamp (seconds since the start of the capture), connection id,
+# direction, offset of the data in the data file, length of the data
+INDEX_ENTRY = struct.Struct("<dQBxxxQI")
+
+Record = collections.namedtuple(
+        "Record", ("timestamp", "connection_id", "direction", "data"))
+
+
+def index_path(path):
+    """:return: the path of the index file of the capture at *path*."""
+    return path + ".idx"
+
+
+class TrafficRecorder:
+    """
+    Records the raw traffic of RCON connections into a capture.
+
+    A capture consists of two append-only files: the data file at *path*
+    with the received and sent bytes and the index file (*path* + ".idx")
+    with one fixed size entry per record. The entries contain the time, the
+    connection id, the direction and the position of the data, so a reader
+    can find every record without parsing the data.
+
+    The data is recorded as it is received and written, i.e. the chunks of
+    data_received and the encoded output of one flush.
+    """
+
+    def __init__(self, path, clock=time.perf_counter):
+        """
+        Creates a new capture at *path*. Existing files are overwritten.
+        :param clock: a function which returns the current time in seconds.
+        """
+        self.path = path
+        self.clock = clock
+        self._data = open(path, "wb")
+        self._index = open(index_path(path), "wb")
+        self._data.write(DATA_MAGIC)
+        self._index.write(INDEX_MAGIC)
+        self._offset = len(DATA_MAGIC)
+        self._start = clock()
+        self._connection_ids = itertools.count(1)
+        self.records = 0
+
+    def next_connection_id(self):
+        """
+        :return: a new connection id. All servers and clients which share
+        the recorder take their ids from it, so they are unique within the
+        capture.
+        """
+        return next(self._connection_ids)
+
+    def record(self, connection_id, direction, data=b""):
+        """
+        Appends a record.
+        :param direction: TO_SERVER, FROM_SERVER or CLOSED.
+        :param data: bytes-like, the transferred data.
+        """
+        length = len(data)
+        if length:
+            self._data.write(data)
+        self._index.write(INDEX_ENTRY.pack(self.clock() - self._start,
+                                           connection_id, direction,
+                                           self._offset, length))
+        self._offset += length
+        self.records += 1
+
+    def flush(self):
+        """Writes the buffered records to the files."""
+        self._data.flush()
+        self._index.flush()
+
+    def close(self):
+        if not self._data.closed:
+            self._data.close()
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class TrafficCapture:
+    """
+    Reads a capture written by a TrafficRecorder.
+
+    Both files are memory mapped and records are read on access. The data of
+    a record is copied out of the mapped data file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._files = []
+        self._data = self._map(path, DATA_MAGIC)
+        self._index = self._map(index_path(path), INDEX_MAGIC)
+        size = len(self._index) - len(INDEX_MAGIC)
+        # a partly written last entry is ignored
+        self._length = size // INDEX_ENTRY.size
+
+    def _map(self, path, magic):
+        f = open(path, "rb")
+        self._files.append(f)
+        if os.fstat(f.fileno()).st_size < len(magic):
+            raise ValueError(f"{path} is not a capture file")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._files.append(mapped)
+        if mapped[:len(magic)] != magic:
+            raise ValueError(f"{path} is not a capture file")
+        return memoryview(mapped)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError("record index out of range")
+        timestamp, connection_id, direction, offset, length = \
+            INDEX_ENTRY.unpack_from(self._index,
+                                    len(INDEX_MAGIC) + i * INDEX_ENTRY.size)
+        # a copy, so records stay valid after the capture is closed
+        return Record(timestamp, connection_id, direction,
+                      bytes(self._data[offset:offset + length]))
+
+    def __iter__(self):
+        for i in range(self._length):
+            yield self[i]
+
+    def close(self):
+        """Unmaps the files."""
+        self._data.release()
+        self._index.release()
+        for f in reversed(self._files):
+            f.close()
+        self._files = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,6 +1,9 @@
 import socket
 
 from .rcon_packet import RCONPacket
+from .rcon_decoder import RCONDecoder
+from .rcon_encoder import encode
+from .rcon_capture import TO_SERVER, FROM_SERVER, CLOSED
 
 class PasswordError(Exception):
     """Exception which is thrown when the password is incorrect."""
@@ -23,7 +26,7 @@ class PacketTypeMissmatch(Exception):
 
 class RCONClient():
 
-    def __init__(self, ip, port, password):
+    def __init__(self, ip, port, password, recorder=None):
         """
         Initializes the RCONClient with the given *ip*, *port*, and *password*.
         The connect and login methods need to be called before commands can be
@@ -31,34 +34,46 @@ class RCONClient():
         :param ip: str, an ip or domain name to connect to
         :param port: int, a tcp port to connect to
         :param password: str, the rcon password to use
+        :param recorder: a TrafficRecorder which records the sent and
+        received data or None
         """
         self.next_id = 1
         self._ip = ip
         self._port = port
         self._password = password
-        self._buffer = b""  # empty buffer for socket connection
+        self._socket = None
+        self._decoder = RCONDecoder()  # empty buffer for socket connection
+        self._recorder = recorder
+        self._connection_id = None  # the id of the connection in the capture
 
     def send_packet(self, packet):
         """Sends the given packet to the server.
         Raises an error when the connection is not working.
         This method does not increase the next_id counter!"""
-        self._socket.sendall(packet.msg())
+        self._send(packet.msg())
+
+    def _send(self, data):
+        """Sends the encoded *data* to the server."""
+        if self._recorder is not None:
+            self._recorder.record(self._connection_id, TO_SERVER, data)
+        self._socket.sendall(data)
 
     def recv_packet(self):
         """Receives one packet from the connection."""
-        while True: # receive data until enougth data is available for a whole
-                    # packet
+        # try to build a packet from the already received data first
+        packet = self._decoder.next_packet()
+        while packet is None: # receive data until enougth data is available
+                              # for a whole packet
             data = self._socket.recv(4096)
             # check for closed socket
             if len(data) == 0:
                 raise ConnectionClosedError
-            self._buffer += data
+            if self._recorder is not None:
+                self._recorder.record(self._connection_id, FROM_SERVER, data)
+            self._decoder.feed(data)
 
-            # try to build a packet
-            packet, buffer = RCONPacket.from_buffer(self._buffer)
-            if packet is not None:
-                self._buffer = buffer
-                return packet
+            packet = self._decoder.next_packet()
+        return packet
 
     def login(self):
         """
@@ -100,6 +115,8 @@ class RCONClient():
         """
         self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self._socket.connect((self._ip, self._port))
+        if self._recorder is not None:
+            self._connection_id = self._recorder.next_connection_id()
 
     def disconnect(self):
         """
@@ -107,6 +124,41 @@ class RCONClient():
         This may raise an Error if closing the connection fails.
         """
         self._socket.close()
+        if self._recorder is not None and self._connection_id is not None:
+            self._recorder.record(self._connection_id, CLOSED)
+            self._connection_id = None
+
+    def close(self):
+        """
+        Closes the connection if it is open. Unlike disconnect this does not
+        raise an error.
+        """
+        if self._socket is None:
+            return
+        try:
+            self.disconnect()
+        except OSError:
+            pass
+
+    @property
+    def is_connected(self):
+        """
+        :return: True if the client is connected and the server has neither
+        closed the connection nor sent data which was not received yet. Such
+        data means that the responses are out of sync.
+        """
+        if self._socket is None:
+            return False
+        try:
+            # a closed connection returns no data
+            self._socket.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT)
+        except BlockingIOError:
+            # nothing was received
+            return True
+        except OSError:
+            # e.g. the socket was closed already
+            pass
+        return False
 
     def send_command(self, command):
         """
@@ -124,8 +176,8 @@ class RCONClient():
                                     command)
         check_packet = RCONPacket(check_id, RCONPacket.SERVERDATA_RESPONSE_VALUE,
                                   "")
-        self.send_packet(command_packet)
-        self.send_packet(check_packet)
+        # both packets are send with one call
+        self._send(encode([command_packet, check_packet]))
 
         response = ""
 
@@ -1,10 +1,36 @@
 import asyncio
+import collections
+import contextvars
 import logging
+import time
 
 from .rcon_packet import RCONPacket
+from .rcon_decoder import RCONDecoder
+from .rcon_encoder import encode, encoded_size
+from .rcon_capture import TO_SERVER, FROM_SERVER, CLOSED
 
 logger = logging.getLogger(name="RCONServer")
 
+# The response slot of the request which is handled at the moment.
+# Tasks copy the context when they are created, so every async handler
+# keeps the slot of its own request.
+_current_slot = contextvars.ContextVar("current_slot", default=None)
+
+
+class _ResponseSlot:
+    """
+    Collects the packets which are send in response to one request while
+    the responses to earlier requests are not written yet.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.output = []
+        self.running = False  # an async handler sends into this slot
+        self.done = False
+        self.cache_key = None  # (command, id) if the response is cached
+
+
 class RCONConnection(asyncio.Protocol):
     def __init__(self, rcon_server):
         """Initializes a new connection with a client.
@@ -22,44 +48,151 @@ class RCONConnection(asyncio.Protocol):
         # 3. "closed"
         # State transitions: 1 -> 2 -> 3
 
-        self._buffer = b"" # buffer for the data received from the connection
+        self._decoder = RCONDecoder() # buffer for the data received from the connection
         self._running = True
         self._transport = None
 
-        # append the RCONConnection to the RCONServer Connections
-        self._rcon_server.connections.append(self)
+        # packets which are send while the connection is corked are collected
+        # here and written with a single write when it is uncorked.
+        self._output = []
+        self._output_size = 0  # the encoded size of _output
+        self._corked = 0
+
+        # response slots of the requests which are handled or waiting for
+        # earlier requests. Only used while an async handler is running.
+        self._slots = collections.deque()
+        self._tasks = set()
+        self._semaphore = None
+
+        # True while the transport is above its write high water mark.
+        # No packets are handled and nothing is read then.
+        self._paused = False
+        # the high water mark of the transport. Collected output is written
+        # before it goes above it, so the transport can pause the connection
+        # while a batch of requests is handled.
+        self._write_high_water = None
+
+        # times of the clock of the server's timer wheel, used for the
+        # timeouts. The idle time is only checked when the timer expires,
+        # received data just updates _last_activity.
+        self._created = None
+        self._last_activity = None
+
+        # register the RCONConnection at the RCONServer, it is removed when
+        # the transport is lost
+        self.connection_id = None
+        self._rcon_server.connections.add(self)
+        # the id of the connection in the capture of the recorder, the ids
+        # of the registry are only unique within one server
+        self.capture_id = None
 
     def connection_made(self, transport):
         """This method is called when a client connects and the transport
         is initialized. Transport is a TCP connection in this case."""
         logger.info("connection made")
         self._transport = transport
+        limiter = self._rcon_server.auth_limiter
+        if limiter is not None and limiter.is_banned(self.peer_ip):
+            # banned clients are disconnected before they send anything
+            self.close_connection()
+            return
+        admission = self._rcon_server.admission
+        if admission is not None \
+                and admission.max_connections_per_ip is not None:
+            connections = self._rcon_server.connections
+            ip = self.peer_ip
+            if not admission.accept_ip(connections.count_ip(ip)):
+                logger.info("too many connections of %s", ip)
+                self.close_connection()
+                return
+            connections.set_ip(self, ip)
+        high = self._rcon_server.write_high_water
+        low = self._rcon_server.write_low_water
+        if high is not None or low is not None:
+            transport.set_write_buffer_limits(high=high, low=low)
+        self._write_high_water = transport.get_write_buffer_limits()[1]
+        wheel = self._rcon_server.timer_wheel
+        if wheel is not None:
+            self._created = self._last_activity = wheel.clock()
+            self._schedule_timeout()
 
     def connection_lost(self, exc):
         """This method is called when the transport is closed.
         If *exc* is None either the connection has received a regular EOF or
         the connection was closed from this side. If *exc* is an Exception
         the other side has closed the connection not orderly."""
-        self._state = "closed"
+        self._set_state("closed")
+        self._rcon_server.connections.remove(self)
+        recorder = self._rcon_server.recorder
+        if recorder is not None:
+            self._record(recorder, CLOSED)
+        for task in self._tasks:
+            task.cancel()
 
     def data_received(self, data):
         """This method is called when the socket has received data."""
         # check if the state of the RCON connection is not closed
         if self._state != "closed":
-            self._buffer += data
-            # check if packet is complete
-            packet, buffer = RCONPacket.from_buffer(self._buffer)
-            if packet is not None:
-                self._buffer = buffer
-                self._handle_packet(packet)
+            metrics = self._rcon_server.metrics
+            if metrics is not None:
+                metrics.bytes_in += len(data)
+            recorder = self._rcon_server.recorder
+            if recorder is not None:
+                self._record(recorder, TO_SERVER, data)
+            if self._last_activity is not None:
+                self._last_activity = self._rcon_server.timer_wheel.clock()
+            self._decoder.feed(data)
+            self._handle_buffer()
         else:
             self._transport.close()
 
+    def _handle_buffer(self):
+        """
+        Handles every complete packet in the buffer in order. The state may
+        change while handling a packet, e.g. after a login or when the
+        connection is closed. Remaining packets are dropped then.
+        If writing is paused the remaining packets stay in the buffer until
+        it is resumed.
+        All responses are written at once after the packets are handled.
+        """
+        if self._paused:
+            return
+        self.cork()
+        try:
+            for packet in self._decoder:
+                self._dispatch_packet(packet)
+                if self._state == "closed" or self._paused:
+                    break
+        finally:
+            self.uncork()
+
+    def pause_writing(self):
+        """
+        This method is called when the write buffer of the transport is above
+        the high water mark. Reading and handling of requests is stopped
+        until the client has read the responses.
+        """
+        logger.info("pausing connection")
+        self._paused = True
+        self._transport.pause_reading()
+
+    def resume_writing(self):
+        """
+        This method is called when the write buffer of the transport has
+        drained below the low water mark. The buffered requests are handled
+        and reading is resumed.
+        """
+        logger.info("resuming connection")
+        self._paused = False
+        if self._state != "closed":
+            self._transport.resume_reading()
+            self._handle_buffer()
+
     def eof_received(self):
         """This method is called when the other side has closed its connection.
         :return: False because the transport may close itself.
         """
-        self._state = "closed"
+        self._set_state("closed")
 
     def close_connection(self):
         """
@@ -68,32 +201,265 @@ class RCONConnection(asyncio.Protocol):
         transport.
         """
         logger.info("closing")
-        self._state = "closed"
+        self.flush()
+        self._set_state("closed")
         self._transport.close()
 
+    def _dispatch_packet(self, packet):
+        """
+        Handles the received packet in its own response slot if the responses
+        to earlier requests are still pending. This keeps the responses in
+        the order of the requests.
+        :param packet: a RCONPacket
+        """
+        if not self._slots:
+            self._handle_packet(packet)
+            return
+
+        slot = self._open_slot()
+        token = _current_slot.set(slot)
+        completed = False
+        try:
+            self._handle_packet(packet)
+            completed = True
+        finally:
+            _current_slot.reset(token)
+            if not slot.running:
+                self._finish_slot(slot, completed)
+
+    def _open_slot(self):
+        """:return: a new response slot after all pending slots."""
+        slot = _ResponseSlot(self)
+        self._slots.append(slot)
+        return slot
+
+    def _finish_slot(self, slot, completed=True):
+        """
+        Marks the response slot as done and writes all responses which are
+        not waiting for earlier requests.
+        :param completed: False if the handler failed. The response is not
+        cached then.
+        """
+        slot.done = True
+        if completed and slot.cache_key is not None:
+            command, id = slot.cache_key
+            self._rcon_server.response_cache.put(command, id, slot.output)
+        self._write_slots()
+
+    def _handle_execcommand(self, packet):
+        """
+        Calls the command handler of the RCONServer. If the handler is a
+        coroutine function the returned coroutine is run as a task.
+
+        If the RCONServer has a response cache and the command is cached,
+        the cached response is send instead. Otherwise the response is
+        collected in a response slot and stored in the cache when the
+        handler is done.
+        :param packet: a RCONPacket with type == SERVERDATA_EXECCOMMAND
+        """
+        admission = self._rcon_server.admission
+        if admission is not None and not admission.admit_command():
+            self.send_packet(RCONPacket._from_trusted(
+                    packet.id, RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                    admission.busy_response))
+            return
+
+        metrics = self._rcon_server.metrics
+        start = None
+        if metrics is not None or admission is not None:
+            start = time.perf_counter()
+
+        slot = _current_slot.get()
+        if slot is not None and slot.connection is not self:
+            slot = None
+        own_slot = None
+
+        cache = self._rcon_server.response_cache
+        if cache is not None and cache.ttl(packet.body) is not None:
+            response = cache.get(packet.body, packet.id)
+            if response is not None:
+                self.send_packet(response)
+                self._record_command(packet.body, start)
+                return
+            if slot is None:
+                slot = own_slot = self._open_slot()
+            slot.cache_key = (packet.body, packet.id)
+
+        token = _current_slot.set(slot)
+        completed = False
+        try:
+            result = self._rcon_server.dispatch_command(packet, self)
+            completed = True
+        finally:
+            _current_slot.reset(token)
+            if not completed:
+                if own_slot is not None:
+                    self._finish_slot(own_slot, completed)
+                self._record_command(packet.body, start, error=True)
+
+        if not asyncio.iscoroutine(result):
+            if own_slot is not None:
+                self._finish_slot(own_slot)
+            self._record_command(packet.body, start)
+            return
+
+        limit = self._rcon_server.max_queued_per_connection
+        if limit is not None and len(self._tasks) >= limit:
+            # the handler is not run, its coroutine is dropped unstarted
+            result.close()
+            self._send_empty_response(packet.id, slot)
+            if own_slot is not None:
+                self._finish_slot(own_slot, completed=False)
+            self._record_command(packet.body, start, error=True)
+            return
+
+        if slot is None:
+            slot = self._open_slot()
+        slot.running = True
+
+        token = _current_slot.set(slot)
+        try:
+            task = asyncio.ensure_future(self._run_handler(result))
+        finally:
+            _current_slot.reset(token)
+        task.slot = slot
+        task.packet_id = packet.id
+        task.command = (packet.body, start)
+        if admission is not None:
+            admission.inflight += 1
+        self._tasks.add(task)
+        task.add_done_callback(self._handler_done)
+
+    async def _run_handler(self, coroutine):
+        """
+        Runs an async command handler within the concurrency limits of the
+        connection and the RCONServer.
+        :param coroutine: the coroutine returned by the handler
+        """
+        if self._semaphore is None:
+            limit = self._rcon_server.max_commands_per_connection
+            self._semaphore = asyncio.Semaphore(limit) if limit else None
+        server_semaphore = self._rcon_server.command_semaphore
+
+        try:
+            # the limit of the connection is acquired first so that a busy
+            # connection does not hold the limits of the other connections
+            if self._semaphore is not None:
+                await self._semaphore.acquire()
+            try:
+                if server_semaphore is not None:
+                    await server_semaphore.acquire()
+                try:
+                    await coroutine
+                finally:
+                    if server_semaphore is not None:
+                        server_semaphore.release()
+            finally:
+                if self._semaphore is not None:
+                    self._semaphore.release()
+        finally:
+            # the coroutine was never started if the task was cancelled
+            # while waiting for a semaphore
+            coroutine.close()
+
+    def _send_empty_response(self, id, slot):
+        """
+        Answers the request *id* with an empty RESPONSE_VALUE in the response
+        *slot*, or directly if *slot* is None.
+        """
+        token = _current_slot.set(slot)
+        try:
+            self.send_packet(RCONPacket._from_trusted(
+                    id, RCONPacket.SERVERDATA_RESPONSE_VALUE, ""))
+        finally:
+            _current_slot.reset(token)
+
+    def _handler_done(self, task):
+        """
+        Called when an async command handler has finished.
+        Writes all responses which are not waiting for earlier requests.
+        A failed handler is answered with an empty response, so the client
+        does not wait for it.
+        """
+        self._tasks.discard(task)
+        completed = not task.cancelled() and task.exception() is None
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("command handler failed", exc_info=task.exception())
+            self._send_empty_response(task.packet_id, task.slot)
+        admission = self._rcon_server.admission
+        if admission is not None:
+            admission.inflight -= 1
+        if not task.cancelled():
+            command, start = task.command
+            self._record_command(command, start, error=not completed)
+        self._finish_slot(task.slot, completed)
+
+    def _record_command(self, command, start, error=False):
+        """
+        Records the latency of a handled command in the metrics and the
+        admission control of the RCONServer, if they are enabled.
+        :param start: the time.perf_counter() at which the command was
+        received.
+        """
+        if start is None:
+            return
+        server = self._rcon_server
+        seconds = time.perf_counter() - start
+        if server.metrics is not None:
+            server.metrics.record_command(command, seconds, error=error)
+        if server.admission is not None:
+            server.admission.record_latency(seconds)
+
+    def _write_slots(self):
+        """Writes the responses of all finished requests in order."""
+        while self._slots and self._slots[0].done:
+            output = self._slots.popleft().output
+            self._output.extend(output)
+            self._output_size += encoded_size(output)
+        if not self._corked:
+            self.flush()
+        else:
+            self._flush_above_high_water()
+
     def _handle_packet(self, packet):
         """
         Handles the received packet.
         :param packet: a RCONPacket
         """
-        logger.info(f"received packet {packet!r}")
+        tracer = self._rcon_server.tracer
+        if tracer is not None:
+            tracer.trace("received", self, packet)
 
         # Handling of empty SERVERDATA_RESPONSE_VALUE packages precedes everything.
         if (self._state != "closed"
                 and packet.body == ""
                 and packet.type == RCONPacket.SERVERDATA_RESPONSE_VALUE):
-            logger.info("empty packet received")
+            logger.debug("empty packet received")
             self._handle_empty_response_value(packet)
             return
 
         if self._state == "unauthenticated":
             # First packet needs to be a authentication packet
             if packet.type == RCONPacket.SERVERDATA_AUTH:
+                limiter = self._rcon_server.auth_limiter
+                if limiter is None:
+                    ip = None
+                else:
+                    ip = self.peer_ip
+                    if not limiter.allow(ip):
+                        logger.info("login attempt rejected")
+                        self.close_connection()
+                        return
                 if self._rcon_server.check_password(packet.body):
                     self._handle_correct_login(packet)
+                    if limiter is not None:
+                        limiter.success(ip)
                 else:
                     logger.info("incorrect login received")
                     self._handle_incorrect_login(packet)
+                    if limiter is not None and limiter.failure(ip):
+                        logger.warning("banned %s after failed logins", ip)
+                        self.close_connection()
             else:
                 #invalid packet, close connection?
                 self.close_connection()
@@ -101,7 +467,7 @@ class RCONConnection(asyncio.Protocol):
         elif self._state == "authenticated":
             # only valid packet shoud be an SERVERDATA_EXECCOMMAND
             if packet.type == RCONPacket.SERVERDATA_EXECCOMMAND:
-                self._rcon_server.handle_execcommand(packet, self)
+                self._handle_execcommand(packet)
             else:
                 #invalid packet, close connection?
                 self.close_connection()
@@ -126,12 +492,11 @@ class RCONConnection(asyncio.Protocol):
         assert packet.type == RCONPacket.SERVERDATA_RESPONSE_VALUE
         assert packet.body == ""
 
-        first_packet = RCONPacket(packet.id,
-                                  RCONPacket.SERVERDATA_RESPONSE_VALUE,
-                                  body="")
-        second_packet = RCONPacket(packet.id,
-                                   RCONPacket.SERVERDATA_RESPONSE_VALUE,
-                                   body="\x00\x00\x00\x01\x00\x00\x00\x00")
+        first_packet = RCONPacket._from_trusted(
+                packet.id, RCONPacket.SERVERDATA_RESPONSE_VALUE, body="")
+        second_packet = RCONPacket._from_trusted(
+                packet.id, RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                body="\x00\x00\x00\x01\x00\x00\x00\x00")
         self.send_packet(first_packet)
         self.send_packet(second_packet)
 
@@ -145,15 +510,17 @@ class RCONConnection(asyncio.Protocol):
 
         id = packet.id
         # send empty SERVERDATA_RESPONSE_VALUE
-        response_value = RCONPacket(id, RCONPacket.SERVERDATA_RESPONSE_VALUE,
-                                    "")
+        response_value = RCONPacket._from_trusted(
+                id, RCONPacket.SERVERDATA_RESPONSE_VALUE, "")
         # send SERVERDATA_AUTH_RESPONSE
-        auth_response = RCONPacket(id, RCONPacket.SERVERDATA_AUTH_RESPONSE,
-                                   "")
+        auth_response = RCONPacket._from_trusted(
+                id, RCONPacket.SERVERDATA_AUTH_RESPONSE, "")
         self.send_packet(response_value)
         self.send_packet(auth_response)
-        self._state = "authenticated"
+        self._set_state("authenticated")
         logger.info("connection authenticated")
+        if self._rcon_server.metrics is not None:
+            self._rcon_server.metrics.login_successes += 1
 
     def _handle_incorrect_login(self, packet):
         """
@@ -164,14 +531,79 @@ class RCONConnection(asyncio.Protocol):
 
         id = packet.id
         # send empty SERVERDATA_RESPONSE_VALUE
-        response_value = RCONPacket(id, RCONPacket.SERVERDATA_RESPONSE_VALUE,
-                                    "")
+        response_value = RCONPacket._from_trusted(
+                id, RCONPacket.SERVERDATA_RESPONSE_VALUE, "")
         # send a SERVERDATA_AUTH_RESPONSE with id=-1
-        auth_response = RCONPacket(-1, RCONPacket.SERVERDATA_AUTH_RESPONSE,
-                                   "")
+        auth_response = RCONPacket._from_trusted(
+                -1, RCONPacket.SERVERDATA_AUTH_RESPONSE, "")
         self.send_packet(response_value)
         self.send_packet(auth_response)
         logger.warning("incorrect authentication")
+        if self._rcon_server.metrics is not None:
+            self._rcon_server.metrics.login_failures += 1
+
+    def _set_state(self, state):
+        """Changes the state and updates the connection registry."""
+        if state != self._state:
+            old_state = self._state
+            self._state = state
+            self._rcon_server.connections.update_state(self, old_state, state)
+            if self._created is not None:
+                self._schedule_timeout()
+
+    def _timeout_deadline(self):
+        """
+        :return: the time at which the connection times out in its current
+        state or None if no timeout applies.
+        """
+        server = self._rcon_server
+        deadlines = []
+        if server.max_lifetime is not None:
+            deadlines.append(self._created + server.max_lifetime)
+        if self._state == "unauthenticated":
+            if server.login_timeout is not None:
+                deadlines.append(self._created + server.login_timeout)
+        elif self._state == "authenticated":
+            if server.idle_timeout is not None:
+                deadlines.append(self._last_activity + server.idle_timeout)
+        return min(deadlines) if deadlines else None
+
+    def _schedule_timeout(self):
+        """Schedules the next timeout check at the server's timer wheel."""
+        wheel = self._rcon_server.timer_wheel
+        deadline = None
+        if self._state != "closed":
+            deadline = self._timeout_deadline()
+        if deadline is None:
+            wheel.cancel(self)
+        else:
+            wheel.schedule(self, deadline)
+
+    def _check_timeout(self, now):
+        """
+        Called by the timer wheel when the scheduled deadline has passed.
+        Closes the connection if it has timed out, otherwise the check is
+        scheduled again, e.g. when data was received in the meantime.
+        """
+        if self._state == "closed":
+            return
+        if self._tasks and self._rcon_server.idle_timeout is not None:
+            # a running command handler counts as activity
+            self._last_activity = now
+        deadline = self._timeout_deadline()
+        if deadline is not None and deadline <= now:
+            logger.info("connection timed out")
+            self.close_connection()
+        else:
+            self._schedule_timeout()
+
+    @property
+    def peer_ip(self):
+        """:return: the ip of the client or None if it is not known."""
+        peername = self._transport.get_extra_info("peername")
+        if peername is None:
+            return None
+        return peername[0]
 
     @property
     def state(self):
@@ -184,7 +616,85 @@ class RCONConnection(asyncio.Protocol):
     def send_packet(self, packet):
         """
         Sends the given packet.
-        :param packet: a RCONPacket.
+        A RCONPacket is copied, so it may be changed and sent again while the
+        connection is corked. RCONMessages and encoded responses are encoded
+        when they are written to the transport, so they should not be changed
+        afterwards.
+        :param packet: a RCONPacket, a RCONMessage or an encoded response.
+        """
+        tracer = self._rcon_server.tracer
+        if tracer is not None:
+            tracer.trace("sent", self, packet)
+        if isinstance(packet, RCONPacket):
+            packet = RCONPacket._from_trusted(packet._id, packet._type,
+                                              packet._body)
+        slot = _current_slot.get()
+        if slot is not None and slot.connection is self:
+            # earlier responses are still pending
+            slot.output.append(packet)
+            return
+        self._output.append(packet)
+        self._output_size += encoded_size((packet,))
+        if not self._corked:
+            self.flush()
+        else:
+            self._flush_above_high_water()
+
+    def _flush_above_high_water(self):
+        """
+        Flushes the collected output while the connection is corked if the
+        output and the write buffer of the transport are above the high
+        water mark. The transport pauses writing then and no further
+        requests of the batch are handled.
         """
-        logger.info(f"sending packet {packet!r}")
-        self._transport.write(packet.msg())
+        high = self._write_high_water
+        if high is not None and (self._output_size
+                                 + self._transport.get_write_buffer_size()
+                                 > high):
+            self.flush()
+
+    def cork(self):
+        """
+        Corks the connection. Packets send while the connection is corked
+        are collected and written when the connection is uncorked or flushed.
+        Calls to cork can be nested, each needs a matching call to uncork.
+        """
+        self._corked += 1
+
+    def uncork(self):
+        """
+        Uncorks the connection. If this was the outermost cork all collected
+        packets are written.
+        """
+        assert self._corked > 0, "uncork called without cork"
+        self._corked -= 1
+        if not self._corked:
+            self.flush()
+
+    def flush(self):
+        """
+        Encodes all collected packets into one buffer and writes it to the
+        transport with a single write.
+        Nothing is written if the connection is closed.
+        """
+        if not self._output:
+            return
+        output = self._output
+        self._output = []
+        self._output_size = 0
+        if self._state == "closed":
+            return
+        data = encode(output)
+        metrics = self._rcon_server.metrics
+        if metrics is not None:
+            metrics.bytes_out += len(data)
+        recorder = self._rcon_server.recorder
+        if recorder is not None:
+            self._record(recorder, FROM_SERVER, data)
+        self._transport.write(data)
+
+    def _record(self, recorder, direction, data=b""):
+        """Records the *data* with the capture id of the connection."""
+        if self.capture_id is None:
+            self.capture_id = recorder.next_connection_id()
+        recorder.record(self.capture_id, direction, data)
@@ -0,0 +1,95 @@
+from .rcon_packet import RCONPacket
+from .util import HEADER, MAX_PACKET_SIZE
+
+
+class RCONDecoder:
+    """
+    An incremental decoder for a stream of RCONPackets.
+
+    Received data is appended to a growable bytearray. Decoded packets are
+    consumed by moving a read offset forward instead of slicing the buffer,
+    so every received byte is copied only once into the buffer.
+    The consumed part at the start of the buffer is only removed from time
+    to time (see *compact_threshold*).
+    """
+
+    def __init__(self, compact_threshold=65536):
+        """
+        Creates a new, empty RCONDecoder.
+
+        :param compact_threshold: int, the number of consumed bytes after
+        which the buffer is compacted. The buffer is also compacted whenever
+        all buffered data is consumed.
+        """
+        self._buffer = bytearray()
+        self._offset = 0
+        self._compact_threshold = compact_threshold
+
+    def feed(self, data):
+        """
+        Appends the received *data* to the buffer.
+
+        :param data: bytes, the received data
+        """
+        self._buffer += data
+
+    def __len__(self):
+        """:return: the number of buffered bytes which are not consumed yet."""
+        return len(self._buffer) - self._offset
+
+    def next_packet(self):
+        """
+        Tries to decode the next packet from the buffer.
+
+        :return: a RCONPacket if a whole packet was buffered, None otherwise.
+        Raises a ValueError if the packet is invalid, e.g. larger than
+        MAX_PACKET_SIZE.
+        """
+        buffer = self._buffer
+        offset = self._offset
+        available = len(buffer) - offset
+
+        if available < HEADER.size:
+            return None
+
+        size, id, type = HEADER.unpack_from(buffer, offset)
+        assert size >= 10, "Packet size can not be smaller than 10"
+        if size > MAX_PACKET_SIZE:
+            # the rest of the stream can not be decoded, so the packet is
+            # rejected before its body is buffered
+            raise ValueError(f"packet size {size} is larger than "
+                             f"{MAX_PACKET_SIZE}")
+
+        # the size field is not included in size
+        end = offset + 4 + size
+        if len(buffer) < end:
+            return None
+
+        with memoryview(buffer) as view:
+            # -2 for the 2 \x00 at the end
+            body = str(view[offset + HEADER.size:end - 2], "ascii")
+
+        # the packet is consumed even if it is invalid
+        self._offset = end
+        self._compact()
+
+        if type not in RCONPacket._VALID_TYPES:
+            raise ValueError(f"{type!r} is not a valid value.")
+        return RCONPacket._from_trusted(id, type, body)
+
+    def __iter__(self):
+        """:return: an iterator over all completely buffered packets."""
+        while True:
+            packet = self.next_packet()
+            if packet is None:
+                return
+            yield packet
+
+    def _compact(self):
+        """Removes the consumed bytes from the start of the buffer."""
+        if self._offset == len(self._buffer):
+            self._buffer.clear()
+            self._offset = 0
+        elif self._offset >= self._compact_threshold:
+            del self._buffer[:self._offset]
+            self._offset = 0
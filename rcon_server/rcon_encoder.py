@@ -0,0 +1,68 @@
+from .util import ID
+
+
+class EncodedResponse(bytearray):
+    """
+    An already encoded response which knows the offsets of its id fields.
+    The ids at these offsets are the id of the request, so e.g. the
+    ResponseCache can replace them with the id of a later request.
+    """
+
+    def __init__(self, data, id_offsets):
+        super().__init__(data)
+        self.id_offsets = id_offsets
+
+    def with_id(self, id):
+        """:return: a copy of the response with all id fields set to *id*."""
+        response = EncodedResponse(self, self.id_offsets)
+        for offset in self.id_offsets:
+            ID.pack_into(response, offset, id)
+        return response
+
+
+def encoded_size(items):
+    """
+    :return: the number of bytes needed to encode all *items*.
+    :param items: an iterable of RCONPackets, RCONMessages or already encoded
+    bytes.
+    """
+    size = 0
+    for item in items:
+        if isinstance(item, (bytes, bytearray, memoryview)):
+            size += len(item)
+        else:
+            size += item.wire_size
+    return size
+
+
+def encode_into(items, buffer, offset=0):
+    """
+    Encodes all *items* directly after each other into *buffer*.
+
+    :param items: an iterable of RCONPackets, RCONMessages or already encoded
+    bytes.
+    :param buffer: a writable buffer with at least encoded_size(items) bytes
+    left after *offset*.
+    :param offset: int, the position of the first byte to write.
+    :return: the offset directly after the last written byte.
+    """
+    for item in items:
+        if isinstance(item, (bytes, bytearray, memoryview)):
+            end = offset + len(item)
+            buffer[offset:end] = item
+            offset = end
+        else:
+            offset = item.msg_into(buffer, offset)
+    return offset
+
+
+def encode(items):
+    """
+    Encodes all *items* into a single preallocated bytearray.
+
+    :param items: a list of RCONPackets, RCONMessages or already encoded bytes.
+    :return: a bytearray.
+    """
+    buffer = bytearray(encoded_size(items))
+    encode_into(items, buffer)
+    return buffer
@@ -0,0 +1,103 @@
+import asyncio
+import functools
+
+from .rcon_server import supervise
+from .rcon_timer import TimerWheel
+from .rcon_connection import RCONConnection
+
+
+class RCONHost:
+    """
+    Runs many RCONServers in one event loop, e.g. dozens of fake game
+    servers with different ports, passwords and handlers for tests.
+
+    The servers share the event loop and the codec. The servers with
+    timeouts share one timer wheel and, if the host has metrics, the servers
+    without own metrics count into the metrics of the host.
+    With more than one worker the servers are spread over a few processes.
+    """
+
+    def __init__(self, servers=(), metrics=None, timer_resolution=1.0):
+        """
+        :param servers: an iterable of RCONServers to host.
+        :param metrics: a ServerMetrics shared by the servers which have no
+        metrics or None.
+        :param timer_resolution: seconds, the granularity of the shared timer
+        wheel of the timeouts.
+        """
+        self.servers = []
+        self.metrics = metrics
+        self.timer_wheel = TimerWheel(RCONConnection._check_timeout,
+                                      resolution=timer_resolution)
+        for server in servers:
+            self.add(server)
+
+    def add(self, server):
+        """
+        Adds the RCONServer *server*. If the host is started already the
+        server has to be started with its start method.
+        :return: the server
+        """
+        if server.metrics is None:
+            server.metrics = self.metrics
+        if server.timer_wheel is not None:
+            server.timer_wheel = self.timer_wheel
+        self.servers.append(server)
+        return server
+
+    async def start(self):
+        """Starts listening with all servers which are not started yet."""
+        await asyncio.gather(*(server.start() for server in self.servers
+                               if server.address is None))
+
+    async def close(self):
+        """Stops all servers and closes their connections."""
+        await asyncio.gather(*(server.close() for server in self.servers))
+        self.timer_wheel.close()
+
+    async def serve_forever(self):
+        """Starts all servers and handles requests until cancelled."""
+        await self.start()
+        try:
+            await asyncio.Future()
+        finally:
+            await self.close()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def addresses(self):
+        """:return: a list of the (address, port) of the started servers."""
+        return [server.address for server in self.servers]
+
+    def run(self, workers=1, restart_delay=1.0, max_restart_delay=60.0):
+        """
+        Runs all servers until the process is interrupted.
+
+        With more than one worker, *workers* processes are forked and every
+        server runs in exactly one of them (server i in worker
+        i % workers). The servers need fixed ports then. Crashed workers
+        are restarted with an exponential backoff, see supervise.
+
+        :param workers: int, the number of worker processes.
+        :param restart_delay: float, seconds to wait before a crashed worker
+        is restarted the first time.
+        :param max_restart_delay: float, the maximum seconds to wait before
+        a worker which crashes again is restarted.
+        """
+        workers = min(workers, len(self.servers))
+        if workers <= 1:
+            asyncio.run(self.serve_forever())
+            return
+        supervise(functools.partial(self._run_worker, workers=workers),
+                  workers, restart_delay, max_restart_delay)
+
+    def _run_worker(self, number, workers):
+        """Runs the servers of the worker *number* of *run*."""
+        host = RCONHost(self.servers[number::workers], self.metrics,
+                        self.timer_wheel.resolution)
+        asyncio.run(host.serve_forever())
@@ -1,11 +1,22 @@
 from .rcon_packet import RCONPacket
+from .rcon_encoder import encode, encode_into
+from .util import HEADER
 
 
 class RCONMessage:
     """
     A RCONMessage represents a message which may consist of multiple packets.
+
+    A message which is created from a body only stores the encoded body.
+    The packets are built lazily from it when they are iterated over or
+    when the *packets* attribute is used. Encoding the message writes the
+    packets directly from the encoded body, so a large body is not copied
+    into one RCONPacket per 4086 bytes.
     """
 
+    # maximum packet size is 4096 - 10 bytes (id, type, 2x terminator)
+    MAX_BODY_SIZE = 4086
+
     def __init__(self, packet=None, id=None, type=None, body=None):
         """
         creates a new RCONMessage object.
@@ -27,6 +38,10 @@ class RCONMessage:
         :param body: str, the body of the message, a regular python string,
         not a bytearray.
         """
+        self._packets = None
+        self._header = None  # holds id and type if the body is stored
+        self._encoded_body = None
+
         if packet is not None:  # build the message from packets
 
             # other parameters should not be set
@@ -56,9 +71,28 @@ class RCONMessage:
             assert type is not None, "type parameter should be set if no packet is given"
             assert body is not None, "body parameter should be set if no packet is given"
 
-            self.packets = [RCONPacket(id=id, type=type, body="")]
-            self.body = body  # call the body via the property to make sure that
-                              # it is split over multiple packets
+            # the header packet validates id and type
+            self._header = RCONPacket(id=id, type=type, body="")
+            self.body = body
+
+    @property
+    def packets(self):
+        """
+        The list of RCONPackets of this message.
+        If the message stores its body the packets are built on first use.
+        Afterwards the message consists of this list of packets.
+        """
+        if self._packets is None:
+            self._packets = list(self._iter_body())
+            self._header = None
+            self._encoded_body = None
+        return self._packets
+
+    @packets.setter
+    def packets(self, value):
+        self._packets = value
+        self._header = None
+        self._encoded_body = None
 
     def add_packet(self, packet):
         """
@@ -70,33 +104,109 @@ class RCONMessage:
 
         self.packets.append(packet)
 
+    def _chunks(self):
+        """
+        :return: a generator over the (start, end) offsets of the packet
+        bodies in the encoded body. There is always at least one chunk.
+        """
+        length = len(self._encoded_body)
+        max_size = self.MAX_BODY_SIZE
+        yield (0, min(max_size, length))
+        for start in range(max_size, length, max_size):
+            yield (start, min(start + max_size, length))
+
+    def _iter_body(self):
+        """:return: a generator which builds the packets from the stored body."""
+        id = self._header.id
+        type = self._header.type
+        encoded_body = self._encoded_body
+        for start, end in self._chunks():
+            yield RCONPacket._from_trusted(
+                    id, type, encoded_body[start:end].decode("ascii"))
+
     def __iter__(self):
         """Returns an iterator over the packets.
         The iterator has always at least one packet (which may be empty)."""
-        return iter(self.packets)
+        if self._packets is None:
+            return self._iter_body()
+        return iter(self._packets)
+
+    def iter_msg(self):
+        """
+        :return: a generator over the encoded packets of the message.
+        Each packet is encoded when it is requested.
+        """
+        if self._packets is not None:
+            for packet in self._packets:
+                yield packet.msg()
+            return
+
+        id = self._header.id
+        type = self._header.type
+        with memoryview(self._encoded_body) as view:
+            for start, end in self._chunks():
+                chunk = bytearray(end - start + 14)
+                HEADER.pack_into(chunk, 0, end - start + 10, id, type)
+                chunk[12:-2] = view[start:end]
+                yield bytes(chunk)
 
     def msg(self):
         """Return the whole message as a bytearray."""
-        return b"".join(p.msg() for p in self.packets)
+        return encode([self])
+
+    def msg_into(self, buffer, offset=0):
+        """
+        Writes all packets of the message into *buffer* at *offset*.
+        The buffer needs to have at least wire_size bytes left after
+        *offset*.
+
+        :param buffer: a writable buffer, e.g. a bytearray or memoryview.
+        :param offset: int, the position of the first byte of the message.
+        :return: the offset directly after the message.
+        """
+        if self._packets is not None:
+            return encode_into(self._packets, buffer, offset)
+
+        id = self._header.id
+        type = self._header.type
+        with memoryview(self._encoded_body) as view:
+            for start, end in self._chunks():
+                HEADER.pack_into(buffer, offset, end - start + 10, id, type)
+                offset += 12
+                body_end = offset + end - start
+                buffer[offset:body_end] = view[start:end]
+                buffer[body_end:body_end+2] = b"\x00\x00"
+                offset = body_end + 2
+        return offset
 
     @property
     def id(self):
         """The id of the RCONPackets"""
-        return self.packets[0].id
+        if self._packets is None:
+            return self._header.id
+        return self._packets[0].id
 
     @id.setter
     def id(self, value):
-        for packet in self.packets:
+        if self._packets is None:
+            self._header.id = value
+            return
+        for packet in self._packets:
             packet.id = value
 
     @property
     def type(self):
         """The type of the RCONPackets"""
-        return self.packets[0].type
+        if self._packets is None:
+            return self._header.type
+        return self._packets[0].type
 
     @type.setter
     def type(self, value):
-        for packet in self.packets:
+        if self._packets is None:
+            self._header.type = value
+            return
+        for packet in self._packets:
             packet.type = value
 
     @property
@@ -105,34 +215,47 @@ class RCONMessage:
         Returns the body of the message. This is the body of all packets joined
         together.
         """
-        return "".join(p.body for p in self.packets)
+        if self._packets is None:
+            return self._encoded_body.decode("ascii")
+        return "".join(p.body for p in self._packets)
 
     @body.setter
     def body(self, value):
         """
         sets the body of the RCONMessage.
-        This may lead to adding/removing packets to/from the message.
+        The body is stored encoded and split into packets when they are
+        needed.
         """
-        # maximum packet size is 4096 - 10 bytes (id, type, 2x terminator)
-        max_size = 4086
+        if not isinstance(value, str):
+            raise ValueError("body needs to be a string.")
+        encoded_body = value.encode("ascii")
 
-        id = self.packets[0].id
-        type = self.packets[0].type
+        if self._packets is not None:
+            self._header = RCONPacket(id=self.id, type=self.type, body="")
+            self._packets = None
+        self._encoded_body = encoded_body
 
-        packets = list()
-        while True:
-            next_size = min(max_size, len(value))
-            packets.append(RCONPacket(id=id, type=type, body=value[0:next_size]))
-            value = value[next_size:]
-            if len(value) == 0:
-                break
-        self.packets = packets
+    @property
+    def num_packets(self):
+        """The number of packets in this message."""
+        if self._packets is None:
+            return max(1, -(-len(self._encoded_body) // self.MAX_BODY_SIZE))
+        return len(self._packets)
 
     @property
     def size(self):
         """The sum of all packets in this message."""
-        return sum(p.size for p in self.packets)
+        if self._packets is None:
+            return len(self._encoded_body) + 10 * self.num_packets
+        return sum(p.size for p in self._packets)
+
+    @property
+    def wire_size(self):
+        """The number of bytes of all encoded packets in this message."""
+        if self._packets is None:
+            return len(self._encoded_body) + 14 * self.num_packets
+        return sum(p.wire_size for p in self._packets)
 
     def __repr__(self):
         return f"<RCONMessage type={self.type}, id={self.id},"\
-               f"body={self.body}, num_packets={len(self.packets)}>"
+               f"body={self.body}, num_packets={self.num_packets}>"
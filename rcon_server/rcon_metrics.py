@@ -0,0 +1,135 @@
+import math
+
+
+class LatencyHistogram:
+    """
+    A histogram of latencies with fixed logarithmic buckets.
+
+    Bucket i counts the latencies below 2**i microseconds (and at least
+    2**(i-1) microseconds), the first bucket everything below 1 microsecond
+    and the last bucket everything above. No samples are stored.
+    """
+
+    NUM_BUCKETS = 28  # the last regular bound is 2**26 us, about 67 seconds
+
+    def __init__(self):
+        self.counts = [0] * self.NUM_BUCKETS
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, seconds):
+        """Adds a latency of *seconds*."""
+        # frexp returns the exponent e with 2**(e-1) <= x < 2**e
+        bucket = math.frexp(seconds * 1e6)[1]
+        if bucket < 0:
+            bucket = 0
+        elif bucket >= self.NUM_BUCKETS:
+            bucket = self.NUM_BUCKETS - 1
+        self.counts[bucket] += 1
+        self.count += 1
+        self.sum += seconds
+
+    @classmethod
+    def upper_bound(cls, bucket):
+        """:return: the upper bound of the *bucket* in seconds."""
+        if bucket == cls.NUM_BUCKETS - 1:
+            return math.inf
+        return 2 ** bucket / 1e6
+
+    def percentile(self, fraction):
+        """
+        :return: the upper bound in seconds of the bucket which contains the
+        latency at *fraction* (0..1) or None if nothing was recorded.
+        """
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        total = 0
+        for bucket, count in enumerate(self.counts):
+            total += count
+            if total >= rank and count:
+                return self.upper_bound(bucket)
+        return self.upper_bound(self.NUM_BUCKETS - 1)
+
+    def snapshot(self):
+        """:return: a dict with the non empty buckets, count and sum."""
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": [(self.upper_bound(bucket), count)
+                        for bucket, count in enumerate(self.counts) if count],
+            "p50": self.percentile(0.5),
+            "p99": self.percentile(0.99),
+        }
+
+
+class CommandStats:
+    """The counters and the latency histogram of one command name."""
+
+    __slots__ = ("count", "errors", "latency")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.latency = LatencyHistogram()
+
+    def snapshot(self):
+        return {"count": self.count,
+                "errors": self.errors,
+                "latency": self.latency.snapshot()}
+
+
+class ServerMetrics:
+    """
+    Counters of a RCONServer.
+
+    It counts the commands per command name (the first word of the command)
+    with their errors and handler latencies, the received and sent bytes
+    and the successful and failed logins.
+    Metrics are only collected if an instance is given to the RCONServer.
+    """
+
+    # commands after this number of distinct names are counted as "other"
+    MAX_COMMAND_NAMES = 1000
+
+    def __init__(self):
+        self.commands = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.login_successes = 0
+        self.login_failures = 0
+
+    def command_stats(self, command):
+        """:return: the CommandStats for the name of the *command*."""
+        name = command.split(None, 1)[0] if command.strip() else ""
+        stats = self.commands.get(name)
+        if stats is None:
+            if len(self.commands) >= self.MAX_COMMAND_NAMES:
+                name = "other"
+                stats = self.commands.get(name)
+            if stats is None:
+                stats = self.commands[name] = CommandStats()
+        return stats
+
+    def record_command(self, command, seconds, error=False):
+        """
+        Records a handled *command*.
+        :param seconds: the runtime of the handler.
+        :param error: True if the handler raised an exception.
+        """
+        stats = self.command_stats(command)
+        stats.count += 1
+        if error:
+            stats.errors += 1
+        stats.latency.record(seconds)
+
+    def snapshot(self):
+        """:return: all counters as a dict."""
+        return {
+            "commands": {name: stats.snapshot()
+                         for name, stats in self.commands.items()},
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "logins": {"successes": self.login_successes,
+                       "failures": self.login_failures},
+        }
@@ -1,4 +1,4 @@
-from .util import to_int32, from_int32, check_int32
+from .util import HEADER, from_int32, check_int32
 
 class RCONPacket():
 
@@ -15,13 +15,31 @@ class RCONPacket():
 
     PACKET_TYPES = [SERVERDATA_AUTH, SERVERDATA_AUTH_RESPONSE,
                     SERVERDATA_EXECCOMMAND, SERVERDATA_RESPONSE_VALUE]
+    _VALID_TYPES = frozenset(PACKET_TYPES)
+
+    terminator = b"\x00"
+
+    __slots__ = ("_id", "_type", "_body")
 
     def __init__(self, id=0, type=0, body=""):
         """Creates a RCON packet."""
         self.id = id
         self.type = type
         self.body = body
-        self.terminator = b"\x00"
+
+    @classmethod
+    def _from_trusted(cls, id, type, body):
+        """
+        Creates a RCON packet without validating the values.
+        This is only used internally for values which are known to be valid,
+        e.g. decoded from the 32 bit fields of a received packet or copied
+        from an other packet.
+        """
+        packet = cls.__new__(cls)
+        packet._id = id
+        packet._type = type
+        packet._body = body
+        return packet
 
     @classmethod
     def from_buffer(cls, buffer):
@@ -46,7 +64,9 @@ class RCONPacket():
                 # +4 for the size, -2 for the 2 \x00 at the end
                 body = buffer[12:size+4-2].decode("ascii")
                 remaining_buffer = buffer[size+4:]
-                packet = cls(id, type, body)
+                if type not in cls._VALID_TYPES:
+                    raise ValueError(f"{type!r} is not a valid value.")
+                packet = cls._from_trusted(id, type, body)
                 return (packet, remaining_buffer)
 
         return (None, buffer)
@@ -104,18 +124,39 @@ class RCONPacket():
         # X body
         # 1 terminator for body
         # 1 terminator of the packet
-        return 4 + 4 + len(self._body) + 2*len(self.terminator)
+        return 10 + len(self._body)
+
+    @property
+    def wire_size(self):
+        """Return the number of bytes of the encoded packet.
+        This is the size plus the 4 bytes of the size field."""
+        return 14 + len(self._body)
 
     def msg(self):
         """
         Returns a bytearray which may consist of multiple RCONPackets
         directly after each other if the body is to large for one packet.
         """
-        size = to_int32(self.size)
-        id = to_int32(self.id)
-        type = to_int32(self._type)
+        return (HEADER.pack(10 + len(self._body), self._id, self._type)
+                + self._body.encode("ascii") + b"\x00\x00")
 
-        return size + id + type + self._body.encode("ascii") + self.terminator + self.terminator
+    def msg_into(self, buffer, offset=0):
+        """
+        Writes the encoded packet into *buffer* at *offset*.
+        The buffer needs to have at least wire_size bytes left after
+        *offset*.
+
+        :param buffer: a writable buffer, e.g. a bytearray or memoryview.
+        :param offset: int, the position of the first byte of the packet.
+        :return: the offset directly after the packet.
+        """
+        body = self._body.encode("ascii")
+        HEADER.pack_into(buffer, offset, 10 + len(body), self._id, self._type)
+        offset += 12
+        end = offset + len(body)
+        buffer[offset:end] = body
+        buffer[end:end+2] = b"\x00\x00"
+        return end + 2
 
     def __repr__(self):
         return f"<RCONPacket type={self.type}, id={self.id}, body={self.body}>"
@@ -0,0 +1,280 @@
+import asyncio
+import collections
+import contextlib
+import threading
+import time
+
+from .rcon_client import RCONClient
+from .rcon_async_client import AsyncRCONClient
+
+
+class PoolTimeout(Exception):
+    """
+    Exception which is thrown when no connection could be checked out of a
+    pool within the checkout timeout.
+    """
+    pass
+
+
+class _BasePool:
+    """The bookkeeping which is shared by the sync and the async pool."""
+
+    def __init__(self, max_size=4, idle_timeout=60, checkout_timeout=10,
+                 clock=time.monotonic):
+        """
+        :param max_size: int, the maximum number of connections per
+        (ip, port, password).
+        :param idle_timeout: float, seconds after which an unused connection
+        is closed.
+        :param checkout_timeout: float, seconds to wait for a free connection
+        if *max_size* connections are in use.
+        :param clock: a function which returns the current time in seconds.
+        """
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self._clock = clock
+
+        self._idle = collections.defaultdict(list)  # key -> [(client, time)]
+        self._sizes = collections.Counter()  # key -> number of connections
+        self._keys = {}  # client -> key
+
+    def _take_idle(self, key):
+        """
+        :return: the most recently used idle connection for *key* which is
+        neither expired nor broken, or None. Other connections are closed.
+        """
+        idle = self._idle[key]
+        expired = self._clock() - self.idle_timeout
+        while idle:
+            client, returned = idle.pop()
+            if returned > expired and self._is_healthy(client):
+                return client
+            self._forget(client)
+            self._close(client)
+        return None
+
+    def _forget(self, client):
+        """Removes the *client* from the pool."""
+        key = self._keys.pop(client)
+        self._sizes[key] -= 1
+
+    def _put_idle(self, client):
+        """Adds the *client* to the idle connections."""
+        self._idle[self._keys[client]].append((client, self._clock()))
+
+    def _idle_clients(self):
+        """:return: a list of all idle connections and forgets them."""
+        clients = [client for idle in self._idle.values()
+                   for client, _ in idle]
+        self._idle.clear()
+        for client in clients:
+            self._forget(client)
+        return clients
+
+    def size(self, ip, port, password):
+        """:return: the number of connections in use or idle for the server."""
+        return self._sizes[(ip, port, password)]
+
+
+class RCONClientPool(_BasePool):
+    """
+    A thread safe pool of authenticated RCONClients.
+
+    The connections are kept per (ip, port, password). A connection which
+    raised an exception while it was checked out is not reused.
+
+    Usage::
+
+        pool = RCONClientPool()
+        with pool.connection("127.0.0.1", 27015, "password") as client:
+            client.send_command("status")
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._condition = threading.Condition()
+
+    @contextlib.contextmanager
+    def connection(self, ip, port, password):
+        """
+        A context manager which checks out an authenticated RCONClient and
+        returns it to the pool afterwards. If an exception is raised the
+        connection is closed instead.
+        """
+        client = self.checkout(ip, port, password)
+        try:
+            yield client
+        except BaseException:
+            self.discard(client)
+            raise
+        else:
+            self.checkin(client)
+
+    def checkout(self, ip, port, password):
+        """
+        :return: an authenticated RCONClient. Either an idle one or a new one.
+        Raises a PoolTimeout if *max_size* connections are in use for longer
+        than the checkout timeout.
+        """
+        key = (ip, port, password)
+        deadline = self._clock() + self.checkout_timeout
+        with self._condition:
+            while True:
+                client = self._take_idle(key)
+                if client is not None:
+                    return client
+                if self._sizes[key] < self.max_size:
+                    self._sizes[key] += 1
+                    break
+                remaining = deadline - self._clock()
+                if remaining <= 0:
+                    raise PoolTimeout(f"no free connection to {ip}:{port}")
+                self._condition.wait(remaining)
+
+        client = RCONClient(ip, port, password)
+        try:
+            client.connect()
+            client.login()
+        except BaseException:
+            with self._condition:
+                self._sizes[key] -= 1
+                self._condition.notify()
+            self._close(client)
+            raise
+        with self._condition:
+            self._keys[client] = key
+        return client
+
+    def checkin(self, client):
+        """Returns the *client* to the pool."""
+        with self._condition:
+            self._put_idle(client)
+            self._condition.notify()
+
+    def discard(self, client):
+        """Closes the *client* and removes it from the pool."""
+        with self._condition:
+            self._forget(client)
+            self._condition.notify()
+        self._close(client)
+
+    def close(self):
+        """Closes all idle connections."""
+        with self._condition:
+            clients = self._idle_clients()
+        for client in clients:
+            self._close(client)
+
+    def _is_healthy(self, client):
+        """
+        :return: False if the server has closed the connection or has send
+        unexpected data.
+        """
+        return client.is_connected
+
+    def _close(self, client):
+        client.close()
+
+
+class AsyncRCONClientPool(_BasePool):
+    """
+    A pool of authenticated AsyncRCONClients for one event loop.
+
+    Usage::
+
+        pool = AsyncRCONClientPool()
+        async with pool.connection("127.0.0.1", 27015, "password") as client:
+            await client.send_command("status")
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._condition = None
+
+    @contextlib.asynccontextmanager
+    async def connection(self, ip, port, password):
+        """
+        An async context manager which checks out an authenticated
+        AsyncRCONClient and returns it to the pool afterwards. If an exception
+        is raised the connection is closed instead.
+        """
+        client = await self.checkout(ip, port, password)
+        try:
+            yield client
+        except BaseException:
+            await self.discard(client)
+            raise
+        else:
+            await self.checkin(client)
+
+    @property
+    def _lock(self):
+        # created on first use so that it belongs to the running loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def checkout(self, ip, port, password):
+        """
+        :return: an authenticated AsyncRCONClient. Either an idle one or a new
+        one. Raises a PoolTimeout if *max_size* connections are in use for
+        longer than the checkout timeout.
+        """
+        key = (ip, port, password)
+        deadline = self._clock() + self.checkout_timeout
+        async with self._lock:
+            while True:
+                client = self._take_idle(key)
+                if client is not None:
+                    return client
+                if self._sizes[key] < self.max_size:
+                    self._sizes[key] += 1
+                    break
+                remaining = deadline - self._clock()
+                try:
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError
+                    await asyncio.wait_for(self._lock.wait(), remaining)
+                except asyncio.TimeoutError:
+                    raise PoolTimeout(f"no free connection to {ip}:{port}")
+
+        client = AsyncRCONClient(ip, port, password)
+        try:
+            await client.connect()
+            await client.login()
+        except BaseException:
+            async with self._lock:
+                self._sizes[key] -= 1
+                self._lock.notify()
+            self._close(client)
+            raise
+        self._keys[client] = key
+        return client
+
+    async def checkin(self, client):
+        """Returns the *client* to the pool."""
+        async with self._lock:
+            self._put_idle(client)
+            self._lock.notify()
+
+    async def discard(self, client):
+        """Closes the *client* and removes it from the pool."""
+        async with self._lock:
+            self._forget(client)
+            self._lock.notify()
+        await client.disconnect()
+
+    async def close(self):
+        """Closes all idle connections."""
+        async with self._lock:
+            clients = self._idle_clients()
+        for client in clients:
+            await client.disconnect()
+
+    def _is_healthy(self, client):
+        """:return: False if the connection was closed."""
+        return client.is_connected
+
+    def _close(self, client):
+        client.close()
@@ -0,0 +1,101 @@
+import itertools
+
+
+class ConnectionRegistry:
+    """
+    The registry of the live connections of a RCONServer.
+
+    Every connection gets an id when it is added. The connections are
+    indexed by their id and by their state, so counting and finding the
+    connections of a state does not walk over all connections. The number of
+    connections per client ip is counted for the connections whose ip was
+    set with set_ip.
+    Connections remove themselves when their transport is lost.
+    """
+
+    STATES = ("unauthenticated", "authenticated", "closed")
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self._connections = {}  # id -> connection
+        self._by_state = {state: {} for state in self.STATES}
+        self._ips = {}  # id -> ip
+        self._ip_counts = {}  # ip -> number of connections
+
+    def add(self, connection):
+        """
+        Adds the *connection* and sets its connection_id.
+        :return: the id of the connection.
+        """
+        id = next(self._ids)
+        connection.connection_id = id
+        self._connections[id] = connection
+        self._by_state[connection.state][id] = connection
+        return id
+
+    def remove(self, connection):
+        """Removes the *connection*. Unknown connections are ignored."""
+        id = connection.connection_id
+        if self._connections.pop(id, None) is not None:
+            for connections in self._by_state.values():
+                connections.pop(id, None)
+            ip = self._ips.pop(id, None)
+            if ip is not None:
+                if self._ip_counts[ip] == 1:
+                    del self._ip_counts[ip]
+                else:
+                    self._ip_counts[ip] -= 1
+
+    def update_state(self, connection, old_state, new_state):
+        """Moves the *connection* from the index of *old_state* to *new_state*."""
+        id = connection.connection_id
+        if id not in self._connections:
+            return
+        self._by_state[old_state].pop(id, None)
+        self._by_state[new_state][id] = connection
+
+    def set_ip(self, connection, ip):
+        """Sets the client *ip* of the *connection* once."""
+        id = connection.connection_id
+        if id not in self._connections or id in self._ips or ip is None:
+            return
+        self._ips[id] = ip
+        self._ip_counts[ip] = self._ip_counts.get(ip, 0) + 1
+
+    def count_ip(self, ip):
+        """:return: the number of connections of the client *ip*."""
+        return self._ip_counts.get(ip, 0)
+
+    def get(self, id):
+        """:return: the connection with the *id* or None."""
+        return self._connections.get(id)
+
+    def by_state(self, state):
+        """:return: a list of the connections with the given *state*."""
+        return list(self._by_state[state].values())
+
+    def count(self, state=None):
+        """:return: the number of connections with the *state* or of all."""
+        if state is None:
+            return len(self._connections)
+        return len(self._by_state[state])
+
+    def counts(self):
+        """:return: a dict with the number of connections per state."""
+        return {state: len(connections)
+                for state, connections in self._by_state.items()}
+
+    def snapshot(self):
+        """:return: a list of (id, state) tuples of all connections."""
+        return [(id, connection.state)
+                for id, connection in self._connections.items()]
+
+    def __iter__(self):
+        return iter(list(self._connections.values()))
+
+    def __len__(self):
+        return len(self._connections)
+
+    def __contains__(self, connection):
+        return self._connections.get(
+                getattr(connection, "connection_id", None)) is connection
@@ -0,0 +1,181 @@
+"""
+Replays a traffic capture against a RCON server.
+
+Every connection of the capture is opened again and the data which was
+sent to the server is sent again, at the original speed, N times faster or
+as fast as possible. After every sent chunk the replay waits for as many
+bytes as the server sent back in the capture and compares the latency with
+the original one.
+
+Usage::
+
+    python -m rcon_server.rcon_replay capture.rcap 127.0.0.1 27015 --speed 2
+    python -m rcon_server.rcon_replay capture.rcap 127.0.0.1 27015 --fast
+"""
+import argparse
+import asyncio
+import collections
+import json
+import sys
+
+from .rcon_capture import TrafficCapture, TO_SERVER, FROM_SERVER
+
+# a chunk sent to the server and the response to it in the capture
+Exchange = collections.namedtuple(
+        "Exchange", ("timestamp", "data", "response_size", "latency"))
+
+
+def exchanges(capture):
+    """
+    :return: a dict connection id -> list of Exchanges, in the order of the
+    first record of the connections. Data which the server sent before
+    anything was sent to it is ignored.
+    """
+    connections = {}
+    for record in capture:
+        current = connections.setdefault(record.connection_id, [])
+        if record.direction == TO_SERVER:
+            current.append([record.timestamp, bytes(record.data), 0, None])
+        elif record.direction == FROM_SERVER and current:
+            exchange = current[-1]
+            exchange[2] += len(record.data)
+            exchange[3] = record.timestamp - exchange[0]
+    return {id: [Exchange(*exchange) for exchange in current]
+            for id, current in connections.items() if current}
+
+
+def summary(values):
+    """:return: a dict with count, mean, p50, p99 and max of the *values*."""
+    values = sorted(values)
+    if not values:
+        return {"count": 0, "mean": None, "p50": None, "p99": None,
+                "max": None}
+
+    def percentile(fraction):
+        return values[min(len(values) - 1,
+                          max(0, round(fraction * len(values)) - 1))]
+
+    return {"count": len(values), "mean": sum(values) / len(values),
+            "p50": percentile(0.5), "p99": percentile(0.99),
+            "max": values[-1]}
+
+
+async def _replay_connection(host, port, exchanges, start, first, speed,
+                             timeout, results):
+    """Replays the *exchanges* of one connection."""
+    loop = asyncio.get_running_loop()
+    writer = None
+    try:
+        for exchange in exchanges:
+            if speed:
+                delay = start + (exchange.timestamp - first) / speed \
+                    - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            sent = loop.time()
+            writer.write(exchange.data)
+            received = 0
+            try:
+                while received < exchange.response_size:
+                    data = await asyncio.wait_for(
+                            reader.read(exchange.response_size - received),
+                            timeout)
+                    if not data:
+                        raise ConnectionError("connection closed")
+                    received += len(data)
+            except (asyncio.TimeoutError, ConnectionError) as e:
+                results["errors"].append(repr(e))
+                return
+            if exchange.latency is not None:
+                results["original"].append(exchange.latency)
+                results["replayed"].append(loop.time() - sent)
+    except OSError as e:
+        results["errors"].append(repr(e))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+async def replay(capture, host, port, speed=1.0, timeout=10.0):
+    """
+    Replays the *capture* against the server at *host*:*port*.
+    :param capture: a TrafficCapture.
+    :param speed: float, the speed of the replay relative to the capture or
+    None to replay as fast as possible.
+    :param timeout: float, seconds to wait for a response.
+    :return: a dict with the summaries of the original and replayed
+    latencies and their differences.
+    """
+    if speed is not None and speed <= 0:
+        raise ValueError("speed needs to be > 0 or None")
+    connections = exchanges(capture)
+    if not connections:
+        first = 0
+    else:
+        first = min(connection[0].timestamp
+                    for connection in connections.values())
+    results = {"original": [], "replayed": [], "errors": []}
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await asyncio.gather(*(_replay_connection(host, port, connection, start,
+                                              first, speed, timeout, results)
+                           for connection in connections.values()))
+    deltas = [replayed - original for original, replayed
+              in zip(results["original"], results["replayed"])]
+    return {
+        "connections": len(connections),
+        "duration": loop.time() - start,
+        "original": summary(results["original"]),
+        "replayed": summary(results["replayed"]),
+        "delta": summary(deltas),
+        "errors": len(results["errors"]),
+        "error_samples": results["errors"][:10],
+    }
+
+
+def print_report(report):
+    print(f"connections: {report['connections']}")
+    print(f"duration:    {report['duration']:.3f} s")
+    for name in ("original", "replayed", "delta"):
+        values = report[name]
+        if not values["count"]:
+            continue
+        print(f"{name + ':':12} n={values['count']} "
+              + " ".join(f"{key}={values[key] * 1000:.3f}ms"
+                         for key in ("mean", "p50", "p99", "max")))
+    if report["errors"]:
+        print(f"errors:      {report['errors']} "
+              f"(e.g. {report['error_samples'][0]})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("capture", help="path of the capture data file")
+    parser.add_argument("host")
+    parser.add_argument("port", type=int)
+    speed = parser.add_mutually_exclusive_group()
+    speed.add_argument("--speed", type=float, default=1.0,
+                       help="replay N times faster than captured")
+    speed.add_argument("--fast", action="store_true",
+                       help="replay as fast as possible")
+    parser.add_argument("--timeout", type=float, default=10.0,
+                        help="seconds to wait for a response")
+    parser.add_argument("--output", help="save the report as JSON")
+    args = parser.parse_args(argv)
+
+    with TrafficCapture(args.capture) as capture:
+        report = asyncio.run(replay(capture, args.host, args.port,
+                                    speed=None if args.fast else args.speed,
+                                    timeout=args.timeout))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
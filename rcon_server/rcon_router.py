@@ -0,0 +1,175 @@
+import re
+
+# a numeric backreference or a conditional on a numbered group, both refer to
+# the wrong group in the combined pattern
+_NUMBERED_REFERENCE = re.compile(r"(?<!\\)(?:\\\\)*\\[1-9]|\(\?\(\d")
+
+# the flags of a pattern compiled without flags, other flags are lost in the
+# combined pattern
+_DEFAULT_FLAGS = re.compile("").flags
+
+
+class CommandRouter:
+    """
+    Maps commands to handlers.
+
+    Handlers can be registered for
+    * a command name: the first word of the command,
+    * a prefix of the command,
+    * a regular expression which has to match the whole command.
+
+    The routes are compiled on first use after a change: command names are
+    kept in a dict, prefixes in a trie and all patterns are combined into a
+    single regular expression. A command is routed to the handler of its
+    name first, then to the handler of its longest prefix and then to the
+    first matching pattern.
+
+    A handler is called with the packet, the connection and the arguments of
+    the command: the words after the name, the words after the prefix or the
+    groups of the pattern.
+    """
+
+    def __init__(self):
+        self._commands = {}
+        self._prefixes = {}
+        self._patterns = []
+
+        self._trie = None
+        self._pattern_regex = None
+        self._pattern_groups = None  # pattern index -> slice of its groups
+
+    def add_command(self, name, handler):
+        """
+        Registers the *handler* for the command *name*.
+        :param name: str, the first word of the command.
+        :param handler: a function (or coroutine function) which is called with
+        (packet, connection, args).
+        """
+        self._commands[name] = handler
+
+    def add_prefix(self, prefix, handler):
+        """
+        Registers the *handler* for all commands which start with *prefix*.
+        :param prefix: str, a non empty prefix.
+        :param handler: a function (or coroutine function) which is called with
+        (packet, connection, args).
+        """
+        if not prefix:
+            raise ValueError("prefix needs to be a non empty string.")
+        self._prefixes[prefix] = handler
+        self._trie = None
+
+    def add_pattern(self, pattern, handler):
+        """
+        Registers the *handler* for all commands which match *pattern*.
+        :param pattern: str or a compiled re.Pattern, a regular expression
+        which has to match the whole command.
+        :param handler: a function (or coroutine function) which is called with
+        (packet, connection, args).
+        """
+        self._patterns.append((re.compile(pattern), handler))
+        self._pattern_regex = None
+
+    def command(self, name):
+        """A decorator which registers the decorated function for *name*."""
+        def decorator(handler):
+            self.add_command(name, handler)
+            return handler
+        return decorator
+
+    def prefix(self, prefix):
+        """A decorator which registers the decorated function for *prefix*."""
+        def decorator(handler):
+            self.add_prefix(prefix, handler)
+            return handler
+        return decorator
+
+    def pattern(self, pattern):
+        """A decorator which registers the decorated function for *pattern*."""
+        def decorator(handler):
+            self.add_pattern(pattern, handler)
+            return handler
+        return decorator
+
+    def __bool__(self):
+        """:return: True if any route is registered."""
+        return bool(self._commands or self._prefixes or self._patterns)
+
+    def _compile(self):
+        """Builds the prefix trie and the combined pattern."""
+        if self._trie is None:
+            trie = {}
+            for prefix, handler in self._prefixes.items():
+                node = trie
+                for char in prefix:
+                    node = node.setdefault(char, {})
+                node[None] = (handler, len(prefix))
+            self._trie = trie
+
+        if self._pattern_regex is None and self._patterns:
+            if any(_NUMBERED_REFERENCE.search(p.pattern)
+                   or p.flags != _DEFAULT_FLAGS for p, _ in self._patterns):
+                # the groups are renumbered in the combined regex and it
+                # is compiled without the flags of the patterns
+                self._pattern_regex = False
+                return
+            # each pattern becomes one group of the combined regex.
+            # The outer group ends last so lastgroup names the matching
+            # pattern.
+            combined = "|".join(f"(?P<_route{i}>{p.pattern})"
+                                for i, (p, _) in enumerate(self._patterns))
+            try:
+                regex = re.compile(combined)
+            except re.error:
+                # e.g. the same group name in two patterns, the patterns are
+                # matched one after another then.
+                self._pattern_regex = False
+                return
+            # the groups of a pattern directly follow its outer group
+            groups = []
+            for i, (p, _) in enumerate(self._patterns):
+                start = regex.groupindex[f"_route{i}"]
+                groups.append(slice(start, start + p.groups))
+            self._pattern_groups = groups
+            self._pattern_regex = regex
+
+    def route(self, command):
+        """
+        :return: a tuple (handler, args) for the *command* or None if no
+        handler is registered for it.
+        :param command: str, the body of an EXECCOMMAND packet.
+        """
+        self._compile()
+
+        words = command.split(None, 1)
+        if words:
+            handler = self._commands.get(words[0])
+            if handler is not None:
+                args = words[1].split() if len(words) > 1 else []
+                return (handler, args)
+
+        # find the longest matching prefix
+        found = None
+        node = self._trie
+        for char in command:
+            node = node.get(char)
+            if node is None:
+                break
+            found = node.get(None, found)
+        if found is not None:
+            handler, length = found
+            return (handler, command[length:].split())
+
+        if self._pattern_regex:
+            match = self._pattern_regex.fullmatch(command)
+            if match is not None:
+                index = int(match.lastgroup[6:])
+                return (self._patterns[index][1],
+                        match.groups()[self._pattern_groups[index]])
+        elif self._pattern_regex is False:
+            for pattern, handler in self._patterns:
+                match = pattern.fullmatch(command)
+                if match is not None:
+                    return (handler, match.groups())
+
+        return None
@@ -0,0 +1,301 @@
+import asyncio
+import json
+import logging
+import os
+import string
+
+from .rcon_server import RCONServer
+from .rcon_router import CommandRouter
+from .rcon_packet import RCONPacket
+from .rcon_message import RCONMessage
+from .rcon_encoder import EncodedResponse
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
+
+logger = logging.getLogger(name="RCONServer")
+
+# the named fields which can be used in a response template
+TEMPLATE_FIELDS = ("command", "args")
+
+
+class RuleError(ValueError):
+    """Exception which is thrown when a rule file is invalid."""
+    pass
+
+
+class _Template:
+    """
+    A compiled response template.
+
+    Templates without fields are encoded once with all packets; the id
+    fields are patched for every response. Templates with fields are
+    formatted with str.format: {0}, {1}, ... are the arguments of the
+    command, {args} all arguments and {command} the whole command. Missing
+    arguments are empty. Attribute and index access in the fields is not
+    allowed.
+    """
+
+    def __init__(self, template):
+        self.template = template
+        self.num_args = 0
+        self.static = True
+        auto = 0
+        for _, field, _, _ in string.Formatter().parse(template):
+            if field is None:
+                continue
+            self.static = False
+            if "." in field or "[" in field:
+                raise RuleError(f"invalid field {{{field}}} in {template!r}")
+            if field == "":
+                index = auto
+                auto += 1
+            elif field.isdigit():
+                index = int(field)
+            elif field in TEMPLATE_FIELDS:
+                continue
+            else:
+                raise RuleError(f"unknown field {{{field}}} in {template!r}")
+            self.num_args = max(self.num_args, index + 1)
+        if not self.static:
+            # finds e.g. mixed automatic and manual numbering or invalid
+            # format specs
+            try:
+                template.format(*[""] * self.num_args, command="", args="")
+                # the fields are filled with the ascii of the command
+                template.encode("ascii")
+            except (ValueError, IndexError, KeyError) as e:
+                raise RuleError(f"invalid template {template!r}: {e}") from e
+
+        self.encoded = None
+        self.id_offsets = []
+        if self.static:
+            message = RCONMessage(id=0,
+                                  type=RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                                  body=template.replace("{{", "{")
+                                               .replace("}}", "}"))
+            offset = 0
+            for packet in message:
+                # the id follows the 4 bytes of the size field
+                self.id_offsets.append(offset + 4)
+                offset += packet.wire_size
+            self.encoded = EncodedResponse(message.msg(), self.id_offsets)
+
+    def response(self, packet, args):
+        """:return: the encoded response or a RCONMessage to *packet*."""
+        if self.static:
+            return self.encoded.with_id(packet.id)
+        # groups of a pattern which did not participate are None
+        args = ["" if arg is None else arg for arg in args]
+        joined = " ".join(args)
+        if len(args) < self.num_args:
+            args.extend([""] * (self.num_args - len(args)))
+        try:
+            body = self.template.format(*args, command=packet.body,
+                                        args=joined)
+            return RCONMessage(id=packet.id,
+                               type=RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                               body=body)
+        except (ValueError, IndexError, KeyError, TypeError):
+            # a bad rule answers with an empty body, the connection stays.
+            # UnicodeEncodeError is a ValueError.
+            logger.exception("could not format %r", self.template)
+            return RCONMessage(id=packet.id,
+                               type=RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                               body="")
+
+
+def _handler(template, delay):
+    """:return: a router handler which answers with the *template*."""
+    if delay:
+        async def handler(packet, connection, args):
+            await asyncio.sleep(delay)
+            connection.send_packet(template.response(packet, args))
+    else:
+        def handler(packet, connection, args):
+            connection.send_packet(template.response(packet, args))
+    return handler
+
+
+def _template(rule, key="response"):
+    """:return: the _Template of the response of a *rule*."""
+    body = rule.get(key, "")
+    if isinstance(body, list):
+        if not all(isinstance(line, str) for line in body):
+            raise RuleError(f"{key} needs to be a string or a list of strings")
+        body = "\n".join(body)
+    elif not isinstance(body, str):
+        raise RuleError(f"{key} needs to be a string or a list of strings")
+    repeat = rule.get("repeat", 1)
+    if not isinstance(repeat, int) or repeat < 1:
+        raise RuleError("repeat needs to be an integer >= 1")
+    try:
+        return _Template(body * repeat)
+    except (ValueError, UnicodeEncodeError) as e:
+        raise RuleError(f"invalid response {body[:40]!r}: {e}") from e
+
+
+def compile_rules(rules):
+    """
+    Compiles the parsed content of a rule file.
+    :param rules: a dict with a list of "rules" and an optional "default".
+    :return: a tuple (CommandRouter, default _Template or None).
+    """
+    if not isinstance(rules, dict) or not isinstance(rules.get("rules", []),
+                                                      list):
+        raise RuleError("a rule file needs to contain a list of rules")
+    router = CommandRouter()
+    for number, rule in enumerate(rules.get("rules", [])):
+        if not isinstance(rule, dict):
+            raise RuleError(f"rule {number} is not a table")
+        kinds = [kind for kind in ("command", "prefix", "pattern")
+                 if kind in rule]
+        if len(kinds) != 1:
+            raise RuleError(f"rule {number} needs exactly one of command, "
+                            "prefix or pattern")
+        kind = kinds[0]
+        delay = rule.get("delay", 0)
+        if not isinstance(delay, (int, float)) or delay < 0:
+            raise RuleError(f"delay of rule {number} needs to be >= 0")
+        handler = _handler(_template(rule), delay)
+        try:
+            if kind == "command":
+                router.add_command(rule["command"], handler)
+            elif kind == "prefix":
+                router.add_prefix(rule["prefix"], handler)
+            else:
+                router.add_pattern(rule["pattern"], handler)
+        except Exception as e:
+            raise RuleError(f"invalid {kind} in rule {number}: {e}") from e
+    # the combined pattern is compiled now and not on the first command
+    router.route("")
+
+    default = None
+    if "default" in rules:
+        default = _template(rules, "default")
+    return router, default
+
+
+def load_rules(path):
+    """
+    Reads and compiles the rule file at *path*. Files ending with .toml are
+    parsed as TOML (Python >= 3.11), all others as JSON.
+    :return: a tuple (CommandRouter, default _Template or None).
+    """
+    with open(path, "rb") as f:
+        content = f.read()
+    try:
+        if path.endswith(".toml"):
+            if tomllib is None:
+                raise RuleError("TOML rule files need Python 3.11 or later")
+            rules = tomllib.loads(content.decode("utf-8"))
+        else:
+            rules = json.loads(content)
+    except (ValueError, UnicodeDecodeError) as e:
+        if isinstance(e, RuleError):
+            raise
+        raise RuleError(f"could not parse {path}: {e}") from e
+    return compile_rules(rules)
+
+
+class ScriptedRCONServer(RCONServer):
+    """
+    A RCONServer which answers with the responses of a rule file.
+
+    A JSON rule file looks like this (a TOML file has the same structure)::
+
+        {
+            "rules": [
+                {"command": "status", "response": ["hostname: mock",
+                                                   "players: 0"]},
+                {"prefix": "say ", "response": "said {args}"},
+                {"pattern": "kick (\\\\w+)", "response": "kicked {0}",
+                 "delay": 0.5},
+                {"command": "dump", "response": "x", "repeat": 100000}
+            ],
+            "default": "Unknown command \\"{command}\\""
+        }
+
+    Every rule has one of "command" (the first word of the command),
+    "prefix" or "pattern" (a regular expression for the whole command), a
+    "response" template (a string or a list of lines), an optional "delay"
+    in seconds and an optional "repeat" count of the response. The
+    arguments of the command fill the fields of the template, see
+    _Template. Long responses are split into multiple packets. Commands
+    without a matching rule get the "default" response or an empty one.
+
+    The rules are compiled into the router of the server when they are
+    loaded. reload reads the file again and replaces the rules at once; open
+    connections are kept and a file with errors leaves the old rules in
+    place.
+    """
+
+    def __init__(self, rule_file, *args, reload_interval=None, **kwargs):
+        """
+        :param rule_file: str, the path of the JSON or TOML rule file.
+        :param reload_interval: float, seconds between checks whether the
+        rule file has changed or None to reload only by calling reload.
+        The other arguments are passed to the RCONServer.
+        """
+        super().__init__(*args, **kwargs)
+        self.rule_file = rule_file
+        self.reload_interval = reload_interval
+        self._default = None
+        self._mtime = None
+        self._watcher = None
+        self.reload()
+
+    def reload(self):
+        """
+        Loads the rule file again. On errors the old rules are kept and a
+        RuleError is raised.
+        """
+        mtime = os.stat(self.rule_file).st_mtime_ns
+        router, default = load_rules(self.rule_file)
+        # both are replaced without a chance for a command to run in between
+        self.router, self._default = router, default
+        self._mtime = mtime
+        if self.response_cache is not None:
+            self.response_cache.clear()
+        logger.info("loaded rules from %s", self.rule_file)
+
+    def reload_if_changed(self):
+        """
+        Reloads the rule file if its modification time has changed.
+        :return: True if the rules were reloaded.
+        """
+        try:
+            if os.stat(self.rule_file).st_mtime_ns == self._mtime:
+                return False
+            self.reload()
+        except (OSError, RuleError):
+            logger.exception("could not reload %s", self.rule_file)
+            return False
+        return True
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            self.reload_if_changed()
+
+    async def start(self, reuse_port=False):
+        server = await super().start(reuse_port=reuse_port)
+        if self.reload_interval is not None and self._watcher is None:
+            self._watcher = asyncio.ensure_future(self._watch())
+        return server
+
+    async def close(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
+        await super().close()
+
+    def handle_execcommand(self, packet, connection):
+        """Answers commands without a matching rule with the default."""
+        if self._default is None:
+            connection.send_packet(RCONPacket._from_trusted(
+                    packet.id, RCONPacket.SERVERDATA_RESPONSE_VALUE, ""))
+        else:
+            connection.send_packet(self._default.response(packet, ()))
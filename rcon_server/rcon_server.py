@@ -1,32 +1,228 @@
 import asyncio
 import logging
+import multiprocessing
+import multiprocessing.connection
+import signal
+import time
+import warnings
 
 from .rcon_connection import RCONConnection
+from .rcon_router import CommandRouter
+from .rcon_registry import ConnectionRegistry
+from .rcon_timer import TimerWheel
+from .rcon_auth import hash_password, verify_password
+from .rcon_admission import RejectedConnection
 
 logger = logging.getLogger(name="RCONServer")
-logger.setLevel(logging.DEBUG)
-#console_handler = logging.StreamHandler()
-#console_handler.setLevel(logging.DEBUG)
-#logger.addHandler(console_handler)
+
+def supervise(target, workers, restart_delay=1.0, max_restart_delay=60.0):
+    """
+    Forks *workers* processes which run *target(number)* and restarts them
+    when they exit. Returns when SIGINT or SIGTERM is received, all workers
+    are stopped then.
+
+    A worker is restarted after *restart_delay* seconds. The delay doubles
+    with every further exit of the worker up to *max_restart_delay*, so a
+    worker which crashes on start does not restart in a tight loop. The
+    delay is reset when the worker ran for at least *max_restart_delay*
+    seconds.
+    """
+    context = multiprocessing.get_context("fork")
+    processes = {}
+    started = {}  # number -> start time of the worker
+    failures = {}  # number -> exits since the worker last ran long enough
+    restarts = {}  # number -> time of the restart of an exited worker
+    stopping = False
+
+    def run_worker(number):
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        target(number)
+
+    def start_worker(number):
+        process = context.Process(target=run_worker, args=(number,),
+                                  name=f"rcon-worker-{number}",
+                                  daemon=True)
+        process.start()
+        processes[number] = process
+        started[number] = time.monotonic()
+        logger.info("started worker %s (pid %s)", number, process.pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    previous_handlers = {sig: signal.signal(sig, stop)
+                         for sig in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        for number in range(workers):
+            failures[number] = 0
+            start_worker(number)
+
+        while not stopping:
+            timeout = 0.5
+            if restarts:
+                timeout = max(0, min(timeout, min(restarts.values())
+                                     - time.monotonic()))
+            sentinels = [process.sentinel
+                         for number, process in processes.items()
+                         if number not in restarts]
+            multiprocessing.connection.wait(sentinels, timeout=timeout)
+            now = time.monotonic()
+            for number, process in list(processes.items()):
+                if stopping:
+                    break
+                if number in restarts:
+                    if restarts[number] <= now:
+                        del restarts[number]
+                        start_worker(number)
+                    continue
+                if process.is_alive():
+                    continue
+                if now - started[number] >= max_restart_delay:
+                    failures[number] = 0
+                delay = min(restart_delay * 2 ** failures[number],
+                            max_restart_delay)
+                failures[number] += 1
+                logger.warning("worker %s exited with %s, restarting in "
+                               "%.1f s", number, process.exitcode, delay)
+                restarts[number] = now + delay
+    finally:
+        logger.info("stopping workers")
+        for process in processes.values():
+            process.terminate()
+        for process in processes.values():
+            process.join(5)
+            if process.is_alive():
+                process.kill()
+                process.join()
+        for sig, handler in previous_handlers.items():
+            signal.signal(sig, handler)
+
 
 class RCONServer:
-    def __init__(self, bind=("localhost",27015), password=None):
+    def __init__(self, bind=("localhost",27015), password=None,
+                 max_commands=None, max_commands_per_connection=None,
+                 response_cache=None, write_high_water=None,
+                 write_low_water=None, metrics=None, tracer=None,
+                 login_timeout=None, idle_timeout=None, max_lifetime=None,
+                 timer_resolution=1.0, auth_limiter=None, admission=None,
+                 recorder=None, max_queued_per_connection=None):
         """Initializes a RCON Server.
         :param bind: a tuple (address, port) to bind to
         :password: the RCON password
+        :param max_commands: the maximum number of async command handlers
+        running at the same time over all connections. None for no limit.
+        :param max_commands_per_connection: the maximum number of async
+        command handlers running at the same time for one connection.
+        None for no limit.
+        :param response_cache: a ResponseCache for the responses of repeated
+        commands or None to disable caching.
+        :param write_high_water: int, the number of unsent bytes per
+        connection at which the connection stops reading and handling
+        requests. None for the default of the transport.
+        :param write_low_water: int, the number of unsent bytes at which a
+        paused connection continues. None for the default of the transport.
+        :param metrics: a ServerMetrics which counts the commands, bytes and
+        logins or None to disable the metrics.
+        :param tracer: a PacketTracer which logs the received and sent
+        packets or None to disable the packet log.
+        :param login_timeout: seconds after which a connection which has not
+        authenticated is closed. None for no limit.
+        :param idle_timeout: seconds without received data after which an
+        authenticated connection is closed. None for no limit.
+        :param max_lifetime: seconds after which every connection is closed.
+        None for no limit.
+        :param timer_resolution: seconds, the granularity of the timeouts.
+        Connections are closed up to this much later than their timeout.
+        :param auth_limiter: an AuthLimiter which limits the login attempts
+        per ip and bans ips with too many failed logins or None for no limit.
+        :param admission: an AdmissionControl which limits the connections
+        and sheds commands under overload or None for no limits.
+        :param recorder: a TrafficRecorder which records the received and
+        sent data of all connections or None.
+        :param max_queued_per_connection: the maximum number of async command
+        handlers of one connection which are running or waiting for a limit.
+        Further commands are answered with an empty response. None for no
+        limit.
         """
-        self.connections = [] # list of all connections
-                              # the connections append and remove themselves
+        self.connections = ConnectionRegistry() # all live connections
+                              # the connections add and remove themselves
                               # to/from it
         self.set_password(password)
         self.bind = bind
+        self.max_commands = max_commands
+        self.max_commands_per_connection = max_commands_per_connection
+        self.max_queued_per_connection = max_queued_per_connection
+        self._command_semaphore = None
+        self.response_cache = response_cache
+        self.router = CommandRouter()
+        self.write_high_water = write_high_water
+        self.write_low_water = write_low_water
+        self.metrics = metrics
+        self.tracer = tracer
+        self.login_timeout = login_timeout
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        # one shared timer for the timeouts of all connections
+        self.timer_wheel = None
+        if any(timeout is not None
+               for timeout in (login_timeout, idle_timeout, max_lifetime)):
+            self.timer_wheel = TimerWheel(RCONConnection._check_timeout,
+                                          resolution=timer_resolution)
+        self.auth_limiter = auth_limiter
+        self.admission = admission
+        self.recorder = recorder
+        self._server = None  # the asyncio.Server while listening
 
     @property
     def password(self):
-        """:return: The RCON password as str"""
-        return self._password
+        """
+        Deprecated, only a salted hash of the password is kept.
+        Use has_password or check_password instead.
+        :return: None
+        """
+        warnings.warn("RCONServer.password is always None, only a hash of the "
+                      "password is kept. Use has_password or check_password.",
+                      DeprecationWarning, stacklevel=2)
+        return None
+
+    @property
+    def has_password(self):
+        """
+        :return: True if a RCON password is set. Only a salted hash of the
+        password is kept.
+        """
+        return self._password_hash is not None
+
+    @property
+    def command_semaphore(self):
+        """
+        :return: the asyncio.Semaphore which limits the number of async command
+        handlers over all connections or None if there is no limit.
+        """
+        if self._command_semaphore is None and self.max_commands:
+            self._command_semaphore = asyncio.Semaphore(self.max_commands)
+        return self._command_semaphore
+
+    def stats(self):
+        """
+        :return: a dict with the live connections by state and, if metrics
+        are enabled, the snapshot of the metrics and, if admission control
+        is enabled, its counters.
+        """
+        stats = {"connections": self.connections.counts()}
+        if self.metrics is not None:
+            stats.update(self.metrics.snapshot())
+        if self.admission is not None:
+            stats["admission"] = self.admission.stats()
+        return stats
 
     def connection_factory(self):
+        if self.admission is not None \
+                and not self.admission.accept_connection(len(self.connections)):
+            # rejected before a RCONConnection is created
+            return RejectedConnection()
         conn = RCONConnection(self)
         return conn
 
@@ -35,41 +231,117 @@ class RCONServer:
         :return: True if the given password *pw* matches the RCON password.
         False otherwise or if the RCON password is the empty string or None.
         """
-        if self.password == "" or self.password is None:
+        if self._password_hash is None:
             return False
-        return self.password == pw
+        return verify_password(pw, *self._password_hash)
 
     def set_password(self, password):
         """Used to set the RCON password.
         If this function is called all authenticated connections are closed.
         :param password: the new rcon password.
         """
-        if password is None or isinstance(password,str):
-            self._password = password
+        if password is None or password == "":
+            self._password_hash = None
+        elif isinstance(password, str):
+            self._password_hash = hash_password(password)
         else:
             raise ValueError("password needs to be a string or None.")
-        for conn in self.connections:
-            if conn.state != "unauthenticated":
-                conn.close_connection()
-
-    async def listen(self):
-        """Starts listening on the socket and handling requests."""
+        for conn in self.connections.by_state("authenticated"):
+            conn.close_connection()
 
+    async def start(self, reuse_port=False):
+        """Starts listening on the socket without waiting for the server to
+        be closed. Requests are handled while the event loop is running.
+        :param reuse_port: bool, sets SO_REUSEPORT on the socket so that
+        multiple processes can listen on the same address.
+        :return: the asyncio.Server
+        """
         self._loop = asyncio.get_event_loop()
-        server = await self._loop.create_server(self.connection_factory,
-                                          self.bind[0], self.bind[1])
-        print(server)
+        self._server = await self._loop.create_server(
+                self.connection_factory, self.bind[0], self.bind[1],
+                reuse_port=reuse_port)
+        for socket in self._server.sockets:
+            # [:2] needed to remove the additional fields of INET6 sockets
+            logger.info("listening on %s:%s", *socket.getsockname()[:2])
+        return self._server
+
+    @property
+    def address(self):
+        """
+        :return: the (address, port) the server listens on, e.g. to find the
+        port when it was bound to port 0, or None if it is not started.
+        """
+        if self._server is None or not self._server.sockets:
+            return None
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def close(self):
+        """Stops listening and closes all connections."""
+        if self._server is not None:
+            self._server.close()
+            for conn in self.connections:
+                if conn.state != "closed":
+                    conn.close_connection()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def listen(self, reuse_port=False):
+        """Starts listening on the socket and handling requests.
+        :param reuse_port: bool, sets SO_REUSEPORT on the socket so that
+        multiple processes can listen on the same address.
+        """
+        server = await self.start(reuse_port=reuse_port)
         async with server:
             logger.info("starting server")
-            for socket in server.sockets:
-                # [:2] needed to remove the additional fields of INET6 sockets
-                logger.info("listening on %s:%s" % socket.getsockname()[:2])
             await server.serve_forever()
 
+    def run(self, workers=1, restart_delay=1.0, max_restart_delay=60.0):
+        """
+        Runs the server until it is interrupted.
+
+        With more than one worker, *workers* processes are forked. Each of
+        them listens on the same address with SO_REUSEPORT and runs its own
+        event loop with its own copy of this RCONServer. The kernel spreads
+        the incoming connections over the workers. Workers which crash are
+        restarted with an exponential backoff, see supervise. SIGINT and
+        SIGTERM stop all workers.
+
+        :param workers: int, the number of worker processes.
+        :param restart_delay: float, seconds to wait before a crashed worker
+        is restarted the first time.
+        :param max_restart_delay: float, the maximum seconds to wait before
+        a worker which crashes again is restarted.
+        """
+        if workers <= 1:
+            asyncio.run(self.listen())
+            return
+        supervise(self._run_worker, workers, restart_delay, max_restart_delay)
+
+    def _run_worker(self, number):
+        """Runs a single worker process of *run*."""
+        asyncio.run(self.listen(reuse_port=True))
+
+    def dispatch_command(self, packet, connection):
+        """
+        Calls the handler of the router which matches the command of the
+        EXECCOMMAND *packet*. If there is none handle_execcommand is called.
+        :return: the return value of the handler, e.g. a coroutine.
+        """
+        if self.router:
+            route = self.router.route(packet.body)
+            if route is not None:
+                handler, args = route
+                return handler(packet, connection, args)
+        return self.handle_execcommand(packet, connection)
+
     def handle_execcommand(self, packet, connection):
         """
         Handles an EXECCOMMAND package. This command has to be implemented by
-        a subclass of the RCONServer.
+        a subclass of the RCONServer. It is only called for commands which
+        have no handler in the router.
+        It may also be implemented as a coroutine function (async def).
+        The coroutine is then run as a task and the responses it sends are
+        still written in the order of the requests.
         :param packet: the packet containing the command
         :param connection: the RCONConnection which calls this method
         """
@@ -0,0 +1,118 @@
+import asyncio
+import heapq
+import math
+import time
+
+
+class TimerWheel:
+    """
+    A bucketed scheduler for many coarse timers.
+
+    The deadlines are rounded up to ticks of *resolution* seconds and every
+    tick has a bucket with the keys which expire in it. Only one loop timer
+    is used for the whole wheel, no matter how many keys are scheduled, and
+    scheduling or cancelling a key is O(1).
+
+    A key may fire up to *resolution* seconds late but never early. When
+    its bucket expires *callback(key, now)* is called; the key is no longer
+    scheduled then and may schedule itself again.
+    """
+
+    def __init__(self, callback, resolution=1.0, clock=time.monotonic):
+        """
+        :param callback: called with (key, now) for every expired key.
+        :param resolution: float, the length of a tick in seconds.
+        :param clock: a function which returns the current time in seconds.
+        """
+        if resolution <= 0:
+            raise ValueError("resolution needs to be > 0")
+        self.callback = callback
+        self.resolution = resolution
+        self.clock = clock
+        self._buckets = {}  # tick -> dict of keys (an ordered set)
+        self._ticks = []  # heap of the ticks which have a bucket
+        self._keys = {}  # key -> tick
+        self._handle = None  # the loop timer while keys are scheduled
+
+    def schedule(self, key, deadline):
+        """
+        Schedules *key* to expire at *deadline* (in the time of the clock).
+        A key which is already scheduled is moved.
+        """
+        tick = math.ceil(deadline / self.resolution)
+        old_tick = self._keys.get(key)
+        if old_tick == tick:
+            return
+        if old_tick is not None:
+            self._remove(key, old_tick)
+        bucket = self._buckets.get(tick)
+        if bucket is None:
+            bucket = self._buckets[tick] = {}
+            heapq.heappush(self._ticks, tick)
+        bucket[key] = None
+        self._keys[key] = tick
+        self._start()
+
+    def cancel(self, key):
+        """Removes the *key*. Unknown keys are ignored."""
+        tick = self._keys.get(key)
+        if tick is not None:
+            self._remove(key, tick)
+
+    def _remove(self, key, tick):
+        del self._keys[key]
+        bucket = self._buckets[tick]
+        del bucket[key]
+        # the empty bucket stays in the heap and is dropped when it expires
+
+    def advance(self, now=None):
+        """
+        Expires all buckets whose tick is before *now*.
+        :return: the number of expired keys.
+        """
+        if now is None:
+            now = self.clock()
+        current = math.floor(now / self.resolution)
+        expired = 0
+        while self._ticks and self._ticks[0] <= current:
+            tick = heapq.heappop(self._ticks)
+            bucket = self._buckets.pop(tick)
+            for key in bucket:
+                del self._keys[key]
+            for key in bucket:
+                expired += 1
+                self.callback(key, now)
+        return expired
+
+    def _start(self):
+        """Starts the loop timer if a loop is running."""
+        if self._handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # without a running loop the wheel is advanced by hand
+            return
+        self._handle = loop.call_later(self.resolution, self._run, loop)
+
+    def _run(self, loop):
+        self._handle = None
+        self.advance()
+        # a callback may have started a new timer already
+        if self._keys and self._handle is None:
+            self._handle = loop.call_later(self.resolution, self._run, loop)
+
+    def close(self):
+        """Cancels all keys and stops the loop timer."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self._buckets.clear()
+        self._ticks.clear()
+        self._keys.clear()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._keys
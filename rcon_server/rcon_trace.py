@@ -0,0 +1,86 @@
+import itertools
+import logging
+
+from .rcon_packet import RCONPacket
+from .rcon_message import RCONMessage
+
+
+class _PacketSummary:
+    """
+    Formats a packet for the trace log when the record is formatted, so no
+    string is built for records which are dropped by a handler.
+    """
+
+    __slots__ = ("packet", "max_body")
+
+    def __init__(self, packet, max_body):
+        self.packet = packet
+        self.max_body = max_body
+
+    def __str__(self):
+        packet = self.packet
+        if isinstance(packet, RCONMessage):
+            # only the first packet is looked at, the body can be megabytes
+            first = next(iter(packet), None)
+            if first is None:
+                return f"id={packet.id} type={packet.type} packets=0"
+            return (f"id={first.id} type={first.type} "
+                    f"packets={packet.num_packets} size={packet.wire_size} "
+                    f"body={self._body(first.body)}")
+        if isinstance(packet, RCONPacket):
+            return (f"id={packet.id} type={packet.type} "
+                    f"size={packet.wire_size} body={self._body(packet.body)}")
+        # an encoded response
+        return f"encoded size={len(packet)}"
+
+    def _body(self, body):
+        if len(body) > self.max_body:
+            return f"{body[:self.max_body]!r}...({len(body)} chars)"
+        return repr(body)
+
+
+class PacketTracer:
+    """
+    Logs the received and sent packets of the connections of a RCONServer.
+
+    The packets are logged at DEBUG level to the "RCONServer.trace" logger
+    with the direction and the connection id as extra fields
+    (rcon_direction, rcon_connection_id). The message is formatted lazily
+    and the body is truncated to *max_body* characters. With *sample_every*
+    only every n-th packet is logged.
+
+    A RCONServer without a tracer does no work per packet at all; with a
+    tracer but DEBUG disabled the cost is one isEnabledFor call.
+    """
+
+    def __init__(self, max_body=64, sample_every=1, logger=None):
+        """
+        :param max_body: int, the number of body characters which are logged.
+        :param sample_every: int, log only every n-th packet.
+        :param logger: the logging.Logger to log to, by default
+        "RCONServer.trace".
+        """
+        if max_body < 0:
+            raise ValueError("max_body needs to be >= 0")
+        if sample_every < 1:
+            raise ValueError("sample_every needs to be >= 1")
+        self.max_body = max_body
+        self.sample_every = sample_every
+        self.logger = logger or logging.getLogger("RCONServer.trace")
+        self._counter = itertools.count()
+
+    def trace(self, direction, connection, packet):
+        """
+        Logs a *packet* of the *connection*.
+        :param direction: str, "received" or "sent".
+        :param packet: a RCONPacket, a RCONMessage or an encoded response.
+        """
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        if self.sample_every > 1 and next(self._counter) % self.sample_every:
+            return
+        self.logger.debug("%s connection=%s %s", direction,
+                          connection.connection_id,
+                          _PacketSummary(packet, self.max_body),
+                          extra={"rcon_direction": direction,
+                                 "rcon_connection_id": connection.connection_id})
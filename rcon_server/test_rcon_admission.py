@@ -0,0 +1,65 @@
+import unittest
+
+from .rcon_admission import AdmissionControl, RejectedConnection
+from .test_rcon_connection import FakeClock
+
+
+class ClosingTransport:
+
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class AdmissionControlTest(unittest.TestCase):
+
+    def test_connections(self):
+        admission = AdmissionControl(max_connections=2,
+                                     max_connections_per_ip=1)
+        self.assertTrue(admission.accept_connection(1))
+        self.assertFalse(admission.accept_connection(2))
+        self.assertTrue(admission.accept_ip(0))
+        self.assertFalse(admission.accept_ip(1))
+        self.assertEqual(admission.rejected_connections, 2)
+
+        unlimited = AdmissionControl()
+        self.assertTrue(unlimited.accept_connection(10 ** 6))
+        self.assertTrue(unlimited.accept_ip(10 ** 6))
+
+    def test_inflight(self):
+        admission = AdmissionControl(max_inflight_commands=1)
+        self.assertTrue(admission.admit_command())
+        admission.inflight = 1
+        self.assertFalse(admission.admit_command())
+        self.assertEqual(admission.shed_commands, 1)
+
+    def test_latency(self):
+        """Tests shedding above the latency threshold and the probes."""
+        clock = FakeClock()
+        admission = AdmissionControl(latency_threshold=0.1,
+                                     latency_weight=0.5,
+                                     probe_interval=1, clock=clock)
+        admission.record_latency(0.1)
+        self.assertFalse(admission.overloaded)
+        admission.record_latency(0.5)
+        self.assertTrue(admission.overloaded)
+
+        # the first command is a probe, the next ones are shed
+        self.assertTrue(admission.admit_command())
+        self.assertFalse(admission.admit_command())
+        clock.time = 1
+        self.assertTrue(admission.admit_command())
+        for _ in range(3):
+            admission.record_latency(0.01)
+        self.assertFalse(admission.overloaded)
+        self.assertTrue(admission.admit_command())
+        self.assertEqual(admission.stats()["shed_commands"], 1)
+
+    def test_rejected_connection(self):
+        transport = ClosingTransport()
+        RejectedConnection().connection_made(transport)
+        self.assertTrue(transport.closed)
+
+    def test_invalid_weight(self):
+        self.assertRaises(ValueError, AdmissionControl, latency_weight=0)
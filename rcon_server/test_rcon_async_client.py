@@ -0,0 +1,85 @@
+import asyncio
+import unittest
+
+from .rcon_async_client import AsyncRCONClient
+from .rcon_client import PasswordError
+from .util import HEADER
+from .test_rcon_connection import EchoRCONServer
+
+test_password = "test"
+
+
+class DelayedEchoRCONServer(EchoRCONServer):
+
+    async def handle_execcommand(self, packet, connection):
+        # later commands finish first
+        await asyncio.sleep(0.001 * (10 - len(packet.body) % 10))
+        super().handle_execcommand(packet, connection)
+
+
+class AsyncRCONClientTest(unittest.TestCase):
+
+    def run_with_server(self, test):
+        """Runs the coroutine function *test* with a client of a local server."""
+        async def run():
+            rcon_server = DelayedEchoRCONServer(password=test_password)
+            server = await asyncio.get_running_loop().create_server(
+                    rcon_server.connection_factory, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                await test(port)
+            finally:
+                server.close()
+                await server.wait_closed()
+        asyncio.run(run())
+
+    def test_pipelined_commands(self):
+        """Tests many commands at the same time over one connection."""
+        async def test(port):
+            client = AsyncRCONClient("127.0.0.1", port, test_password)
+            await client.connect()
+            await client.login()
+            commands = ["c" * i for i in range(30)] + ["x" * 4086]
+            responses = await asyncio.gather(
+                    *(client.send_command(c) for c in commands))
+            self.assertEqual(responses, commands)
+            self.assertEqual(client._commands, {})
+            self.assertEqual(client._mirrors, set())
+            await client.disconnect()
+
+        self.run_with_server(test)
+
+    def test_wrong_password(self):
+        """Tests the login with a wrong password."""
+        async def test(port):
+            client = AsyncRCONClient("127.0.0.1", port, test_password + "2")
+            await client.connect()
+            with self.assertRaises(PasswordError):
+                await client.login()
+            await client.disconnect()
+
+        self.run_with_server(test)
+
+    def test_invalid_packet(self):
+        """Tests that an invalid packet fails the waiting commands."""
+        async def handle(reader, writer):
+            await reader.read(1024)
+            # a packet with an unknown type
+            writer.write(HEADER.pack(10, 1, 99) + b"\x00\x00")
+            await writer.drain()
+            await reader.read(1024)
+            writer.close()
+
+        async def run():
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            client = AsyncRCONClient("127.0.0.1", port, test_password)
+            await client.connect()
+            with self.assertRaises(ValueError):
+                await asyncio.wait_for(client.send_command("status"), 5)
+            self.assertTrue(client.closed)
+            await client.disconnect()
+            server.close()
+            await server.wait_closed()
+
+        asyncio.run(run())
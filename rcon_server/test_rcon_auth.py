@@ -0,0 +1,107 @@
+import unittest
+
+from .rcon_auth import hash_password, verify_password, TokenBucket, \
+    AuthLimiter
+from .test_rcon_connection import FakeClock
+
+
+class PasswordHashTest(unittest.TestCase):
+
+    def test_verify(self):
+        salt, digest = hash_password("secret")
+        self.assertTrue(verify_password("secret", salt, digest))
+        self.assertFalse(verify_password("secret2", salt, digest))
+        self.assertFalse(verify_password("", salt, digest))
+
+    def test_salt(self):
+        """Tests that the same password gets different hashes."""
+        self.assertNotEqual(hash_password("secret"), hash_password("secret"))
+        self.assertEqual(hash_password("secret", b"salt"),
+                         hash_password("secret", b"salt"))
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_take(self):
+        bucket = TokenBucket(rate=2, burst=3, now=0)
+        self.assertEqual([bucket.take(0) for _ in range(4)],
+                         [True, True, True, False])
+        self.assertFalse(bucket.full(1))
+        self.assertTrue(bucket.take(0.5))
+        self.assertFalse(bucket.take(0.5))
+        self.assertTrue(bucket.full(10))
+        self.assertEqual([bucket.take(10) for _ in range(4)],
+                         [True, True, True, False])
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, TokenBucket, 0, 1, 0)
+        self.assertRaises(ValueError, TokenBucket, 1, 0, 0)
+
+
+class AuthLimiterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = AuthLimiter(per_ip_rate=1, per_ip_burst=2,
+                                   global_rate=1, global_burst=3,
+                                   ban_after=3, ban_duration=60,
+                                   clock=self.clock)
+
+    def test_per_ip(self):
+        """Tests that one ip can not use up the global limit."""
+        self.assertTrue(self.limiter.allow("a"))
+        self.assertTrue(self.limiter.allow("a"))
+        self.assertFalse(self.limiter.allow("a"))
+        self.assertTrue(self.limiter.allow("b"))
+        # the global bucket is empty now
+        self.assertFalse(self.limiter.allow("c"))
+        self.clock.time = 1
+        self.assertTrue(self.limiter.allow("c"))
+        self.assertEqual(self.limiter.rejected, 2)
+
+    def test_ban(self):
+        """Tests that an ip is banned after failed logins and unbanned."""
+        self.assertFalse(self.limiter.failure("a"))
+        self.limiter.success("a")
+        self.assertFalse(self.limiter.failure("a"))
+        self.assertFalse(self.limiter.failure("a"))
+        self.assertTrue(self.limiter.failure("a"))
+        self.assertTrue(self.limiter.is_banned("a"))
+        self.assertFalse(self.limiter.allow("a"))
+        self.assertFalse(self.limiter.is_banned("b"))
+
+        self.clock.time = 60
+        self.assertFalse(self.limiter.is_banned("a"))
+        self.assertTrue(self.limiter.allow("a"))
+
+        self.limiter.ban("b", 5)
+        self.assertTrue(self.limiter.is_banned("b"))
+        self.limiter.unban("b")
+        self.assertFalse(self.limiter.is_banned("b"))
+
+    def test_failures_expire(self):
+        """Tests that old failures are not counted."""
+        self.limiter.failure("a")
+        self.limiter.failure("a")
+        self.clock.time = 61
+        self.assertFalse(self.limiter.failure("a"))
+        self.assertFalse(self.limiter.is_banned("a"))
+
+    def test_purge(self):
+        """Tests that expired entries are removed from the tables."""
+        self.limiter.allow("a")
+        self.limiter.failure("b")
+        self.limiter.ban("c")
+        self.assertEqual(self.limiter.stats(), {
+            "tracked_ips": 1, "failing_ips": 1, "banned_ips": 1,
+            "rejected": 0})
+        self.clock.time = 1000
+        self.limiter.allow("d")
+        self.assertEqual(self.limiter.stats(), {
+            "tracked_ips": 1, "failing_ips": 0, "banned_ips": 0,
+            "rejected": 0})
+
+    def test_no_bans(self):
+        limiter = AuthLimiter(ban_after=None, global_rate=None)
+        for _ in range(100):
+            self.assertFalse(limiter.failure("a"))
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from .rcon_server import RCONServer
+from .rcon_packet import RCONPacket
+from .rcon_broadcast import broadcast, broadcast_command
+from .rcon_async_client import AsyncRCONClient
+from .rcon_client import PasswordError
+from .test_rcon_connection import free_port
+
+test_password = "test"
+
+
+class NameRCONServer(RCONServer):
+
+    def __init__(self, name, **kwargs):
+        super().__init__(**kwargs)
+        self.name = name
+
+    async def handle_execcommand(self, packet, connection):
+        if packet.body == "hang":
+            await asyncio.sleep(10)
+        if packet.body == "slow" and self.name == "s0":
+            await asyncio.sleep(0.5)
+        connection.send_packet(RCONPacket(
+                packet.id, RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                f"{self.name}:{packet.body}"))
+
+
+class BroadcastTest(unittest.TestCase):
+
+    def setUp(self):
+        """Starts three servers in a background event loop."""
+        self.loop = asyncio.new_event_loop()
+        self.servers = []
+        self.endpoints = []
+        for i in range(3):
+            rcon_server = NameRCONServer(f"s{i}", password=test_password)
+            server = self.loop.run_until_complete(self.loop.create_server(
+                    rcon_server.connection_factory, "127.0.0.1", 0))
+            self.servers.append(server)
+            port = server.sockets[0].getsockname()[1]
+            self.endpoints.append(("127.0.0.1", port, test_password))
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        for server in self.servers:
+            server.close()
+            self.loop.run_until_complete(server.wait_closed())
+        self.loop.close()
+
+    def test_broadcast(self):
+        """Tests a command on all servers."""
+        results = broadcast_command(self.endpoints, "status", concurrency=2)
+        self.assertEqual(sorted(r.response for r in results),
+                         ["s0:status", "s1:status", "s2:status"])
+        self.assertTrue(all(r.error is None for r in results))
+
+    def test_partial_failure(self):
+        """Tests that failing servers do not stop the others."""
+        ip, port, _ = self.endpoints[0]
+        endpoints = [(ip, port, "wrong"),
+                     ("127.0.0.1", free_port(), test_password),
+                     self.endpoints[1]]
+        results = {r.endpoint: r for r in broadcast_command(endpoints, "x")}
+
+        self.assertIsInstance(results[endpoints[0]].error, PasswordError)
+        self.assertIsInstance(results[endpoints[1]].error, OSError)
+        self.assertEqual(results[endpoints[2]].response, "s1:x")
+
+    def test_timeout(self):
+        """Tests the timeout per server."""
+        results = broadcast_command(self.endpoints[:1], "hang", timeout=0.1)
+        self.assertIsInstance(results[0].error, asyncio.TimeoutError)
+
+    def test_streaming(self):
+        """Tests that results are yielded as the servers answer."""
+        async def run():
+            results = []
+            start = time.monotonic()
+            async for result in broadcast(self.endpoints, "slow"):
+                results.append((result.response, time.monotonic() - start))
+            return results
+        results = asyncio.run(run())
+        self.assertEqual(len(results), 3)
+        # the fast servers are yielded before the slow one has answered
+        self.assertEqual(results[-1][0], "s0:slow")
+        self.assertTrue(results[0][1] < 0.4)
+        self.assertTrue(results[-1][1] >= 0.5)
+
+    def test_disconnect_error(self):
+        """Tests that a failing disconnect does not abort the broadcast."""
+        disconnect = AsyncRCONClient.disconnect
+
+        async def failing_disconnect(client):
+            await disconnect(client)
+            if client._port == self.endpoints[0][1]:
+                raise RuntimeError("disconnect failed")
+
+        AsyncRCONClient.disconnect = failing_disconnect
+        try:
+            results = {r.endpoint: r
+                       for r in broadcast_command(self.endpoints, "x")}
+        finally:
+            AsyncRCONClient.disconnect = disconnect
+        failed = results[self.endpoints[0]]
+        self.assertEqual(failed.response, "s0:x")
+        self.assertIsInstance(failed.error, RuntimeError)
+        self.assertEqual(results[self.endpoints[1]].response, "s1:x")
+        self.assertTrue(results[self.endpoints[2]].error is None)
@@ -0,0 +1,68 @@
+import unittest
+
+from .rcon_packet import RCONPacket
+from .rcon_message import RCONMessage
+from .rcon_cache import ResponseCache
+from .test_rcon_connection import FakeClock
+
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ResponseCache(ttls={"status": 10, "users": 5},
+                                   max_size=2, clock=self.clock)
+        self.response = RCONPacket(1, RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                                   "ok")
+
+    def test_ttl(self):
+        """Tests the TTLs of cached and uncached commands."""
+        self.assertEqual(self.cache.ttl("status"), 10)
+        self.assertTrue(self.cache.ttl("kick") is None)
+        self.cache.default_ttl = 1
+        self.assertEqual(self.cache.ttl("kick"), 1)
+
+    def test_miss(self):
+        """Tests a command which is not cached yet."""
+        self.assertTrue(self.cache.get("status", 1) is None)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_hit_patches_id(self):
+        """Tests if the id of all packets is replaced on a hit."""
+        message = RCONMessage(id=1, type=RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                              body="a"*5000)
+        other = RCONPacket(-1, RCONPacket.SERVERDATA_AUTH_RESPONSE, "")
+        self.cache.put("status", 1, [message, other])
+
+        response = self.cache.get("status", 42)
+        message.id = 42
+        self.assertEqual(response, message.msg() + other.msg())
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_expiry(self):
+        """Tests if a response expires after its TTL."""
+        self.cache.put("status", 1, [self.response])
+        self.clock.time = 9
+        self.assertFalse(self.cache.get("status", 1) is None)
+        self.clock.time = 10
+        self.assertTrue(self.cache.get("status", 1) is None)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_uncached_command(self):
+        """Tests that commands without TTL are not stored."""
+        self.cache.put("kick", 1, [self.response])
+        self.assertEqual(len(self.cache), 0)
+
+    def test_lru_eviction(self):
+        """Tests if the least recently used response is evicted."""
+        self.cache.ttls["stats"] = 10
+        self.cache.put("status", 1, [self.response])
+        self.cache.put("users", 1, [self.response])
+        self.cache.get("status", 1)
+        self.cache.put("stats", 1, [self.response])
+
+        self.assertEqual(self.cache.evictions, 1)
+        self.assertTrue(self.cache.get("users", 1) is None)
+        self.assertFalse(self.cache.get("status", 1) is None)
+        self.assertEqual(self.cache.stats,
+                         {"hits": 2, "misses": 1, "evictions": 1, "size": 2})
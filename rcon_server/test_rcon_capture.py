@@ -0,0 +1,160 @@
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+
+from .rcon_capture import TrafficRecorder, TrafficCapture, TO_SERVER, \
+    FROM_SERVER, CLOSED, index_path
+from .rcon_replay import replay, exchanges
+from .rcon_client import RCONClient
+from .rcon_packet import RCONPacket
+from .rcon_connection import RCONConnection
+from .test_rcon_connection import DummyTransport, FakeClock, EchoRCONServer
+
+test_password = "test"
+
+
+class ServerThread:
+    """Runs a RCONServer in the event loop of a thread."""
+
+    def __init__(self, server):
+        self.server = server
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(server.start(), self.loop).result()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.server.close(),
+                                         self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+class TrafficCaptureTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "capture.rcap")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_records(self):
+        """Tests writing and reading records."""
+        clock = FakeClock()
+        with TrafficRecorder(self.path, clock=clock) as recorder:
+            clock.time = 1.5
+            recorder.record(1, TO_SERVER, b"abc")
+            recorder.record(2, TO_SERVER, bytearray(b"de"))
+            clock.time = 2
+            recorder.record(1, FROM_SERVER, memoryview(b"fgh"))
+            recorder.record(1, CLOSED)
+
+        with TrafficCapture(self.path) as capture:
+            self.assertEqual(len(capture), 4)
+            records = [(r.timestamp, r.connection_id, r.direction,
+                        bytes(r.data)) for r in capture]
+            self.assertEqual(records, [(1.5, 1, TO_SERVER, b"abc"),
+                                       (1.5, 2, TO_SERVER, b"de"),
+                                       (2, 1, FROM_SERVER, b"fgh"),
+                                       (2, 1, CLOSED, b"")])
+            self.assertEqual(bytes(capture[-2].data), b"fgh")
+            self.assertRaises(IndexError, capture.__getitem__, 4)
+
+    def test_records_after_close(self):
+        """Tests that records stay valid after the capture is closed."""
+        with TrafficRecorder(self.path) as recorder:
+            recorder.record(1, TO_SERVER, b"abc")
+        capture = TrafficCapture(self.path)
+        record = capture[0]
+        records = list(capture)
+        capture.close()
+        self.assertEqual(record.data, b"abc")
+        self.assertEqual(records[0].data, b"abc")
+
+    def test_incomplete_index(self):
+        """Tests that a partly written index entry is ignored."""
+        with TrafficRecorder(self.path) as recorder:
+            recorder.record(1, TO_SERVER, b"abc")
+        with open(index_path(self.path), "ab") as f:
+            f.write(b"\x00" * 5)
+        with TrafficCapture(self.path) as capture:
+            self.assertEqual(len(capture), 1)
+
+    def test_invalid_file(self):
+        with open(self.path, "wb") as f:
+            f.write(b"no capture")
+        with open(index_path(self.path), "wb") as f:
+            f.write(b"no index")
+        self.assertRaises(ValueError, TrafficCapture, self.path)
+
+    def test_shared_recorder(self):
+        """Tests that servers and clients which share a recorder record their
+        connections with different ids."""
+        with TrafficRecorder(self.path) as recorder:
+            # e.g. the id of a client connection
+            self.assertEqual(recorder.next_connection_id(), 1)
+            connections = []
+            for _ in range(2):
+                server = EchoRCONServer(password=test_password,
+                                        recorder=recorder)
+                connection = RCONConnection(server)
+                transport = DummyTransport(connection)
+                transport.write_to_test(RCONPacket(
+                        1, RCONPacket.SERVERDATA_AUTH, test_password).msg())
+                connection.connection_lost(None)
+                connections.append(connection)
+            # both servers have a connection with the registry id 1
+            self.assertEqual([c.connection_id for c in connections], [1, 1])
+            self.assertEqual([c.capture_id for c in connections], [2, 3])
+
+        with TrafficCapture(self.path) as capture:
+            self.assertEqual([(r.connection_id, r.direction) for r in capture],
+                             [(2, TO_SERVER), (2, FROM_SERVER), (2, CLOSED),
+                              (3, TO_SERVER), (3, FROM_SERVER), (3, CLOSED)])
+
+    def test_capture_and_replay(self):
+        """Tests capturing the traffic of a server and replaying it."""
+        server_path = os.path.join(self.directory.name, "server.rcap")
+        server = EchoRCONServer(bind=("127.0.0.1", 0), password=test_password,
+                                recorder=TrafficRecorder(server_path))
+        thread = ServerThread(server)
+        try:
+            with TrafficRecorder(self.path) as recorder:
+                client = RCONClient(*server.address, test_password,
+                                    recorder=recorder)
+                client.connect()
+                client.login()
+                self.assertEqual(client.send_command("hello"), "hello")
+                self.assertEqual(client.send_command("world"), "world")
+                client.disconnect()
+
+            with TrafficCapture(self.path) as capture:
+                self.assertEqual([r.direction for r in capture][-1], CLOSED)
+                self.assertEqual({r.connection_id for r in capture}, {1})
+                connection = exchanges(capture)[1]
+                self.assertEqual(len(connection), 3)
+
+                for speed in (None, 10.0):
+                    report = asyncio.run(replay(capture, *server.address,
+                                                speed=speed, timeout=5))
+                    self.assertEqual(report["errors"], 0)
+                    self.assertEqual(report["connections"], 1)
+                    self.assertEqual(report["replayed"]["count"], 3)
+                    self.assertEqual(report["delta"]["count"], 3)
+        finally:
+            thread.stop()
+            server.recorder.close()
+
+        # the server side capture contains the same data
+        with TrafficCapture(server_path) as capture:
+            received = b"".join(bytes(r.data) for r in capture
+                                if r.direction == TO_SERVER
+                                and r.connection_id == 1)
+            with TrafficCapture(self.path) as client_capture:
+                sent = b"".join(bytes(r.data) for r in client_capture
+                                if r.direction == TO_SERVER)
+            self.assertEqual(received, sent)
@@ -1,8 +1,18 @@
+import asyncio
+import logging
+import socket
 import unittest
 
 from .rcon_server import RCONServer
 from .rcon_connection import RCONConnection
 from .rcon_packet import RCONPacket
+from .rcon_message import RCONMessage
+from .rcon_cache import ResponseCache
+from .rcon_metrics import ServerMetrics
+from .rcon_trace import PacketTracer
+from .rcon_timer import TimerWheel
+from .rcon_auth import AuthLimiter
+from .rcon_admission import AdmissionControl, RejectedConnection
 
 test_password = "test"
 
@@ -18,9 +28,15 @@ class DummyTransport():
         :param protocol: The asyncio.Protocol by which the transport is used
         """
         self.protocol = protocol
-        self.protocol.connection_made(self)
         self.buffer = b""  # a buffer for the data received from the test end
         self.closed = False
+        self.reading = True
+        # like a real transport the protocol is paused when the unread data
+        # is above the high water mark and resumed when it is read
+        self.high_water = 64 * 1024
+        self.low_water = 16 * 1024
+        self.writing_paused = False
+        self.protocol.connection_made(self)
 
     def write(self, data):
         """
@@ -31,6 +47,9 @@ class DummyTransport():
         """
         assert not self.closed
         self.buffer += data
+        if not self.writing_paused and len(self.buffer) > self.high_water:
+            self.writing_paused = True
+            self.protocol.pause_writing()
 
     def read(self):
         """
@@ -40,8 +59,24 @@ class DummyTransport():
         """
         data = self.buffer
         self.buffer = b""
+        if self.writing_paused:
+            self.writing_paused = False
+            self.protocol.resume_writing()
         return data
 
+    def set_write_buffer_limits(self, high=None, low=None):
+        if high is None:
+            high = 4 * low if low is not None else 64 * 1024
+        if low is None:
+            low = high // 4
+        self.high_water, self.low_water = high, low
+
+    def get_write_buffer_limits(self):
+        return (self.low_water, self.high_water)
+
+    def get_write_buffer_size(self):
+        return len(self.buffer)
+
     def write_to_test(self, data):
         """
         Write data from the fixture to the tested code.
@@ -57,17 +92,49 @@ class DummyTransport():
         """
         self.closed = True
 
+    def pause_reading(self):
+        self.reading = False
+
+    def get_extra_info(self, name, default=None):
+        if name == "peername":
+            return ("127.0.0.1", 50000)
+        return default
+
+    def resume_reading(self):
+        self.reading = True
+
 
-class DummyRCONServer(RCONServer):
+def free_port():
+    """:return: a tcp port which is not used at the moment."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class FakeClock:
 
     def __init__(self):
-        super().__init__(self, password=test_password)
+        self.time = 0
+
+    def __call__(self):
+        return self.time
+
+
+class EchoRCONServer(RCONServer):
+    """Answers every command with its body, "quit" closes the connection."""
 
     def handle_execcommand(self, packet, connection):
-        response = RCONPacket(packet.id,
-                              RCONPacket.SERVERDATA_RESPONSE_VALUE,
-                              packet.body)
-        connection.send_packet(response)
+        if packet.body == "quit":
+            connection.close_connection()
+            return
+        connection.send_packet(RCONPacket(
+                packet.id, RCONPacket.SERVERDATA_RESPONSE_VALUE, packet.body))
+
+
+class DummyRCONServer(EchoRCONServer):
+
+    def __init__(self):
+        super().__init__(self, password=test_password)
 
 
 # Testcases
@@ -207,3 +274,547 @@ class RCONConnectionTest(unittest.TestCase):
 
         self.assertEqual(self.connection.state, "closed")
         self.assertTrue(self.transport.closed)
+
+    def test_pipelined_packets(self):
+        """
+        Tests if multiple packets received at once are all handled in order.
+        """
+        command_packet = RCONPacket(id=2,
+                                    type=RCONPacket.SERVERDATA_EXECCOMMAND,
+                                    body="commandtest")
+        check_packet = RCONPacket(id=3,
+                                  type=RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                                  body="")
+
+        self.transport.write_to_test(self.login_packet.msg()
+                                     + command_packet.msg()
+                                     + check_packet.msg())
+        self.assertEqual(self.connection.state, "authenticated")
+
+        buffer = self.transport.read()
+        packets = list()
+        while True:
+            packet, buffer = RCONPacket.from_buffer(buffer)
+            if packet is None:
+                break
+            packets.append(packet)
+
+        self.assertEqual(buffer, b"")
+        self.assertEqual([p.id for p in packets],
+                         [1000, 1000, 2, 3, 3])
+        self.assertEqual(packets[2].body, "commandtest")
+        self.assertEqual(packets[4].body, "\x00\x00\x00\x01\x00\x00\x00\x00")
+
+    def test_pipelined_packets_after_close(self):
+        """
+        Tests if packets after an invalid packet are not handled.
+        """
+        command_packet = RCONPacket(id=2,
+                                    type=RCONPacket.SERVERDATA_EXECCOMMAND,
+                                    body="commandtest")
+
+        # a command before the login is invalid and closes the connection
+        self.transport.write_to_test(command_packet.msg()
+                                     + self.login_packet.msg())
+
+        self.assertEqual(self.connection.state, "closed")
+        self.assertTrue(self.transport.closed)
+        self.assertEqual(self.transport.read(), b"")
+
+    def test_corked_send(self):
+        """
+        Tests if packets send while the connection is corked are written
+        with a single write.
+        """
+        writes = list()
+        write = self.transport.write
+
+        def counting_write(data):
+            writes.append(data)
+            write(data)
+
+        self.transport.write = counting_write
+
+        packet = RCONPacket(id=1,
+                            type=RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                            body="test")
+        self.connection.cork()
+        self.connection.send_packet(packet)
+        self.connection.send_packet(packet)
+        self.assertEqual(writes, [])
+
+        self.connection.uncork()
+        self.assertEqual(writes, [packet.msg() + packet.msg()])
+
+        # an explicit flush writes the collected packets while corked
+        self.connection.cork()
+        self.connection.send_packet(packet)
+        self.connection.flush()
+        self.assertEqual(len(writes), 2)
+        self.connection.uncork()
+        self.assertEqual(len(writes), 2)
+
+    def test_corked_send_changed_packet(self):
+        """Tests that a packet which is changed after sending it is sent as
+        it was when send_packet was called."""
+        packet = RCONPacket(id=1,
+                            type=RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                            body="first")
+        first = packet.msg()
+        self.connection.cork()
+        self.connection.send_packet(packet)
+        packet.id = 2
+        packet.body = "second"
+        self.connection.send_packet(packet)
+        self.connection.uncork()
+        self.assertEqual(self.transport.read(), first + packet.msg())
+
+    def test_login_single_write(self):
+        """Tests if both login responses are written with a single write."""
+        writes = list()
+        self.transport.write = writes.append
+        self.transport.write_to_test(self.login_packet.msg())
+        self.assertEqual(len(writes), 1)
+
+    def test_response_cache(self):
+        """Tests if cached responses are send with the id of the request."""
+        self.rcon_server.response_cache = ResponseCache(ttls={"status": 60})
+        calls = list()
+        handle_execcommand = self.rcon_server.handle_execcommand
+
+        def counting_handle_execcommand(packet, connection):
+            calls.append(packet.body)
+            handle_execcommand(packet, connection)
+
+        self.rcon_server.handle_execcommand = counting_handle_execcommand
+        self.test_password_successfull()
+
+        for id, command in enumerate(["status", "status", "other", "status"]):
+            packet = RCONPacket(id, RCONPacket.SERVERDATA_EXECCOMMAND, command)
+            self.transport.write_to_test(packet.msg())
+            response, buffer = RCONPacket.from_buffer(self.transport.read())
+            self.assertEqual(buffer, b"")
+            self.assertEqual(response.id, id)
+            self.assertEqual(response.body, command)
+
+        self.assertEqual(calls, ["status", "other"])
+        self.assertEqual(self.rcon_server.response_cache.hits, 2)
+
+    def test_router(self):
+        """Tests commands with a handler in the router."""
+        def status(packet, connection, args):
+            connection.send_packet(RCONPacket(
+                    packet.id, RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                    "status " + ",".join(args)))
+
+        self.rcon_server.router.add_command("status", status)
+        self.test_password_successfull()
+
+        for command, body in [("status a b", "status a,b"),
+                              ("other", "other")]:
+            packet = RCONPacket(2, RCONPacket.SERVERDATA_EXECCOMMAND, command)
+            self.transport.write_to_test(packet.msg())
+            response, buffer = RCONPacket.from_buffer(self.transport.read())
+            self.assertEqual(response.body, body)
+
+    def test_pause_writing(self):
+        """
+        Tests that no requests are handled while writing is paused and that
+        the buffered requests are handled when it is resumed.
+        """
+        self.test_password_successfull()
+        self.connection.pause_writing()
+        self.assertFalse(self.transport.reading)
+
+        data = b"".join(RCONPacket(i, RCONPacket.SERVERDATA_EXECCOMMAND,
+                                   str(i)).msg() for i in range(3))
+        self.transport.write_to_test(data)
+        self.assertEqual(self.transport.read(), b"")
+
+        self.connection.resume_writing()
+        self.assertTrue(self.transport.reading)
+        buffer = self.transport.read()
+        for i in range(3):
+            response, buffer = RCONPacket.from_buffer(buffer)
+            self.assertEqual(response.body, str(i))
+        self.assertEqual(buffer, b"")
+
+    def test_pause_on_high_water(self):
+        """
+        Tests that a batch of requests is stopped when the responses go above
+        the high water mark of the transport and continued when they are
+        read.
+        """
+        self.rcon_server.write_high_water = 1000
+        self.connection = RCONConnection(self.rcon_server)
+        self.transport = DummyTransport(self.connection)
+        self.test_password_successfull()
+        handled = []
+
+        def large_handle_execcommand(packet, connection):
+            handled.append(packet.id)
+            connection.send_packet(RCONMessage(
+                    id=packet.id, type=RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                    body="x" * 100000))
+
+        self.rcon_server.handle_execcommand = large_handle_execcommand
+        data = b"".join(RCONPacket(i, RCONPacket.SERVERDATA_EXECCOMMAND,
+                                   str(i)).msg() for i in range(100))
+        self.transport.write_to_test(data)
+        self.assertEqual(handled, [0])
+        self.assertFalse(self.transport.reading)
+        self.assertTrue(len(self.transport.buffer) < 110000)
+
+        # every read lets one more request through
+        self.transport.read()
+        self.assertEqual(handled, [0, 1])
+        while self.transport.read():
+            pass
+        self.assertEqual(handled, list(range(100)))
+        self.assertTrue(self.transport.reading)
+
+    def test_pause_while_handling(self):
+        """Tests that handling stops when writing is paused by a handler."""
+        self.test_password_successfull()
+
+        def pausing_handle_execcommand(packet, connection):
+            connection.send_packet(RCONPacket(
+                    packet.id, RCONPacket.SERVERDATA_RESPONSE_VALUE, "r"))
+            connection.flush()
+            connection.pause_writing()
+
+        self.rcon_server.handle_execcommand = pausing_handle_execcommand
+        data = b"".join(RCONPacket(i, RCONPacket.SERVERDATA_EXECCOMMAND,
+                                   str(i)).msg() for i in range(3))
+        self.transport.write_to_test(data)
+        response, buffer = RCONPacket.from_buffer(self.transport.read())
+        self.assertEqual(response.id, 0)
+        self.assertEqual(buffer, b"")
+
+        self.connection.resume_writing()
+        response, buffer = RCONPacket.from_buffer(self.transport.read())
+        self.assertEqual(response.id, 1)
+
+    def test_registry(self):
+        """
+        Tests that the connection is registered by its state and removed
+        when the transport is lost.
+        """
+        connections = self.rcon_server.connections
+        self.assertTrue(self.connection in connections)
+        self.assertEqual(connections.count("unauthenticated"), 1)
+
+        self.test_password_successfull()
+        self.assertEqual(connections.count("unauthenticated"), 0)
+        self.assertEqual(connections.count("authenticated"), 1)
+
+        self.connection.connection_lost(None)
+        self.assertFalse(self.connection in connections)
+        self.assertEqual(len(connections), 0)
+
+    def test_set_password(self):
+        """Tests that authenticated connections are closed."""
+        self.test_password_successfull()
+        unauthenticated = RCONConnection(self.rcon_server)
+        DummyTransport(unauthenticated)
+
+        self.rcon_server.set_password("new")
+        self.assertEqual(self.connection.state, "closed")
+        self.assertEqual(unauthenticated.state, "unauthenticated")
+
+    def test_metrics(self):
+        """Tests the counters of the metrics."""
+        self.rcon_server.metrics = ServerMetrics()
+        invalid_login_packet = RCONPacket(1, RCONPacket.SERVERDATA_AUTH, "x")
+        self.transport.write_to_test(invalid_login_packet.msg())
+        self.transport.read()
+        self.test_password_successfull()
+
+        command_packet = RCONPacket(2, RCONPacket.SERVERDATA_EXECCOMMAND,
+                                    "status 1")
+        self.transport.write_to_test(command_packet.msg())
+
+        stats = self.rcon_server.stats()
+        self.assertEqual(stats["logins"], {"successes": 1, "failures": 1})
+        self.assertEqual(stats["commands"]["status"]["count"], 1)
+        self.assertEqual(stats["commands"]["status"]["latency"]["count"], 1)
+        self.assertEqual(stats["bytes_in"],
+                         len(invalid_login_packet.msg())
+                         + len(self.login_packet.msg())
+                         + len(command_packet.msg()))
+        self.assertEqual(stats["bytes_out"], 4 * 14 + len(command_packet.msg()))
+        self.assertEqual(stats["connections"]["authenticated"], 1)
+
+    def test_tracer(self):
+        """Tests that received and sent packets are traced."""
+        logger = logging.getLogger("RCONServer.trace")
+        self.rcon_server.tracer = PacketTracer()
+        with self.assertLogs(logger, logging.DEBUG) as logs:
+            self.test_password_successfull()
+        self.assertEqual(len(logs.records), 3)
+        self.assertEqual([r.rcon_direction for r in logs.records],
+                         ["received", "sent", "sent"])
+
+    def test_timeouts(self):
+        """Tests the login, idle and lifetime timeouts."""
+        clock = FakeClock()
+        rcon_server = DummyRCONServer()
+        rcon_server.login_timeout = 5
+        rcon_server.idle_timeout = 10
+        rcon_server.max_lifetime = 100
+        rcon_server.timer_wheel = TimerWheel(RCONConnection._check_timeout,
+                                             clock=clock)
+
+        def connect():
+            connection = RCONConnection(rcon_server)
+            return connection, DummyTransport(connection)
+
+        # not authenticated in time
+        slow, slow_transport = connect()
+        clock.time = 5
+        rcon_server.timer_wheel.advance()
+        self.assertEqual(slow.state, "closed")
+        self.assertTrue(slow_transport.closed)
+
+        connection, transport = connect()
+        transport.write_to_test(self.login_packet.msg())
+        # the login timeout does not apply anymore
+        clock.time = 12
+        rcon_server.timer_wheel.advance()
+        self.assertEqual(connection.state, "authenticated")
+
+        # received data defers the idle timeout
+        command = RCONPacket(2, RCONPacket.SERVERDATA_EXECCOMMAND, "x")
+        transport.write_to_test(command.msg())
+        clock.time = 16
+        rcon_server.timer_wheel.advance()
+        self.assertEqual(connection.state, "authenticated")
+        clock.time = 22
+        rcon_server.timer_wheel.advance()
+        self.assertEqual(connection.state, "closed")
+        self.assertEqual(len(rcon_server.timer_wheel), 0)
+
+        # the total lifetime
+        rcon_server.idle_timeout = None
+        connection, transport = connect()
+        transport.write_to_test(self.login_packet.msg())
+        clock.time = 121
+        rcon_server.timer_wheel.advance()
+        self.assertEqual(connection.state, "authenticated")
+        clock.time = 122
+        rcon_server.timer_wheel.advance()
+        self.assertEqual(connection.state, "closed")
+
+    def test_auth_limiter(self):
+        """Tests that wrong passwords lead to a ban."""
+        clock = FakeClock()
+        self.rcon_server.auth_limiter = AuthLimiter(
+                per_ip_burst=10, ban_after=3, ban_duration=60, clock=clock)
+        invalid_login_packet = RCONPacket(1, RCONPacket.SERVERDATA_AUTH, "x")
+        # all attempts after the ban are dropped
+        self.transport.write_to_test(invalid_login_packet.msg() * 5)
+        buffer = self.transport.read()
+        self.assertEqual(len(buffer), 3 * 2 * 14)
+        self.assertEqual(self.connection.state, "closed")
+        self.assertTrue(self.transport.closed)
+
+        # banned ips are disconnected immediately
+        connection = RCONConnection(self.rcon_server)
+        transport = DummyTransport(connection)
+        self.assertTrue(transport.closed)
+        self.assertEqual(connection.state, "closed")
+
+        clock.time = 60
+        self.connection = RCONConnection(self.rcon_server)
+        self.transport = DummyTransport(self.connection)
+        self.test_password_successfull()
+
+    def test_auth_rate_limit(self):
+        """Tests that too many login attempts close the connection."""
+        self.rcon_server.auth_limiter = AuthLimiter(
+                per_ip_burst=2, ban_after=None, clock=FakeClock())
+        invalid_login_packet = RCONPacket(1, RCONPacket.SERVERDATA_AUTH, "x")
+        self.transport.write_to_test(invalid_login_packet.msg() * 2)
+        self.assertEqual(self.connection.state, "unauthenticated")
+        self.transport.write_to_test(self.login_packet.msg())
+        self.assertEqual(self.connection.state, "closed")
+        self.assertEqual(len(self.transport.read()), 2 * 2 * 14)
+
+    def test_password_hash(self):
+        """Tests that only a hash of the password is kept."""
+        self.assertTrue(self.rcon_server.has_password)
+        self.assertFalse(any(value == test_password
+                             for value in vars(self.rcon_server).values()))
+        self.assertTrue(self.rcon_server.check_password(test_password))
+        with self.assertWarns(DeprecationWarning):
+            self.assertTrue(self.rcon_server.password is None)
+        self.rcon_server.set_password("")
+        self.assertFalse(self.rcon_server.has_password)
+        self.assertFalse(self.rcon_server.check_password(""))
+
+    def test_admission_connections(self):
+        """Tests the limits of the connections."""
+        self.rcon_server.admission = AdmissionControl(
+                max_connections=3, max_connections_per_ip=2)
+        # the connection of setUp has no ip because it was made before
+        second = self.rcon_server.connection_factory()
+        DummyTransport(second)
+        third = self.rcon_server.connection_factory()
+        DummyTransport(third)
+        self.assertEqual(self.rcon_server.connections.count_ip("127.0.0.1"), 2)
+
+        rejected = self.rcon_server.connection_factory()
+        self.assertTrue(isinstance(rejected, RejectedConnection))
+        self.assertEqual(len(self.rcon_server.connections), 3)
+
+        self.rcon_server.admission.max_connections = None
+        fourth = self.rcon_server.connection_factory()
+        transport = DummyTransport(fourth)
+        self.assertTrue(transport.closed)
+        self.assertEqual(fourth.state, "closed")
+        self.assertEqual(
+                self.rcon_server.stats()["admission"]["rejected_connections"],
+                2)
+
+    def test_admission_shedding(self):
+        """Tests the busy response while the server is overloaded."""
+        admission = AdmissionControl(latency_threshold=0.5,
+                                     busy_response="busy",
+                                     clock=FakeClock())
+        self.rcon_server.admission = admission
+        self.test_password_successfull()
+        admission.record_latency(10)
+        commands = b"".join(
+                RCONPacket(i, RCONPacket.SERVERDATA_EXECCOMMAND, "x").msg()
+                for i in (2, 3))
+        self.transport.write_to_test(commands)
+        packets = []
+        buffer = self.transport.read()
+        while buffer:
+            packet, buffer = RCONPacket.from_buffer(buffer)
+            packets.append((packet.id, packet.body))
+        # the first command probes the latency
+        self.assertEqual(packets, [(2, "x"), (3, "busy")])
+        self.assertTrue(admission.latency < 10)
+
+
+class AsyncDummyRCONServer(RCONServer):
+
+    def __init__(self, **kwargs):
+        super().__init__(password=test_password, **kwargs)
+        self.running = 0
+        self.max_running = 0
+
+    async def handle_execcommand(self, packet, connection):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        # later commands finish first
+        await asyncio.sleep(0.01 / int(packet.body))
+        self.running -= 1
+        response = RCONPacket(packet.id,
+                              RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                              packet.body)
+        connection.send_packet(response)
+
+
+class AsyncRCONConnectionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_commands(self, rcon_server, commands):
+        """
+        Sends a login, the given *commands* each followed by an empty
+        SERVERDATA_RESPONSE_VALUE, and returns the received packets after all
+        handlers have finished.
+        """
+        connection = RCONConnection(rcon_server)
+        transport = DummyTransport(connection)
+
+        async def run():
+            data = RCONPacket(1, RCONPacket.SERVERDATA_AUTH, test_password).msg()
+            for i, command in enumerate(commands):
+                data += RCONPacket(10 + i, RCONPacket.SERVERDATA_EXECCOMMAND,
+                                   command).msg()
+                data += RCONPacket(100 + i, RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                                   "").msg()
+            transport.write_to_test(data)
+            while connection._tasks:
+                await asyncio.sleep(0.001)
+
+        self.loop.run_until_complete(run())
+
+        buffer = transport.read()
+        packets = list()
+        while True:
+            packet, buffer = RCONPacket.from_buffer(buffer)
+            if packet is None:
+                break
+            packets.append(packet)
+        return packets
+
+    def test_response_order(self):
+        """Tests if the responses are written in the order of the requests."""
+        packets = self.run_commands(AsyncDummyRCONServer(), ["1", "2", "3"])
+        self.assertEqual([p.id for p in packets],
+                         [1, 1, 10, 100, 100, 11, 101, 101, 12, 102, 102])
+        self.assertEqual([p.body for p in packets if p.id < 100 and p.id > 1],
+                         ["1", "2", "3"])
+
+    def test_concurrent_handlers(self):
+        """Tests if the handlers of one connection run concurrently."""
+        rcon_server = AsyncDummyRCONServer()
+        self.run_commands(rcon_server, ["1", "2", "3"])
+        self.assertEqual(rcon_server.max_running, 3)
+
+    def test_connection_limit(self):
+        """Tests the limit of concurrent handlers per connection."""
+        rcon_server = AsyncDummyRCONServer(max_commands_per_connection=1)
+        packets = self.run_commands(rcon_server, ["1", "2", "3"])
+        self.assertEqual(rcon_server.max_running, 1)
+        self.assertEqual(len(packets), 11)
+
+    def test_queue_limit(self):
+        """Tests that commands above the queue limit of a connection are
+        answered with an empty response."""
+        rcon_server = AsyncDummyRCONServer(max_commands_per_connection=1,
+                                           max_queued_per_connection=2)
+        packets = self.run_commands(rcon_server, ["1", "2", "3"])
+        self.assertEqual([(p.id, p.body) for p in packets if 1 < p.id < 100],
+                         [(10, "1"), (11, "2"), (12, "")])
+
+    def test_failed_handler(self):
+        """Tests that a failed handler is answered with an empty response."""
+        with self.assertLogs("RCONServer", logging.ERROR):
+            # "0" divides by zero
+            packets = self.run_commands(AsyncDummyRCONServer(),
+                                        ["1", "0", "2"])
+        self.assertEqual([(p.id, p.body) for p in packets if 1 < p.id < 100],
+                         [(10, "1"), (11, ""), (12, "2")])
+
+    def test_metrics(self):
+        """Tests the latency of async handlers."""
+        rcon_server = AsyncDummyRCONServer(metrics=ServerMetrics())
+        self.run_commands(rcon_server, ["1", "2"])
+        stats = rcon_server.metrics.commands
+        self.assertEqual(stats["1"].count, 1)
+        self.assertTrue(stats["1"].latency.sum >= 0.01)
+
+    def test_inflight_limit(self):
+        """Tests that commands above the in-flight limit are shed."""
+        rcon_server = AsyncDummyRCONServer(
+                admission=AdmissionControl(max_inflight_commands=2))
+        packets = self.run_commands(rcon_server, ["1", "2", "3"])
+        self.assertEqual([p.body for p in packets if 1 < p.id < 100],
+                         ["1", "2", "server busy"])
+        self.assertEqual(rcon_server.admission.inflight, 0)
+        self.assertTrue(rcon_server.admission.latency > 0)
+
+    def test_server_limit(self):
+        """Tests the limit of concurrent handlers over all connections."""
+        rcon_server = AsyncDummyRCONServer(max_commands=2)
+        self.run_commands(rcon_server, ["1", "2", "3"])
+        self.assertEqual(rcon_server.max_running, 2)
@@ -0,0 +1,97 @@
+import unittest
+
+from .rcon_packet import RCONPacket
+from .rcon_decoder import RCONDecoder
+from .util import to_int32
+
+
+class RCONDecoderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.decoder = RCONDecoder()
+        self.packet1 = RCONPacket(id=1,
+                                  type=RCONPacket.SERVERDATA_EXECCOMMAND,
+                                  body="test1")
+        self.packet2 = RCONPacket(id=2,
+                                  type=RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                                  body="")
+
+    def test_empty(self):
+        """Tests an empty decoder."""
+        self.assertTrue(self.decoder.next_packet() is None)
+        self.assertEqual(len(self.decoder), 0)
+
+    def test_incomplete_header(self):
+        """Tests a buffer which does not contain the whole header."""
+        self.decoder.feed(self.packet1.msg()[:10])
+        self.assertTrue(self.decoder.next_packet() is None)
+        self.assertEqual(len(self.decoder), 10)
+
+    def test_incomplete_body(self):
+        """Tests a buffer which does not contain the whole body."""
+        self.decoder.feed(self.packet1.msg()[:-1])
+        self.assertTrue(self.decoder.next_packet() is None)
+
+    def test_single_packet(self):
+        """Tests a buffer with exactly one packet."""
+        self.decoder.feed(self.packet1.msg())
+        packet = self.decoder.next_packet()
+        self.assertEqual(packet.id, self.packet1.id)
+        self.assertEqual(packet.type, self.packet1.type)
+        self.assertEqual(packet.body, self.packet1.body)
+        self.assertEqual(len(self.decoder), 0)
+        self.assertTrue(self.decoder.next_packet() is None)
+
+    def test_multiple_packets(self):
+        """Tests a buffer with multiple packets and a trailing fragment."""
+        self.decoder.feed(self.packet1.msg() + self.packet2.msg() + b"asdf")
+        packets = list(self.decoder)
+        self.assertEqual(len(packets), 2)
+        self.assertEqual(packets[0].body, "test1")
+        self.assertEqual(packets[1].id, 2)
+        self.assertEqual(len(self.decoder), 4)
+
+    def test_byte_by_byte(self):
+        """Tests feeding the packets one byte at a time."""
+        data = self.packet1.msg() + self.packet2.msg()
+        packets = list()
+        for i in range(len(data)):
+            self.decoder.feed(data[i:i+1])
+            packets.extend(self.decoder)
+        self.assertEqual([p.id for p in packets], [1, 2])
+        self.assertEqual(len(self.decoder), 0)
+
+    def test_compaction(self):
+        """Tests that consumed data is removed after the threshold."""
+        decoder = RCONDecoder(compact_threshold=1)
+        decoder.feed(self.packet1.msg() + self.packet2.msg()[:5])
+        decoder.next_packet()
+        self.assertEqual(len(decoder), 5)
+        self.assertEqual(len(decoder._buffer), 5)
+        decoder.feed(self.packet2.msg()[5:])
+        self.assertEqual(decoder.next_packet().id, 2)
+
+    def test_too_small_size(self):
+        """Tests a packet with an invalid size field."""
+        self.decoder.feed(to_int32(9) + to_int32(0) + to_int32(0) + b"\x00")
+        with self.assertRaises(AssertionError):
+            self.decoder.next_packet()
+
+    def test_too_large_size(self):
+        """Tests that a packet above the maximum size is rejected as soon as
+        its header is received."""
+        self.decoder.feed(to_int32(2 ** 31 - 1) + to_int32(0) + to_int32(2))
+        with self.assertRaises(ValueError):
+            self.decoder.next_packet()
+        decoder = RCONDecoder()
+        packet = RCONPacket(1, RCONPacket.SERVERDATA_EXECCOMMAND, "a" * 4086)
+        decoder.feed(packet.msg())
+        self.assertEqual(decoder.next_packet().body, packet.body)
+
+    def test_invalid_type(self):
+        """Tests that an invalid packet is consumed before raising."""
+        self.decoder.feed(to_int32(10) + to_int32(0) + to_int32(1) + b"\x00\x00")
+        self.decoder.feed(self.packet1.msg())
+        with self.assertRaises(ValueError):
+            self.decoder.next_packet()
+        self.assertEqual(self.decoder.next_packet().body, "test1")
@@ -0,0 +1,52 @@
+import unittest
+
+from .rcon_packet import RCONPacket
+from .rcon_message import RCONMessage
+from .rcon_encoder import encoded_size, encode_into, encode, \
+    EncodedResponse
+
+
+class RCONEncoderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.packet = RCONPacket(id=1,
+                                 type=RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                                 body="test")
+        self.message = RCONMessage(id=2,
+                                   type=RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                                   body="a"*5000)
+
+    def test_encoded_size(self):
+        """Tests the size of packets, messages and bytes."""
+        self.assertEqual(encoded_size([]), 0)
+        self.assertEqual(encoded_size([self.packet]), len(self.packet.msg()))
+        self.assertEqual(encoded_size([self.message, b"asdf"]),
+                         len(self.message.msg()) + 4)
+
+    def test_encode(self):
+        """Tests encoding mixed items into one buffer."""
+        items = [self.packet, self.message, b"asdf", self.packet]
+        expected = (self.packet.msg() + self.message.msg() + b"asdf"
+                    + self.packet.msg())
+        self.assertEqual(encode(items), expected)
+
+    def test_encode_into_offset(self):
+        """Tests encoding into a memoryview at an offset."""
+        buffer = bytearray(b"x" * (2 + self.packet.wire_size))
+        end = encode_into([self.packet], memoryview(buffer), 2)
+        self.assertEqual(end, len(buffer))
+        self.assertEqual(buffer, b"xx" + self.packet.msg())
+
+    def test_packet_msg_into(self):
+        """Tests RCONPacket.msg_into against RCONPacket.msg."""
+        buffer = bytearray(self.packet.wire_size)
+        self.assertEqual(self.packet.msg_into(buffer), len(buffer))
+        self.assertEqual(buffer, self.packet.msg())
+
+    def test_encoded_response_with_id(self):
+        """Tests replacing the ids of an EncodedResponse."""
+        response = EncodedResponse(self.packet.msg(), [4])
+        copy = response.with_id(7)
+        self.assertEqual(RCONPacket.from_buffer(copy)[0].id, 7)
+        self.assertEqual(copy.id_offsets, [4])
+        self.assertEqual(response, self.packet.msg())
@@ -0,0 +1,154 @@
+import asyncio
+import multiprocessing
+import os
+import time
+import unittest
+
+from .rcon_host import RCONHost
+from .rcon_server import RCONServer
+from .rcon_packet import RCONPacket
+from .rcon_metrics import ServerMetrics
+from .rcon_client import RCONClient, ConnectionClosedError
+from .rcon_async_client import AsyncRCONClient
+from .test_rcon_connection import free_port
+
+
+class NamedRCONServer(RCONServer):
+    """Answers every command with its name and the pid of the process."""
+
+    def __init__(self, name, **kwargs):
+        super().__init__(password=f"password-{name}", **kwargs)
+        self.name = name
+
+    def handle_execcommand(self, packet, connection):
+        connection.send_packet(RCONPacket(
+                packet.id, RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                f"{self.name} {os.getpid()}"))
+
+
+class RCONHostTest(unittest.TestCase):
+
+    def test_many_servers(self):
+        """Tests many servers with their own passwords in one loop."""
+        metrics = ServerMetrics()
+        host = RCONHost((NamedRCONServer(i, bind=("127.0.0.1", 0))
+                         for i in range(50)), metrics=metrics)
+
+        async def run():
+            async with host:
+                addresses = host.addresses()
+                self.assertEqual(len(set(addresses)), 50)
+                responses = []
+                for i in (0, 17, 49):
+                    client = AsyncRCONClient(*addresses[i], f"password-{i}")
+                    await client.connect()
+                    await client.login()
+                    responses.append(await client.send_command("name"))
+                    await client.disconnect()
+                return responses
+
+        responses = asyncio.run(run())
+        self.assertEqual([response.split()[0] for response in responses],
+                         ["0", "17", "49"])
+        self.assertEqual(metrics.commands["name"].count, 3)
+        self.assertEqual(metrics.login_successes, 3)
+        self.assertTrue(all(server.address is None
+                            for server in host.servers))
+
+    def test_shared_timer_wheel(self):
+        """Tests that the servers share the timer wheel of the host."""
+        with_timeout = NamedRCONServer("a", login_timeout=5)
+        without_timeout = NamedRCONServer("b")
+        own_metrics = ServerMetrics()
+        with_metrics = NamedRCONServer("c", metrics=own_metrics)
+        host = RCONHost([with_timeout, without_timeout, with_metrics],
+                        metrics=ServerMetrics())
+        self.assertTrue(with_timeout.timer_wheel is host.timer_wheel)
+        self.assertTrue(without_timeout.timer_wheel is None)
+        self.assertTrue(without_timeout.metrics is host.metrics)
+        self.assertTrue(with_metrics.metrics is own_metrics)
+
+    def test_close_timers(self):
+        """Tests that no timer of the shared wheel is left after close."""
+        host = RCONHost([NamedRCONServer(i, bind=("127.0.0.1", 0),
+                                         login_timeout=5, idle_timeout=5)
+                         for i in range(3)], timer_resolution=0.01)
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            await host.start()
+            clients = []
+            for i, address in enumerate(host.addresses()):
+                client = AsyncRCONClient(*address, f"password-{i}")
+                await client.connect()
+                if i:
+                    await client.login()
+                clients.append(client)
+            await asyncio.sleep(0.05)
+            self.assertEqual(len(host.timer_wheel), 3)
+            await host.close()
+            for client in clients:
+                await client.disconnect()
+            handles = [handle for handle in loop._scheduled
+                       if not handle.cancelled()
+                       and getattr(handle._callback, "__self__", None)
+                       is host.timer_wheel]
+            self.assertEqual(handles, [])
+            self.assertEqual(len(host.timer_wheel), 0)
+
+        asyncio.run(run())
+
+    def test_close_connections(self):
+        """Tests that closing the host closes the connections."""
+        host = RCONHost([NamedRCONServer("a", bind=("127.0.0.1", 0))])
+
+        async def run():
+            await host.start()
+            client = AsyncRCONClient(*host.addresses()[0], "password-a")
+            await client.connect()
+            await client.login()
+            await host.close()
+            with self.assertRaises(ConnectionClosedError):
+                await client.send_command("name")
+            await client.disconnect()
+
+        asyncio.run(run())
+
+
+class RCONHostWorkersTest(unittest.TestCase):
+
+    def test_workers(self):
+        """Tests that the servers are spread over the worker processes."""
+        ports = [free_port() for _ in range(4)]
+        host = RCONHost(NamedRCONServer(i, bind=("127.0.0.1", port))
+                        for i, port in enumerate(ports))
+        context = multiprocessing.get_context("fork")
+        supervisor = context.Process(target=host.run, kwargs={"workers": 2})
+        supervisor.start()
+        try:
+            pids = {}
+            for i, port in enumerate(ports):
+                name, pid = self.send_command(port, f"password-{i}")
+                self.assertEqual(name, str(i))
+                pids[i] = pid
+            self.assertEqual(pids[0], pids[2])
+            self.assertEqual(pids[1], pids[3])
+            self.assertNotEqual(pids[0], pids[1])
+        finally:
+            supervisor.terminate()
+            supervisor.join(10)
+        self.assertEqual(supervisor.exitcode, 0)
+
+    def send_command(self, port, password):
+        for _ in range(100):
+            client = RCONClient("127.0.0.1", port, password)
+            try:
+                client.connect()
+                client.login()
+                return client.send_command("name").split()
+            except (ConnectionError, ConnectionClosedError):
+                # the worker is not started yet
+                time.sleep(0.05)
+            finally:
+                client.disconnect()
+        self.fail("could not connect to the server")
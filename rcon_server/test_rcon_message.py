@@ -158,7 +158,48 @@ class RCONMessageTest(unittest.TestCase):
             self.assertEqual(packet.type, RCONPacket.SERVERDATA_AUTH_RESPONSE)
 
     def test_size_getter_single_packet(self):
-        pass
+        message = RCONMessage(id=0, type=RCONPacket.SERVERDATA_AUTH, body="test")
+        self.assertEqual(message.size, 14)
+        self.assertEqual(message.wire_size, len(message.msg()))
 
     def test_size_getter_multiple_packet(self):
-        pass
+        message = RCONMessage(id=0,
+                              type=RCONPacket.SERVERDATA_AUTH,
+                              body=self.very_long_body)
+        self.assertEqual(message.size, 5000 + 2*10)
+        self.assertEqual(message.wire_size, len(message.msg()))
+        self.assertEqual(message.size, sum(p.size for p in message.packets))
+
+    def test_lazy_msg(self):
+        """Tests that a message from a body encodes like its packets."""
+        for length in (0, 1, 4086, 4087, 3*4086, 10000):
+            message = RCONMessage(id=7,
+                                  type=RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                                  body="b"*length)
+            encoded = message.msg()
+            self.assertEqual(b"".join(message.iter_msg()), encoded)
+            self.assertEqual(message.num_packets, len(list(message)))
+            self.assertEqual(encoded,
+                             b"".join(p.msg() for p in message.packets))
+
+    def test_lazy_iter(self):
+        """Tests that iterating over a message does not build the packet list."""
+        message = RCONMessage(id=0,
+                              type=RCONPacket.SERVERDATA_AUTH,
+                              body=self.very_long_body)
+        self.assertEqual("".join(p.body for p in message), self.very_long_body)
+        self.assertTrue(message._packets is None)
+
+    def test_body_setter_after_packets(self):
+        """Tests setting the body of a message built from packets."""
+        message = RCONMessage([self.packet1, self.packet2])
+        message.body = self.very_long_body
+        self.assertEqual(message.id, 1)
+        self.assertEqual(message.type, RCONPacket.SERVERDATA_RESPONSE_VALUE)
+        self.assertEqual(message.body, self.very_long_body)
+        self.assertEqual(len(message.packets), 2)
+
+    def test_body_setter_invalid(self):
+        """Tests that the body needs to be a string."""
+        with self.assertRaises(ValueError):
+            RCONMessage(id=0, type=RCONPacket.SERVERDATA_AUTH, body=b"test")
@@ -0,0 +1,56 @@
+import math
+import unittest
+
+from .rcon_metrics import LatencyHistogram, ServerMetrics
+
+
+class LatencyHistogramTest(unittest.TestCase):
+
+    def setUp(self):
+        self.histogram = LatencyHistogram()
+
+    def test_buckets(self):
+        """Tests the bucket of some latencies."""
+        for seconds in (0, 0.5e-6, 1e-6, 3e-6, 1000):
+            self.histogram.record(seconds)
+        self.assertEqual(self.histogram.counts[0], 2)
+        self.assertEqual(self.histogram.counts[1], 1)
+        self.assertEqual(self.histogram.counts[2], 1)
+        self.assertEqual(self.histogram.counts[-1], 1)
+        self.assertEqual(self.histogram.count, 5)
+        self.assertEqual(LatencyHistogram.upper_bound(2), 4e-6)
+        self.assertEqual(LatencyHistogram.upper_bound(
+                LatencyHistogram.NUM_BUCKETS - 1), math.inf)
+
+    def test_percentile(self):
+        """Tests the percentiles estimated from the buckets."""
+        self.assertTrue(self.histogram.percentile(0.5) is None)
+        for _ in range(99):
+            self.histogram.record(3e-6)
+        self.histogram.record(0.1)
+        self.assertEqual(self.histogram.percentile(0.5), 4e-6)
+        self.assertEqual(self.histogram.percentile(0.99), 4e-6)
+        self.assertTrue(self.histogram.percentile(1) > 0.1)
+
+
+class ServerMetricsTest(unittest.TestCase):
+
+    def test_command_names(self):
+        """Tests that commands are counted by their first word."""
+        metrics = ServerMetrics()
+        metrics.record_command("kick bob", 0.001)
+        metrics.record_command("kick alice", 0.001, error=True)
+        metrics.record_command("", 0.001)
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["commands"]["kick"]["count"], 2)
+        self.assertEqual(snapshot["commands"]["kick"]["errors"], 1)
+        self.assertEqual(snapshot["commands"][""]["count"], 1)
+
+    def test_max_command_names(self):
+        """Tests that the number of command names is bounded."""
+        metrics = ServerMetrics()
+        metrics.MAX_COMMAND_NAMES = 2
+        for name in ("a", "b", "c", "d"):
+            metrics.record_command(name, 0)
+        self.assertEqual(sorted(metrics.commands), ["a", "b", "other"])
+        self.assertEqual(metrics.commands["other"].count, 2)
@@ -102,3 +102,26 @@ class TestRconPacket(unittest.TestCase):
         self.assertEqual(packet.type, 0)
         self.assertEqual(packet.body, "testtestte")
         self.assertEqual(packet.size, 20)
+
+    def test_from_buffer_invalid_type(self):
+        size = to_int32(4+4+1+1)
+        type = to_int32(1)
+        id = to_int32(0)
+        buffer = size + id + type + b"\x00\x00"
+        with self.assertRaises(ValueError):
+            RCONPacket.from_buffer(buffer)
+
+    def test_slots(self):
+        """Tests that packets do not have a per instance __dict__."""
+        packet = RCONPacket()
+        self.assertFalse(hasattr(packet, "__dict__"))
+        with self.assertRaises(AttributeError):
+            packet.foo = 1
+
+    def test_from_trusted(self):
+        """Tests the constructor without validation."""
+        packet = RCONPacket._from_trusted(5, RCONPacket.SERVERDATA_AUTH, "asdf")
+        self.assertEqual(packet.id, 5)
+        self.assertEqual(packet.type, RCONPacket.SERVERDATA_AUTH)
+        self.assertEqual(packet.body, "asdf")
+        self.assertEqual(packet.msg(), RCONPacket(5, 3, "asdf").msg())
@@ -0,0 +1,172 @@
+import asyncio
+import os
+import threading
+import unittest
+
+from .rcon_packet import RCONPacket
+from .rcon_client import RCONClient, PasswordError
+from .rcon_async_client import AsyncRCONClient
+from .rcon_pool import RCONClientPool, AsyncRCONClientPool, PoolTimeout
+from .test_rcon_connection import FakeClock, EchoRCONServer
+
+test_password = "test"
+
+
+class PoolTestCase(unittest.TestCase):
+
+    def setUp(self):
+        """Starts a server in a background event loop."""
+        self.rcon_server = EchoRCONServer(password=test_password)
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(self.loop.create_server(
+                self.rcon_server.connection_factory, "127.0.0.1", 0))
+        self.endpoint = ("127.0.0.1", self.server.sockets[0].getsockname()[1],
+                         test_password)
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.start()
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.server.close()
+        self.loop.run_until_complete(self.server.wait_closed())
+        self.loop.close()
+
+
+class RCONClientPoolTest(PoolTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.pool = RCONClientPool(max_size=1, idle_timeout=10,
+                                   checkout_timeout=0.05, clock=self.clock)
+
+    def tearDown(self):
+        self.pool.close()
+        super().tearDown()
+
+    def test_reuse(self):
+        """Tests that the connection is reused."""
+        with self.pool.connection(*self.endpoint) as client:
+            self.assertEqual(client.send_command("a"), "a")
+        with self.pool.connection(*self.endpoint) as second_client:
+            self.assertTrue(second_client is client)
+            self.assertEqual(client.send_command("b"), "b")
+        self.assertEqual(self.pool.size(*self.endpoint), 1)
+
+    def test_idle_timeout(self):
+        """Tests that expired connections are not reused."""
+        with self.pool.connection(*self.endpoint) as client:
+            pass
+        self.clock.time = 11
+        with self.pool.connection(*self.endpoint) as second_client:
+            self.assertFalse(second_client is client)
+
+    def test_closed_by_server(self):
+        """Tests that connections closed by the server are not reused."""
+        with self.pool.connection(*self.endpoint) as client:
+            client.send_packet(RCONPacket(100,
+                                          RCONPacket.SERVERDATA_EXECCOMMAND,
+                                          "quit"))
+        # wait for the server to close the connection
+        for _ in range(100):
+            if not client.is_connected:
+                break
+            threading.Event().wait(0.01)
+        with self.pool.connection(*self.endpoint) as second_client:
+            self.assertFalse(second_client is client)
+            self.assertEqual(second_client.send_command("a"), "a")
+
+    def test_client_close(self):
+        """Tests is_connected and close of the client."""
+        client = RCONClient(*self.endpoint)
+        self.assertFalse(client.is_connected)
+        client.close()
+        client.connect()
+        self.assertTrue(client.is_connected)
+        client.close()
+        self.assertFalse(client.is_connected)
+        client.close()
+
+    def test_many_open_files(self):
+        """Tests that connections with a file descriptor above the limit of
+        select are reused."""
+        files = []
+        try:
+            while not files or files[-1].fileno() < 1100:
+                files.append(open(os.devnull))
+        except OSError:
+            self.skipTest("can not open enough files")
+        try:
+            with self.pool.connection(*self.endpoint) as client:
+                self.assertTrue(client._socket.fileno() >= 1024)
+            with self.pool.connection(*self.endpoint) as second_client:
+                self.assertTrue(second_client is client)
+        finally:
+            for f in files:
+                f.close()
+
+    def test_discard_on_error(self):
+        """Tests that a connection is dropped after an exception."""
+        with self.assertRaises(RuntimeError):
+            with self.pool.connection(*self.endpoint):
+                raise RuntimeError
+        self.assertEqual(self.pool.size(*self.endpoint), 0)
+
+    def test_checkout_timeout(self):
+        """Tests the timeout if all connections are in use."""
+        pool = RCONClientPool(max_size=1, checkout_timeout=0.05)
+        with pool.connection(*self.endpoint):
+            with self.assertRaises(PoolTimeout):
+                pool.checkout(*self.endpoint)
+        pool.close()
+
+    def test_wrong_password(self):
+        """Tests that failed logins do not use up the pool."""
+        ip, port, _ = self.endpoint
+        with self.assertRaises(PasswordError):
+            self.pool.checkout(ip, port, "wrong")
+        self.assertEqual(self.pool.size(ip, port, "wrong"), 0)
+
+
+class AsyncRCONClientPoolTest(PoolTestCase):
+
+    def test_reuse(self):
+        """Tests that the connection is reused."""
+        async def run():
+            pool = AsyncRCONClientPool(max_size=1, clock=self.clock)
+            async with pool.connection(*self.endpoint) as client:
+                self.assertEqual(await client.send_command("a"), "a")
+            async with pool.connection(*self.endpoint) as second_client:
+                self.assertTrue(second_client is client)
+            await pool.close()
+            self.assertTrue(client.closed)
+        asyncio.run(run())
+
+    def test_client_close(self):
+        """Tests is_connected and close of the client."""
+        async def run():
+            client = AsyncRCONClient(*self.endpoint)
+            self.assertFalse(client.is_connected)
+            client.close()
+            await client.connect()
+            self.assertTrue(client.is_connected)
+            client.close()
+            # the read task notices the closed transport
+            for _ in range(100):
+                if not client.is_connected:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertFalse(client.is_connected)
+            await client.disconnect()
+        asyncio.run(run())
+
+    def test_checkout_timeout(self):
+        """Tests the timeout if all connections are in use."""
+        async def run():
+            pool = AsyncRCONClientPool(max_size=1, checkout_timeout=0.05)
+            async with pool.connection(*self.endpoint):
+                with self.assertRaises(PoolTimeout):
+                    await pool.checkout(*self.endpoint)
+            await pool.close()
+        asyncio.run(run())
@@ -0,0 +1,72 @@
+import unittest
+
+from .rcon_registry import ConnectionRegistry
+
+
+class DummyConnection:
+
+    def __init__(self, state="unauthenticated"):
+        self.state = state
+
+
+class ConnectionRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = ConnectionRegistry()
+        self.connection1 = DummyConnection()
+        self.connection2 = DummyConnection()
+        self.registry.add(self.connection1)
+        self.registry.add(self.connection2)
+
+    def test_add(self):
+        """Tests that connections get distinct ids."""
+        self.assertNotEqual(self.connection1.connection_id,
+                            self.connection2.connection_id)
+        self.assertEqual(len(self.registry), 2)
+        self.assertTrue(self.connection1 in self.registry)
+        self.assertTrue(
+                self.registry.get(self.connection1.connection_id)
+                is self.connection1)
+
+    def test_update_state(self):
+        """Tests the index by state."""
+        self.connection1.state = "authenticated"
+        self.registry.update_state(self.connection1, "unauthenticated",
+                                   "authenticated")
+        self.assertEqual(self.registry.counts(),
+                         {"unauthenticated": 1, "authenticated": 1,
+                          "closed": 0})
+        self.assertEqual(self.registry.by_state("authenticated"),
+                         [self.connection1])
+        self.assertEqual(sorted(self.registry.snapshot()),
+                         [(self.connection1.connection_id, "authenticated"),
+                          (self.connection2.connection_id, "unauthenticated")])
+
+    def test_remove(self):
+        """Tests removing connections."""
+        self.registry.remove(self.connection1)
+        self.registry.remove(self.connection1)
+        self.assertEqual(self.registry.count(), 1)
+        self.assertEqual(self.registry.count("unauthenticated"), 1)
+        self.assertFalse(self.connection1 in self.registry)
+        self.assertEqual(list(self.registry), [self.connection2])
+
+        # state changes of removed connections are ignored
+        self.registry.update_state(self.connection1, "unauthenticated",
+                                   "closed")
+        self.assertEqual(self.registry.count("closed"), 0)
+
+    def test_ips(self):
+        """Tests counting the connections per ip."""
+        self.registry.set_ip(self.connection1, "10.0.0.1")
+        self.registry.set_ip(self.connection1, "10.0.0.1")
+        self.registry.set_ip(self.connection2, "10.0.0.1")
+        self.assertEqual(self.registry.count_ip("10.0.0.1"), 2)
+        self.assertEqual(self.registry.count_ip("10.0.0.2"), 0)
+        self.registry.remove(self.connection1)
+        self.assertEqual(self.registry.count_ip("10.0.0.1"), 1)
+        self.registry.remove(self.connection2)
+        self.assertEqual(self.registry.count_ip("10.0.0.1"), 0)
+        # connections which are not registered are ignored
+        self.registry.set_ip(self.connection1, "10.0.0.1")
+        self.assertEqual(self.registry.count_ip("10.0.0.1"), 0)
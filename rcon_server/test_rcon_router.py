@@ -0,0 +1,118 @@
+import re
+import unittest
+
+from .rcon_router import CommandRouter
+
+
+def handler_a(packet, connection, args):
+    return "a"
+
+
+def handler_b(packet, connection, args):
+    return "b"
+
+
+def handler_c(packet, connection, args):
+    return "c"
+
+
+class CommandRouterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.router = CommandRouter()
+
+    def test_empty(self):
+        """Tests a router without routes."""
+        self.assertFalse(self.router)
+        self.assertTrue(self.router.route("status") is None)
+
+    def test_command(self):
+        """Tests routing by the command name."""
+        self.router.add_command("kick", handler_a)
+        self.assertTrue(self.router)
+        self.assertEqual(self.router.route("kick"), (handler_a, []))
+        self.assertEqual(self.router.route("kick  bob  now"),
+                         (handler_a, ["bob", "now"]))
+        self.assertTrue(self.router.route("kickbob") is None)
+        self.assertTrue(self.router.route("") is None)
+
+    def test_prefix(self):
+        """Tests that the longest prefix wins."""
+        self.router.add_prefix("sv_", handler_a)
+        self.router.add_prefix("sv_cheats", handler_b)
+        self.assertEqual(self.router.route("sv_gravity 800"),
+                         (handler_a, ["gravity", "800"]))
+        self.assertEqual(self.router.route("sv_cheats 1"), (handler_b, ["1"]))
+        self.assertEqual(self.router.route("sv_cheats"), (handler_b, []))
+        self.assertTrue(self.router.route("sv") is None)
+
+    def test_pattern(self):
+        """Tests that the first matching pattern wins."""
+        self.router.add_pattern(r"say (.*)", handler_a)
+        self.router.add_pattern(r"(\w+) (\d+)", handler_b)
+        self.router.add_pattern(r"say (\d+)", handler_c)
+        self.assertEqual(self.router.route("say 12"), (handler_a, ("12",)))
+        self.assertEqual(self.router.route("map 12"),
+                         (handler_b, ("map", "12")))
+        self.assertTrue(self.router.route("map de_dust") is None)
+
+    def test_duplicate_group_names(self):
+        """Tests patterns which can not be combined into one regex."""
+        self.router.add_pattern(r"kick (?P<name>\w+)", handler_a)
+        self.router.add_pattern(r"ban (?P<name>\w+)", handler_b)
+        self.assertEqual(self.router.route("ban bob"), (handler_b, ("bob",)))
+
+    def test_backreference(self):
+        """Tests patterns with numeric backreferences."""
+        self.router.add_pattern(r"say (.*)", handler_a)
+        self.router.add_pattern(r"(\w+) \1", handler_b)
+        self.router.add_pattern(r"\\1 (\w+)", handler_c)
+        self.assertEqual(self.router.route("say hi"), (handler_a, ("hi",)))
+        self.assertEqual(self.router.route("bob bob"), (handler_b, ("bob",)))
+        self.assertTrue(self.router.route("bob alice") is None)
+        self.assertEqual(self.router.route("\\1 bob"),
+                         (handler_c, ("bob",)))
+
+    def test_compiled_pattern(self):
+        """Tests that the flags of a compiled pattern are kept."""
+        self.router.add_pattern(r"say (.*)", handler_a)
+        self.router.add_pattern(re.compile(r"kick (\w+)", re.I), handler_b)
+        self.assertEqual(self.router.route("KICK bob"), (handler_b, ("bob",)))
+        self.assertEqual(self.router.route("say hi"), (handler_a, ("hi",)))
+
+    def test_nested_groups(self):
+        """Tests that only the groups of the matching pattern are returned."""
+        self.router.add_pattern(r"kick ((\w+)@(\w+))?", handler_a)
+        self.router.add_pattern(r"ban (\w+)( \d+)?", handler_b)
+        self.assertEqual(self.router.route("kick bob@x"),
+                         (handler_a, ("bob@x", "bob", "x")))
+        self.assertEqual(self.router.route("kick "),
+                         (handler_a, (None, None, None)))
+        self.assertEqual(self.router.route("ban bob"),
+                         (handler_b, ("bob", None)))
+
+    def test_precedence(self):
+        """Tests that names precede prefixes which precede patterns."""
+        self.router.add_pattern(r"status.*", handler_c)
+        self.router.add_prefix("stat", handler_b)
+        self.assertEqual(self.router.route("status")[0], handler_b)
+        self.router.add_command("status", handler_a)
+        self.assertEqual(self.router.route("status")[0], handler_a)
+
+    def test_decorators(self):
+        """Tests the decorators."""
+        @self.router.command("users")
+        def users(packet, connection, args):
+            pass
+
+        @self.router.prefix("mp_")
+        def mp(packet, connection, args):
+            pass
+
+        @self.router.pattern(r"echo (.*)")
+        def echo(packet, connection, args):
+            pass
+
+        self.assertEqual(self.router.route("users")[0], users)
+        self.assertEqual(self.router.route("mp_timelimit 5")[0], mp)
+        self.assertEqual(self.router.route("echo hi")[0], echo)
@@ -0,0 +1,211 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from .rcon_scripted import ScriptedRCONServer, RuleError, compile_rules, \
+    tomllib, _Template
+from .rcon_connection import RCONConnection
+from .rcon_packet import RCONPacket
+from .rcon_async_client import AsyncRCONClient
+from .rcon_cache import ResponseCache
+from .test_rcon_connection import DummyTransport
+
+test_password = "test"
+
+RULES = {
+    "rules": [
+        {"command": "status", "response": ["hostname: mock", "players: 0"]},
+        {"prefix": "say ", "response": "said {args}"},
+        {"pattern": r"kick (\w+)(?: (\w+))?", "response": "kicked {0} {1}."},
+        {"command": "slow", "response": "done", "delay": 0.01},
+        {"command": "dump", "response": "x", "repeat": 5000},
+        {"command": "braces", "response": "{{not a field}}"},
+    ],
+    "default": "Unknown command \"{command}\"",
+}
+
+
+class ScriptedRCONServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "rules.json")
+        self.write_rules(RULES)
+        self.rcon_server = ScriptedRCONServer(self.path,
+                                              password=test_password)
+        self.connection = RCONConnection(self.rcon_server)
+        self.transport = DummyTransport(self.connection)
+        self.transport.write_to_test(
+                RCONPacket(1, RCONPacket.SERVERDATA_AUTH, test_password).msg())
+        self.transport.read()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_rules(self, rules, path=None):
+        with open(path or self.path, "w") as f:
+            json.dump(rules, f)
+
+    def command(self, command, id=5):
+        """:return: the packets of the response to *command*."""
+        self.transport.write_to_test(
+                RCONPacket(id, RCONPacket.SERVERDATA_EXECCOMMAND,
+                           command).msg())
+        buffer = self.transport.read()
+        packets = []
+        while buffer:
+            packet, buffer = RCONPacket.from_buffer(buffer)
+            packets.append(packet)
+        return packets
+
+    def response(self, command, id=5):
+        packets = self.command(command, id)
+        self.assertTrue(all(packet.id == id for packet in packets))
+        return "".join(packet.body for packet in packets)
+
+    def test_rules(self):
+        """Tests the responses of the different kinds of rules."""
+        self.assertEqual(self.response("status"),
+                         "hostname: mock\nplayers: 0")
+        self.assertEqual(self.response("status", id=9),
+                         "hostname: mock\nplayers: 0")
+        self.assertEqual(self.response("say hello world"),
+                         "said hello world")
+        self.assertEqual(self.response("kick bob"), "kicked bob .")
+        self.assertEqual(self.response("kick bob now"), "kicked bob now.")
+        self.assertEqual(self.response("braces"), "{not a field}")
+        self.assertEqual(self.response("other 1"),
+                         "Unknown command \"other 1\"")
+
+    def test_multi_packet(self):
+        """Tests that long responses are split into packets."""
+        packets = self.command("dump", id=3)
+        self.assertEqual(len(packets), 2)
+        self.assertEqual([p.id for p in packets], [3, 3])
+        self.assertEqual("".join(p.body for p in packets), "x" * 5000)
+
+    def test_delay(self):
+        """Tests that delayed responses are send after the delay."""
+        server = ScriptedRCONServer(self.path, bind=("127.0.0.1", 0),
+                                    password=test_password)
+
+        async def run():
+            await server.start()
+            client = AsyncRCONClient(*server.address, test_password)
+            await client.connect()
+            await client.login()
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            responses = await asyncio.gather(client.send_command("slow"),
+                                             client.send_command("status"))
+            self.assertTrue(loop.time() - start >= 0.01)
+            await client.disconnect()
+            await server.close()
+            return responses
+
+        self.assertEqual(asyncio.run(run()),
+                         ["done", "hostname: mock\nplayers: 0"])
+
+    def test_reload(self):
+        """Tests that reloading replaces the rules and keeps connections."""
+        self.write_rules({"rules": [{"command": "status",
+                                     "response": "new"}]})
+        os.utime(self.path, ns=(0, 1))
+        self.assertTrue(self.rcon_server.reload_if_changed())
+        self.assertFalse(self.rcon_server.reload_if_changed())
+        self.assertEqual(self.connection.state, "authenticated")
+        self.assertEqual(self.response("status"), "new")
+        self.assertEqual(self.response("say x"), "")
+
+        # invalid files leave the old rules in place
+        with open(self.path, "w") as f:
+            f.write("{invalid")
+        os.utime(self.path, ns=(0, 2))
+        with self.assertLogs("RCONServer", "ERROR"):
+            self.assertFalse(self.rcon_server.reload_if_changed())
+        self.assertEqual(self.response("status"), "new")
+        self.assertRaises(RuleError, self.rcon_server.reload)
+
+    def test_invalid_rules(self):
+        for rules in ({"rules": [{"response": "x"}]},
+                      {"rules": [{"command": "a", "prefix": "b"}]},
+                      {"rules": [{"pattern": "(", "response": "x"}]},
+                      {"rules": [{"command": "a", "response": "{name}"}]},
+                      {"rules": [{"command": "a", "response": "{} {0}"}]},
+                      {"rules": [{"command": "a",
+                                  "response": "{command.__class__}"}]},
+                      {"rules": [{"command": "a", "response": "{0[0]}"}]},
+                      {"rules": [{"command": "a", "response": "{0:d}"}]},
+                      {"rules": [{"command": "a",
+                                  "response": "gesagt: {args} \u00e4"}]},
+                      {"rules": [{"command": "a", "delay": -1}]},
+                      {"rules": [{"command": "a", "repeat": 0}]},
+                      {"rules": [{"command": "a", "response": 1}]},
+                      {"rules": "x"},
+                      []):
+            self.assertRaises(RuleError, compile_rules, rules)
+
+    def test_cache(self):
+        """Tests that cached static responses get the id of the request."""
+        self.rcon_server.response_cache = ResponseCache(default_ttl=60)
+        for id in (10, 11):
+            self.assertEqual(self.response("status", id=id),
+                             "hostname: mock\nplayers: 0")
+        for id in (12, 13):
+            packets = self.command("dump", id=id)
+            self.assertEqual([p.id for p in packets], [id, id])
+        self.assertEqual(self.response("kick a b", id=14), "kicked a b.")
+        self.assertEqual(self.response("kick a b", id=15), "kicked a b.")
+        self.assertEqual(self.rcon_server.response_cache.hits, 3)
+
+    def test_format_error(self):
+        """Tests that a failing template does not close the connection."""
+        template = _Template("{0}")
+        # a template which was not checked when it was loaded
+        template.template = "{} {0}"
+        self.rcon_server._default = template
+        with self.assertLogs("RCONServer", "ERROR"):
+            self.assertEqual(self.response("unknown"), "")
+        self.assertEqual(self.connection.state, "authenticated")
+
+    def test_encode_error(self):
+        """Tests that a template which can not be encoded answers with an
+        empty response and the following packets are still handled."""
+        template = _Template("{0}")
+        template.template = "{0} \u00e4"
+        self.rcon_server._default = template
+        data = (RCONPacket(5, RCONPacket.SERVERDATA_EXECCOMMAND,
+                           "unknown").msg()
+                + RCONPacket(6, RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                             "").msg())
+        with self.assertLogs("RCONServer", "ERROR"):
+            self.transport.write_to_test(data)
+        buffer = self.transport.read()
+        packets = []
+        while buffer:
+            packet, buffer = RCONPacket.from_buffer(buffer)
+            packets.append((packet.id, packet.body))
+        self.assertEqual(packets[0], (5, ""))
+        self.assertEqual([id for id, _ in packets[1:]], [6, 6])
+
+    def test_empty_default(self):
+        """Tests the empty response without a default."""
+        router, default = compile_rules({"rules": []})
+        self.assertTrue(default is None)
+        self.rcon_server.router, self.rcon_server._default = router, default
+        self.assertEqual(self.response("anything"), "")
+
+    @unittest.skipIf(tomllib is None, "needs tomllib")
+    def test_toml(self):
+        path = os.path.join(self.directory.name, "rules.toml")
+        with open(path, "w") as f:
+            f.write('default = "?"\n'
+                    '[[rules]]\n'
+                    'command = "status"\n'
+                    'response = ["a", "b"]\n')
+        self.rcon_server.rule_file = path
+        self.rcon_server.reload()
+        self.assertEqual(self.response("status"), "a\nb")
+        self.assertEqual(self.response("x"), "?")
@@ -0,0 +1,131 @@
+import multiprocessing
+import os
+import signal
+import socket
+import time
+import unittest
+
+from .rcon_server import RCONServer, supervise
+from .rcon_client import RCONClient, ConnectionClosedError
+from .rcon_packet import RCONPacket
+from .test_rcon_connection import free_port
+
+test_password = "test"
+
+
+class PidRCONServer(RCONServer):
+
+    def handle_execcommand(self, packet, connection):
+        if packet.body == "crash":
+            os._exit(1)
+        response = RCONPacket(packet.id,
+                              RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                              str(os.getpid()))
+        connection.send_packet(response)
+
+
+@unittest.skipUnless(hasattr(socket, "SO_REUSEPORT"), "needs SO_REUSEPORT")
+class RCONServerWorkersTest(unittest.TestCase):
+
+    def setUp(self):
+        self.port = free_port()
+        rcon_server = PidRCONServer(bind=("127.0.0.1", self.port),
+                                    password=test_password)
+        context = multiprocessing.get_context("fork")
+        self.supervisor = context.Process(target=rcon_server.run,
+                                          kwargs={"workers": 2,
+                                                  "restart_delay": 0})
+        self.supervisor.start()
+
+    def tearDown(self):
+        self.supervisor.terminate()
+        self.supervisor.join(10)
+        self.assertEqual(self.supervisor.exitcode, 0)
+
+    def send_command(self, command):
+        """Sends the *command* with a new client and returns the response."""
+        for _ in range(100):
+            client = RCONClient("127.0.0.1", self.port, test_password)
+            try:
+                client.connect()
+                client.login()
+                return client.send_command(command)
+            except (ConnectionError, ConnectionClosedError):
+                # the server is not started yet or a worker was stopped
+                time.sleep(0.05)
+            finally:
+                client.disconnect()
+        self.fail("could not connect to the server")
+
+    def test_workers(self):
+        """Tests if the commands are handled by the worker processes."""
+        pids = set()
+        for _ in range(200):
+            pids.add(self.send_command("pid"))
+            if len(pids) == 2:
+                break
+        self.assertNotIn(str(self.supervisor.pid), pids)
+        # both workers were started and handle connections
+        self.assertEqual(len(pids), 2)
+
+    def test_restart(self):
+        """Tests if a crashed worker is restarted."""
+        pids_before = {self.send_command("pid") for _ in range(20)}
+        client = RCONClient("127.0.0.1", self.port, test_password)
+        client.connect()
+        client.login()
+        client.send_packet(RCONPacket(1, RCONPacket.SERVERDATA_EXECCOMMAND,
+                                      "crash"))
+        client.disconnect()
+
+        # the restarted worker has a new pid
+        pids = {self.send_command("pid") for _ in range(50)}
+        self.assertTrue(pids - pids_before)
+
+
+class SuperviseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.context = multiprocessing.get_context("fork")
+        self.started = self.context.Queue()
+        self.supervisor = None
+
+    def tearDown(self):
+        if self.supervisor is not None:
+            self.supervisor.terminate()
+            self.supervisor.join(10)
+            self.assertEqual(self.supervisor.exitcode, 0)
+
+    def supervise(self, run, workers, **kwargs):
+        """Runs supervise in a new process, *run* is called by the workers."""
+        started = self.started
+
+        def target(number):
+            started.put((number, os.getpid(), time.monotonic()))
+            run()
+
+        self.supervisor = self.context.Process(
+                target=supervise, args=(target, workers), kwargs=kwargs)
+        self.supervisor.start()
+
+    def test_replace_killed_worker(self):
+        """Tests that all workers are started and a killed one is replaced."""
+        self.supervise(lambda: time.sleep(60), 2, restart_delay=0)
+        workers = dict(self.started.get(timeout=10)[:2] for _ in range(2))
+        self.assertEqual(set(workers), {0, 1})
+
+        os.kill(workers[0], signal.SIGKILL)
+        number, pid, _ = self.started.get(timeout=10)
+        self.assertEqual(number, 0)
+        self.assertNotIn(pid, workers.values())
+
+    def test_restart_backoff(self):
+        """Tests that the restart delay doubles up to the maximum."""
+        self.supervise(lambda: None, 1, restart_delay=0.05,
+                       max_restart_delay=0.2)
+        starts = [self.started.get(timeout=10)[2] for _ in range(5)]
+        delays = [b - a for a, b in zip(starts, starts[1:])]
+        self.assertTrue(0.05 <= delays[0] < delays[2], delays)
+        self.assertTrue(0.1 <= delays[1], delays)
+        self.assertTrue(0.2 <= delays[2] < 0.4, delays)
+        self.assertTrue(0.2 <= delays[3] < 0.4, delays)
@@ -0,0 +1,88 @@
+import asyncio
+import unittest
+
+from .rcon_timer import TimerWheel
+
+
+class TimerWheelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.expired = []
+        self.wheel = TimerWheel(lambda key, now: self.expired.append(key),
+                                resolution=1.0, clock=lambda: 0)
+
+    def test_expire(self):
+        """Tests that keys expire in the tick after their deadline."""
+        self.wheel.schedule("a", 1.5)
+        self.wheel.schedule("b", 2.0)
+        self.wheel.schedule("c", 5)
+        self.assertEqual(len(self.wheel), 3)
+
+        self.assertEqual(self.wheel.advance(1.9), 0)
+        self.assertEqual(self.wheel.advance(2.0), 2)
+        self.assertEqual(self.expired, ["a", "b"])
+        self.assertFalse("a" in self.wheel)
+        self.assertEqual(self.wheel.advance(100), 1)
+        self.assertEqual(self.expired, ["a", "b", "c"])
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_cancel_and_move(self):
+        """Tests cancelling and rescheduling of keys."""
+        self.wheel.schedule("a", 1)
+        self.wheel.schedule("b", 1)
+        self.wheel.cancel("a")
+        self.wheel.cancel("unknown")
+        self.wheel.schedule("b", 3)
+        self.wheel.advance(2)
+        self.assertEqual(self.expired, [])
+        self.wheel.advance(3)
+        self.assertEqual(self.expired, ["b"])
+
+    def test_reschedule_in_callback(self):
+        """Tests that an expired key can schedule itself again."""
+        def callback(key, now):
+            self.expired.append(now)
+            if len(self.expired) < 3:
+                wheel.schedule(key, now + 1)
+        wheel = TimerWheel(callback, resolution=0.5)
+        wheel.schedule("a", 1)
+        for now in range(1, 10):
+            wheel.advance(now)
+        self.assertEqual(self.expired, [1, 2, 3])
+
+    def test_loop(self):
+        """Tests that the wheel runs on the event loop."""
+        async def run():
+            wheel = TimerWheel(lambda key, now: self.expired.append(key),
+                               resolution=0.01)
+            wheel.schedule("a", wheel.clock() + 0.02)
+            await asyncio.sleep(0.1)
+            self.assertEqual(self.expired, ["a"])
+            self.assertTrue(wheel._handle is None)
+
+        asyncio.run(run())
+
+    def test_loop_reschedule(self):
+        """
+        Tests that a key which schedules itself again from its callback does
+        not start a second loop timer.
+        """
+        async def run():
+            loop = asyncio.get_running_loop()
+            wheel = TimerWheel(lambda key, now: wheel.schedule(key, now + 0.01),
+                               resolution=0.01)
+            wheel.schedule("a", wheel.clock())
+            await asyncio.sleep(0.1)
+            handles = [handle for handle in loop._scheduled
+                       if not handle.cancelled()
+                       and getattr(handle._callback, "__self__", None)
+                       is wheel]
+            self.assertEqual(len(handles), 1)
+            self.assertTrue(handles[0] is wheel._handle)
+            wheel.close()
+            self.assertTrue(handles[0].cancelled())
+
+        asyncio.run(run())
+
+    def test_invalid_resolution(self):
+        self.assertRaises(ValueError, TimerWheel, print, resolution=0)
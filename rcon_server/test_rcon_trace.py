@@ -0,0 +1,65 @@
+import logging
+import unittest
+
+from .rcon_packet import RCONPacket
+from .rcon_message import RCONMessage
+from .rcon_trace import PacketTracer
+
+
+class DummyConnection:
+    connection_id = 7
+
+
+class ExplodingPacket:
+    """A packet which fails the test when it is formatted."""
+
+    def __len__(self):
+        raise AssertionError("packet was formatted")
+
+
+class PacketTracerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger("RCONServer.trace.test")
+        self.tracer = PacketTracer(max_body=5, logger=self.logger)
+        self.connection = DummyConnection()
+
+    def test_disabled(self):
+        """Tests that nothing is formatted when DEBUG is disabled."""
+        self.logger.setLevel(logging.INFO)
+        self.tracer.trace("sent", self.connection, ExplodingPacket())
+
+    def test_truncation(self):
+        """Tests that long bodies are truncated."""
+        packet = RCONPacket(1, RCONPacket.SERVERDATA_EXECCOMMAND, "a" * 100)
+        with self.assertLogs(self.logger, logging.DEBUG) as logs:
+            self.tracer.trace("received", self.connection, packet)
+        self.assertEqual(logs.output, [
+            "DEBUG:RCONServer.trace.test:received connection=7 id=1 type=2 "
+            "size=114 body='aaaaa'...(100 chars)"])
+        self.assertEqual(logs.records[0].rcon_direction, "received")
+        self.assertEqual(logs.records[0].rcon_connection_id, 7)
+
+    def test_message(self):
+        """Tests the summary of messages and encoded responses."""
+        message = RCONMessage(id=2, type=RCONPacket.SERVERDATA_RESPONSE_VALUE,
+                              body="b" * 5000)
+        with self.assertLogs(self.logger, logging.DEBUG) as logs:
+            self.tracer.trace("sent", self.connection, message)
+            self.tracer.trace("sent", self.connection, b"1234")
+        self.assertTrue(logs.output[0].endswith(
+                "id=2 type=0 packets=2 size=5028 body='bbbbb'...(4086 chars)"))
+        self.assertTrue(logs.output[1].endswith("encoded size=4"))
+
+    def test_sampling(self):
+        """Tests that only every n-th packet is logged."""
+        tracer = PacketTracer(sample_every=3, logger=self.logger)
+        packet = RCONPacket(1, RCONPacket.SERVERDATA_EXECCOMMAND, "")
+        with self.assertLogs(self.logger, logging.DEBUG) as logs:
+            for _ in range(7):
+                tracer.trace("received", self.connection, packet)
+        self.assertEqual(len(logs.records), 3)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, PacketTracer, max_body=-1)
+        self.assertRaises(ValueError, PacketTracer, sample_every=0)
@@ -1,3 +1,15 @@
+import struct
+
+# size, id and type at the start of every RCON packet as 32 bit signed
+# little endian integers
+HEADER = struct.Struct("<iii")
+
+# the id field of a packet, 4 bytes after the start of the packet
+ID = struct.Struct("<i")
+
+# the maximum value of the size field of a packet
+MAX_PACKET_SIZE = 4096
+
 def to_int32(value):
     """:return: A byte array containing the value as a 32 bit signed little
     endian integer.